@@ -0,0 +1,52 @@
+"""Benchmarks for ArchiveBrowser indexing and image access."""
+
+import itertools
+import pytest
+from pyviewer import ArchiveBrowser
+from pyviewer.util import Archive
+
+
+def test_load_tag_map(benchmark, library):
+    """Index every archive in the library from scratch."""
+    tag_map = benchmark.pedantic(
+        ArchiveBrowser.load_tag_map, args=(library,), rounds=3
+    )
+    assert tag_map
+
+
+def test_reindex_unchanged(benchmark, library, archive_browser):
+    """Reload the index when no archive changed."""
+    records = benchmark(
+        ArchiveBrowser.index_archives, library, archive_browser._records
+    )
+    assert records == archive_browser._records
+
+
+def test_files(benchmark, archive_browser):
+    """Rebuild the member list of the active tag from cached listings."""
+
+    def files():
+        archive_browser.reset_files()
+        return archive_browser.files
+
+    assert benchmark(files)
+
+
+def test_image(benchmark, archive_browser):
+    """Load consecutive images of the active tag."""
+    index = itertools.count()
+    assert benchmark(lambda: archive_browser.image(next(index)))
+
+
+def test_hash(benchmark, archive_browser):
+    """Hash consecutive images of the active tag."""
+    index = itertools.count()
+    assert benchmark(lambda: archive_browser.hash(next(index)))
+
+
+@pytest.mark.parametrize("method", ["load_file", "view_file"])
+def test_stored_member(benchmark, library, method):
+    """Read a stored member by copying it or through the memory map."""
+    with Archive(library / "archive000001.zip") as archive:
+        member = archive.image_files[-1]
+        assert benchmark(getattr(archive, method), member)
@@ -0,0 +1,39 @@
+"""Benchmarks for BooruBrowser queries against a fake database."""
+
+import itertools
+import threading
+import weakref
+from pyviewer import BooruBrowser
+
+
+def booru_browser(pool) -> BooruBrowser:
+    """Create a browser bound to pool without connecting to a server."""
+    browser = BooruBrowser.__new__(BooruBrowser)
+    browser._data_root = "/booru"
+    browser.page_size = 200
+    browser.media_host = "fake"
+    browser.pool = pool
+    browser._prepared = weakref.WeakSet()
+    browser._slots = threading.BoundedSemaphore(8)
+    return browser
+
+
+def test_first_file(benchmark, fake_pool):
+    """Resolve a tag with many posts and fetch its first file."""
+    browser = booru_browser(fake_pool(50_000))
+    assert benchmark(lambda: browser.files_at_tag("artist")[0])
+
+
+def test_page_through(benchmark, fake_pool):
+    """Step through files of a tag fetching pages on demand."""
+    browser = booru_browser(fake_pool(50_000))
+    files = browser.files_at_tag("artist")
+    index = itertools.count()
+    assert benchmark(lambda: files[next(index) % len(files)])
+
+
+def test_selected_tags(benchmark, fake_pool):
+    """Resolve a large tag selection in one batched query."""
+    browser = booru_browser(fake_pool(0))
+    tags = [f"artist{index}" for index in range(500)]
+    assert len(benchmark(browser._get_selected_tags, tags)) == 500
@@ -0,0 +1,49 @@
+"""Benchmarks comparing decode backends on the synthetic corpus."""
+
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pyviewer.decoder import available_decoders, get_decoder
+from pyviewer.util import Archive
+from .conftest import sample_image
+
+BOUNDS = {"full": None, "screen": (1920, 1080), "thumb": (256, 256)}
+
+
+@pytest.fixture(scope="module")
+def photo() -> bytes:
+    """Large JPEG where reduced resolution decoding pays off."""
+    return sample_image(0, size=(4000, 3000))
+
+
+@pytest.fixture(scope="module")
+def corpus(library) -> list:
+    """Images of the first few archives in the synthetic library."""
+    images = []
+    for path in sorted(library.glob("*.zip"))[:4]:
+        with Archive(path) as archive:
+            images.extend(archive.get_images())
+    return images
+
+
+@pytest.mark.parametrize("bounds", BOUNDS)
+@pytest.mark.parametrize("name", available_decoders())
+def test_decode_photo(benchmark, photo, name, bounds):
+    """Decode one large JPEG scaled to the bounds."""
+    decoder = get_decoder(name)
+    assert benchmark(decoder.decode, photo, BOUNDS[bounds]).width
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("name", available_decoders())
+def test_decode_corpus(benchmark, corpus, name, workers):
+    """Decode the corpus into thumbnails on a thread pool."""
+    decoder = get_decoder(name)
+    with ThreadPoolExecutor(workers) as pool:
+        images = benchmark(
+            lambda: list(
+                pool.map(
+                    decoder.decode, corpus, [BOUNDS["thumb"]] * len(corpus)
+                )
+            )
+        )
+    assert len(images) == len(corpus)
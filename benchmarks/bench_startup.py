@@ -0,0 +1,34 @@
+"""Benchmarks for cold start of the console script."""
+
+import subprocess
+import sys
+
+
+def cold_import(statement: str) -> None:
+    """Run statement in a fresh interpreter."""
+    subprocess.run([sys.executable, "-c", statement], check=True)
+
+
+def test_import_package(benchmark):
+    """Import the package and resolve the archive browser."""
+    benchmark.pedantic(
+        cold_import,
+        args=("import pyviewer; pyviewer.ArchiveBrowser",),
+        rounds=5,
+    )
+
+
+def test_import_cli(benchmark):
+    """Import the console script as done for --help."""
+    benchmark.pedantic(cold_import, args=("import pyviewer.cli",), rounds=5)
+
+
+def test_archive_startup(benchmark, library, tmp_path):
+    """Create the archive browser from a warm state file."""
+    statement = (
+        "from pyviewer import ArchiveBrowser;"
+        + f" ArchiveBrowser({str(library)!r},"
+        + f" state_file={str(tmp_path / 'state')!r}).count"
+    )
+    cold_import(statement)
+    benchmark.pedantic(cold_import, args=(statement,), rounds=5)
@@ -0,0 +1,92 @@
+"""Benchmarks for TagManager navigation, filtering and persistence."""
+
+import pytest
+from pyviewer.statestore import StateStore
+from pyviewer.util import FilterEntry, TagManager, sample_collection
+
+TAG_COUNTS = [10_000, 100_000, 1_000_000]
+MANAGERS = {}
+
+
+def tag_manager(count: int) -> TagManager:
+    """Build or reuse a tag manager with count tags and a few filters."""
+    if count not in MANAGERS:
+        tag_map = {
+            f"tag{index:07d}": (f"{index}.zip",) for index in range(count)
+        }
+        tag_filter = [
+            (f"tag{index:07d}", True) for index in range(0, count, 97)
+        ]
+        MANAGERS[count] = TagManager(tag_map, tag_filter)
+    return MANAGERS[count]
+
+
+@pytest.mark.parametrize("count", TAG_COUNTS)
+def test_navigation(benchmark, count):
+    """Step through tags and resolve the current tag name."""
+    manager = tag_manager(count)
+
+    def step():
+        manager.adjust_index(1)
+        return manager.tag
+
+    benchmark(step)
+
+
+@pytest.mark.parametrize("count", TAG_COUNTS)
+def test_filter_undo(benchmark, count):
+    """Apply a filter decision and revert it."""
+    manager = tag_manager(count)
+    manager.set_tag(manager.tag_at(count // 2))
+
+    def filter_undo():
+        manager.update_tag_filter(True)
+        manager.undo_last_filter()
+
+    benchmark(filter_undo)
+
+
+@pytest.mark.parametrize("count", TAG_COUNTS)
+def test_set_tag(benchmark, count):
+    """Look up the position of a tag by name."""
+    manager = tag_manager(count)
+    target = manager.tag_at(count - count // 3)
+    benchmark(manager.set_tag, target)
+
+
+@pytest.mark.parametrize("count", TAG_COUNTS[:2])
+def test_store_save_tag_map(benchmark, tmp_path, count):
+    """Persist a tag map to the state store."""
+    store = StateStore(tmp_path / "state")
+    tag_map = tag_manager(count)._tag_map
+    benchmark.pedantic(store.save_tag_map, args=("root", tag_map), rounds=3)
+
+
+@pytest.mark.parametrize("count", TAG_COUNTS[:2])
+def test_store_load_tag_map(benchmark, tmp_path, count):
+    """Load a tag map from the state store."""
+    store = StateStore(tmp_path / "state")
+    store.save_tag_map("root", tag_manager(count)._tag_map)
+    tag_map = benchmark.pedantic(store.load_tag_map, args=("root",), rounds=3)
+    assert len(tag_map) == count
+
+
+def test_add_filter(benchmark, tmp_path):
+    """Record and revert a single filter decision."""
+    store = StateStore(tmp_path / "state")
+
+    def add_remove():
+        store.add_filter(FilterEntry("tag", True))
+        store.remove_filter("tag")
+
+    benchmark(add_remove)
+
+
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_sample_collection(benchmark, count):
+    """Interlace the member lists of count archives."""
+    collection = [
+        [f"{archive}/{image:04d}.jpg" for image in range(40)]
+        for archive in range(count)
+    ]
+    assert benchmark(sample_collection, collection, 4, 40 * count)
@@ -0,0 +1,162 @@
+"""Fixtures generating synthetic media libraries for benchmarks."""
+
+import json
+import random
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+import pytest
+from PIL import Image
+from pyviewer import ArchiveBrowser
+
+
+def pytest_addoption(parser):
+    """Register options controlling the size of the synthetic library."""
+    group = parser.getgroup("pyviewer benchmarks")
+    group.addoption(
+        "--library-archives",
+        type=int,
+        default=200,
+        help="Number of archives in the synthetic library.",
+    )
+    group.addoption(
+        "--library-images",
+        type=int,
+        default=20,
+        help="Number of images per synthetic archive.",
+    )
+    group.addoption(
+        "--library-tags",
+        type=int,
+        default=50,
+        help="Number of distinct artist tags in the synthetic library.",
+    )
+
+
+def sample_image(seed: int, size=(320, 240), fmt: str = "JPEG") -> bytes:
+    """Encode a noisy test image so compression is realistic."""
+    image = Image.effect_noise(size, 32 + seed % 64).convert("RGB")
+    output = BytesIO()
+    image.save(output, format=fmt)
+    return output.getvalue()
+
+
+def write_archive(
+    path: Path, tags, images: int, seed: int, stored: bool = True
+) -> None:
+    """Write one archive with metadata and images."""
+    jpeg, png = sample_image(seed), sample_image(seed, fmt="PNG")
+    with ZipFile(path, "w", ZIP_STORED if stored else ZIP_DEFLATED) as zip:
+        zip.writestr("metadata.json", json.dumps({"artist": list(tags)}))
+        for index in range(images):
+            if index % 4:
+                zip.writestr(f"{index:04d}.jpg", jpeg)
+            else:
+                zip.writestr(f"{index:04d}.png", png)
+
+
+def make_library(
+    root: Path, archives: int, images: int, tags: int, seed: int = 0
+) -> Path:
+    """Generate a directory of archives tagged by a pool of artists."""
+    rand = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    for index in range(archives):
+        artists = rand.sample(range(tags), k=rand.choice((1, 1, 2)))
+        write_archive(
+            root / f"archive{index:06d}.zip",
+            [f"artist{artist:05d}" for artist in artists],
+            images,
+            seed=index,
+            stored=bool(index % 2),
+        )
+    return root
+
+
+@pytest.fixture(scope="session")
+def library(request, tmp_path_factory) -> Path:
+    """Synthetic archive library sized by the command line options."""
+    return make_library(
+        tmp_path_factory.mktemp("library"),
+        request.config.getoption("--library-archives"),
+        request.config.getoption("--library-images"),
+        request.config.getoption("--library-tags"),
+    )
+
+
+@pytest.fixture(scope="session")
+def archive_browser(library, tmp_path_factory) -> ArchiveBrowser:
+    """Archive browser indexed over the synthetic library."""
+    return ArchiveBrowser(
+        library, state_file=tmp_path_factory.mktemp("state") / "state"
+    )
+
+
+class FakeCursor:
+    """Cursor returning synthetic post rows without a database."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def execute(self, query, params=None):
+        self.params = params
+
+    def fetchone(self):
+        return (len(self.rows),)
+
+    def fetchall(self):
+        _, after, limit = self.params
+        start = 0 if after is None else len(self.rows) - after + 1
+        return self.rows[start : start + limit]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Connection handing out fake cursors over synthetic posts."""
+
+    closed = False
+
+    def __init__(self, posts: int):
+        self.rows = [
+            (posts - index, f"{index:032x}", "jpg") for index in range(posts)
+        ]
+
+    def cursor(self, name=None):
+        return FakeCursor(self.rows)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    """Connection pool stand-in with a single fake connection."""
+
+    def __init__(self, posts: int):
+        self.conn = FakeConnection(posts)
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+@pytest.fixture
+def fake_pool():
+    """Factory for fake connection pools with a given number of posts."""
+    return FakePool
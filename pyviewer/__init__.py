@@ -4,9 +4,14 @@ __author__ = """Lieuwe Leene"""
 __email__ = "lieuwe@leene.dev"
 __version__ = "0.2.1"
 
-from .util import TagManager
-from .imageloader import ArchiveBrowser, BooruBrowser
-from .pyviewer import PyViewer
+from importlib import import_module
+
+_LAZY_ATTRIBUTES = {
+    "ArchiveBrowser": ".imageloader",
+    "BooruBrowser": ".imageloader",
+    "PyViewer": ".pyviewer",
+    "TagManager": ".util",
+}
 
 __all__ = (
     "ArchiveBrowser",
@@ -14,3 +19,17 @@ __all__ = (
     "PyViewer",
     "TagManager",
 )
+
+
+def __getattr__(name: str):
+    """Import public classes on first access to keep startup cheap."""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List lazy attributes alongside the module globals."""
+    return sorted(set(globals()) | set(__all__))
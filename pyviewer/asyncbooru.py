@@ -0,0 +1,191 @@
+"""Asyncio booru backend resolving tags and their media concurrently."""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Coroutine, Dict, Iterable, List, Optional, Tuple
+from .imageloader import (
+    ARTIST_TAGS_QUERY,
+    BOORU_DATABASE,
+    PREPARED_STATEMENTS,
+    BooruBrowser,
+    PagedFiles,
+    tsquery,
+)
+from .metrics import metrics
+
+SELECTED_TAGS_QUERY = PREPARED_STATEMENTS["pyviewer_tags"].replace("$1", "%s")
+COUNT_QUERY = PREPARED_STATEMENTS["pyviewer_count"].replace("$1", "%s")
+FILES_QUERY = (
+    PREPARED_STATEMENTS["pyviewer_files"]
+    .replace("$1", "%s")
+    .replace("$2", "%s")
+    .replace("$3", "%s")
+)
+
+
+class EventLoopThread:
+    """Asyncio event loop running on a daemon thread."""
+
+    def __init__(self, name: str = "asyncio"):
+        """Start event loop thread."""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """Schedule coroutine on the loop and return a cancellable future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine):
+        """Run coroutine on the loop and wait for its result."""
+        return self.submit(coroutine).result()
+
+    def close(self) -> None:
+        """Stop the loop and wait for its thread to exit."""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.loop.close()
+
+
+class AsyncBooruBrowser(BooruBrowser):
+    """Booru manager running queries on an asyncio loop.
+
+    The synchronous BooruBrowser interface blocks on futures of the loop,
+    so pending queries for tags the user moved away from can be cancelled.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Start event loop, then connect and load tags like BooruBrowser."""
+        self._loop = EventLoopThread("booru")
+        self._pending: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _connect(self, pool_size: int):
+        """Open psycopg 3 async connection pool on the event loop."""
+        from psycopg_pool import AsyncConnectionPool
+
+        async def open_pool():
+            pool = AsyncConnectionPool(
+                kwargs=dict(BOORU_DATABASE, host=self.media_host),
+                min_size=1,
+                max_size=pool_size,
+                open=False,
+            )
+            await pool.open()
+            return pool
+
+        return self._loop.run(open_pool())
+
+    def close(self) -> None:
+        """Cancel pending queries, close the pool and stop the loop."""
+        if self._loop.loop.is_closed():
+            return
+        self.cancel()
+        self._loop.run(self.pool.close())
+        self._loop.close()
+
+    async def fetch(self, query: str, params: tuple = None) -> List[tuple]:
+        """Run query on a pooled connection and return all rows."""
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                return await cursor.fetchall()
+
+    async def load_tag_map_async(
+        self, selected_tags: List[str] = None
+    ) -> Dict[str, Tuple[str, ...]]:
+        """Query booru for media tags."""
+        if selected_tags:
+            rows = await self.fetch(
+                SELECTED_TAGS_QUERY, (list(selected_tags),)
+            )
+            found = {name: (tag_id, count) for tag_id, name, count in rows}
+            return {elem: found.get(elem, (0, 0)) for elem in selected_tags}
+        return {
+            str(name): (str(tag_id), str(count))
+            for tag_id, name, count in await self.fetch(ARTIST_TAGS_QUERY)
+        }
+
+    async def files_at_tag_async(self, tag: str) -> PagedFiles:
+        """Count media at tag, its files are fetched lazily page by page."""
+        if not tag:
+            return PagedFiles(None, 0, self._file_path)
+        rows = await self.fetch(COUNT_QUERY, (tsquery(tag),))
+        return PagedFiles(
+            lambda after, limit: self._loop.run(
+                self.files_page_async(tag, after, limit)
+            ),
+            rows[0][0],
+            self._file_path,
+            self.page_size,
+        )
+
+    async def files_page_async(
+        self, tag: str, after: Optional[int], limit: int
+    ) -> List[tuple]:
+        """Query rows of posts at tag with ids below after."""
+        return await self.fetch(
+            FILES_QUERY, (tsquery(tag), after, after, limit)
+        )
+
+    def load_tag_map(
+        self, selected_tags: List[str] = None
+    ) -> Dict[str, Tuple[str, ...]]:
+        """Query booru for media tags."""
+        logging.info(f"Regenerating tag map for {self.media_host}.")
+        return self._loop.run(self.load_tag_map_async(selected_tags))
+
+    def prefetch_tag(self, tag: str) -> Future:
+        """Start querying media at tag unless a query is already pending."""
+        with self._pending_lock:
+            future = self._pending.get(tag)
+            if future is None or future.cancelled():
+                future = self._loop.submit(self.files_at_tag_async(tag))
+                self._pending[tag] = future
+            return future
+
+    def cancel(self, keep: Iterable[str] = ()) -> None:
+        """Cancel pending media queries except those for tags in keep."""
+        keep = set(keep)
+        with self._pending_lock:
+            stale = [tag for tag in self._pending if tag not in keep]
+            futures = [self._pending.pop(tag) for tag in stale]
+        for future in futures:
+            future.cancel()
+        if futures:
+            logging.debug(f"Cancelled {len(futures)} pending tag queries.")
+
+    @metrics.timed("booru.files_at_tag")
+    def files_at_tag(self, tag: str) -> PagedFiles:
+        """Return media at tag, reusing a query started by prefetch_tag.
+
+        Queries cancelled by another thread meanwhile are started again.
+        """
+        logging.info(f"SQL query for files matching {tag}.")
+        while True:
+            future = self.prefetch_tag(tag)
+            try:
+                return future.result()
+            except CancelledError:
+                logging.debug(f"Query for {tag} was cancelled, retrying.")
+            finally:
+                with self._pending_lock:
+                    if self._pending.get(tag) is future:
+                        del self._pending[tag]
+
+    def load_files(self, tag: str) -> PagedFiles:
+        """Extract media of tag, dropping queries for others."""
+        self.cancel(keep=(tag, *self._resolved))
+        files = self.resolved_files(tag)
+        if self.duplicates:
+            return self.duplicates.unseen(files, self.entry_key)
+        return files
+
+
+# =]
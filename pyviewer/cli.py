@@ -1,14 +1,24 @@
 """Console script for pyviewer."""
 import os
 import sys
+import time
+import atexit
 import logging
 from pathlib import Path
 from argparse import ArgumentParser
 from tempfile import NamedTemporaryFile
-from PySide6.QtCore import QUrl
-from PySide6.QtQml import QQmlApplicationEngine
-from PySide6.QtWidgets import QApplication
-from pyviewer import PyViewer, __version__, ArchiveBrowser, BooruBrowser
+from typing import Union
+from pyviewer import __version__
+from pyviewer.imageloader import ArchiveBrowser, BooruBrowser
+from pyviewer.hashing import HASH_ALGORITHMS, PERCEPTUAL_HASHES
+from pyviewer.dedup import index_sources
+from pyviewer.decoder import DECODERS, get_decoder
+from pyviewer.statestore import StateStore
+from pyviewer.rendition import RenditionCache
+from pyviewer.watcher import ArchiveWatcher
+from pyviewer.metrics import metrics
+
+STARTED = time.perf_counter()
 
 
 def setup_logger(setup: ArgumentParser) -> None:
@@ -38,9 +48,10 @@ def pyviewer_parser() -> ArgumentParser:
         "--archive",
         dest="archive",
         type=Path,
+        nargs="+",
         metavar="PATH",
-        help="Browse collection of compressed archives."
-        + " Must specify a valid path.",
+        help="Browse zip, cbz and tar archives or image directories below"
+        + " one or more directories, searched recursively.",
         default=None,
     )
     source_selection.add_argument(
@@ -53,6 +64,14 @@ def pyviewer_parser() -> ArgumentParser:
         + " Must specify a valid host address.",
         default=None,
     )
+    parser.add_argument(
+        "--async-booru",
+        dest="async_booru",
+        action="store_true",
+        default=False,
+        help="Query the booru host concurrently on an asyncio event loop"
+        + " (requires psycopg 3 and psycopg_pool).",
+    )
     parser.add_argument(
         "-t",
         "--tags",
@@ -81,6 +100,128 @@ def pyviewer_parser() -> ArgumentParser:
         help="Save viewer state to file.",
         default=NamedTemporaryFile(mode="w").name,
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        metavar="COUNT",
+        help="Number of worker processes used for indexing archives.",
+        default=None,
+    )
+    parser.add_argument(
+        "-p",
+        "--prefetch",
+        dest="prefetch",
+        type=int,
+        metavar="COUNT",
+        help="Number of images to preload on either side of the index.",
+        default=4,
+    )
+    parser.add_argument(
+        "-c",
+        "--cache-size",
+        dest="cache_size",
+        type=int,
+        metavar="MB",
+        help="Memory budget for preloaded images in megabytes.",
+        default=256,
+    )
+    parser.add_argument(
+        "--preload-pages",
+        dest="preload_pages",
+        type=int,
+        metavar="COUNT",
+        help="Number of leading pages loaded for the adjacent tags.",
+        default=2,
+    )
+    parser.add_argument(
+        "--sheet-pages",
+        dest="sheet_pages",
+        type=int,
+        metavar="COUNT",
+        help="Number of leading pages per archive shown in grid mode.",
+        default=4,
+    )
+    parser.add_argument(
+        "--renditions",
+        dest="renditions",
+        type=Path,
+        metavar="DIR",
+        help="Cache downscaled renditions of viewed images in directory.",
+        default=None,
+    )
+    parser.add_argument(
+        "--rendition-size",
+        dest="rendition_size",
+        type=int,
+        metavar="MB",
+        help="Disk budget for cached renditions in megabytes.",
+        default=1024,
+    )
+    parser.add_argument(
+        "--decoder",
+        dest="decoder",
+        type=str,
+        choices=("auto",) + tuple(DECODERS),
+        help="Image decoder used by the viewer, auto picks the first one"
+        + f" installed of: {', '.join(DECODERS)}.",
+        default="qt",
+    )
+    parser.add_argument(
+        "--decode-workers",
+        dest="decode_workers",
+        type=int,
+        metavar="COUNT",
+        help="Decode images in worker processes, 0 decodes in the viewer.",
+        default=0,
+    )
+    parser.add_argument(
+        "--base64",
+        dest="base64",
+        action="store_true",
+        default=False,
+        help="Pass base64 encoded images to QML instead of the provider.",
+    )
+    parser.add_argument(
+        "--hash",
+        dest="hash",
+        type=str,
+        choices=HASH_ALGORITHMS,
+        help="Digest used for image hashes.",
+        default="md5",
+    )
+    parser.add_argument(
+        "--skip-duplicates",
+        dest="skip_duplicates",
+        action="store_true",
+        default=False,
+        help="Hide images whose duplicates were already shown,"
+        + " using clusters found by the dedup command.",
+    )
+    parser.add_argument(
+        "--background",
+        dest="background",
+        action="store_true",
+        default=False,
+        help="Show the viewer immediately and load media in the background.",
+    )
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        action="store_true",
+        default=False,
+        help="Pick up new, modified or removed archives while running,"
+        + " using inotify when watchdog is installed.",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        default=False,
+        help="Record latency histograms, show them in the status overlay"
+        + " and print them on exit or SIGUSR1.",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -89,45 +230,237 @@ def pyviewer_parser() -> ArgumentParser:
         default=0,
         help="Pring debug information.",
     )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    validate = commands.add_parser(
+        "validate",
+        help="Check all archives for broken images and write a report.",
+    )
+    validate.add_argument(
+        "-o",
+        "--report",
+        dest="report",
+        type=Path,
+        metavar="REPORT",
+        help="JSON lines report, resumed if it already exists.",
+        default=Path("pyviewer-validation.jsonl"),
+    )
+    commands.add_parser(
+        "hash",
+        help="Print digests of all images under the selected tags.",
+    )
+    dedup = commands.add_parser(
+        "dedup",
+        help="Find duplicate images under the selected tags.",
+    )
+    dedup.add_argument(
+        "-o",
+        "--report",
+        dest="report",
+        type=Path,
+        metavar="REPORT",
+        help="JSON lines report with one duplicate cluster per line.",
+        default=Path("pyviewer-duplicates.jsonl"),
+    )
+    dedup.add_argument(
+        "--perceptual",
+        dest="perceptual",
+        type=str,
+        choices=PERCEPTUAL_HASHES,
+        help="Perceptual hash used to match resized or recompressed images.",
+        default="dhash",
+    )
+    dedup.add_argument(
+        "-d",
+        "--distance",
+        dest="distance",
+        type=int,
+        metavar="BITS",
+        help="Largest perceptual hash distance treated as a duplicate.",
+        default=4,
+    )
+    dedup.add_argument(
+        "--compare-booru",
+        dest="compare_booru",
+        type=str,
+        metavar="HOST",
+        help="Also match images of the selected tags on a booru host.",
+        default=None,
+    )
     return parser
 
 
-def start_viewer(setup) -> int:
-    """Initialize the QML application and load media in the root_dir."""
-    pyviewer = PyViewer()
+def validate_archives(setup) -> int:
+    """Validate archives in parallel and report broken images."""
+    if not setup.archive:
+        print("Validation requires an archive path, exiting...")
+        return 1
+    broken = ArchiveBrowser(
+        [os.path.realpath(path) for path in setup.archive],
+        state_file=setup.state,
+        tags=setup.tags,
+        reload=setup.reload,
+        workers=setup.jobs,
+    ).validate_all(report=setup.report, workers=setup.jobs)
+    print(f"Validation report written to: {setup.report}")
+    return 1 if broken else 0
+
+
+def hash_images(setup) -> int:
+    """Hash images of each selected tag in parallel and print digests."""
+    browser = media_browser(setup)
+    for tag in setup.tags or [browser.tag]:
+        for path, digest in browser.hash_tag(tag).items():
+            print(f"{digest}  {path}")
+    return 0
+
+
+def find_duplicates(setup) -> int:
+    """Cluster duplicate images across sources and write a report."""
+    browser = media_browser(setup)
+    sources = [(browser, setup.tags or browser.tags)]
+    if setup.compare_booru:
+        booru = BooruBrowser(
+            setup.compare_booru,
+            state_file=setup.state,
+            tags=setup.tags,
+            reload=setup.reload,
+        )
+        sources.append((booru, setup.tags or booru.tags))
+    index = index_sources(sources, setup.perceptual, setup.distance)
+    groups = index.write_report(setup.report)
+    StateStore(setup.state).save_duplicates(index.clusters())
+    print(
+        f"Found {len(groups)} duplicate clusters with"
+        + f" {sum(len(keys) - 1 for keys in groups)} redundant images,"
+        + f" report written to: {setup.report}"
+    )
+    return 0
+
+
+def report_startup(stage: str) -> None:
+    """Log and record time elapsed since the console script was loaded."""
+    elapsed = time.perf_counter() - STARTED
+    if metrics.enabled:
+        metrics.histogram(f"startup.{stage}").record(elapsed)
+    logging.info(f"Startup {stage} ready after {elapsed:.3f}s.")
+
+
+def media_browser(setup) -> Union[ArchiveBrowser, BooruBrowser]:
+    """Create browser for the media source selected on the command line."""
     if setup.archive:
         logging.debug("Setting up ArchiveBrowser.")
-        pyviewer.load_media(
-            ArchiveBrowser(
-                os.path.realpath(setup.archive),
-                state_file=setup.state,
-                tags=setup.tags,
-                reload=setup.reload,
-            )
+        browser = ArchiveBrowser(
+            [os.path.realpath(path) for path in setup.archive],
+            state_file=setup.state,
+            tags=setup.tags,
+            reload=setup.reload,
+            workers=setup.jobs,
+            hash_algorithm=setup.hash,
+            skip_duplicates=setup.skip_duplicates,
         )
     else:
         logging.debug("Setting up BooruBrowser.")
-        pyviewer.load_media(
-            BooruBrowser(
-                setup.booru,
-                state_file=setup.state,
-                tags=setup.tags,
-                reload=setup.reload,
-            )
+        booru_browser = BooruBrowser
+        if setup.async_booru:
+            from pyviewer.asyncbooru import AsyncBooruBrowser
+
+            booru_browser = AsyncBooruBrowser
+        browser = booru_browser(
+            setup.booru,
+            state_file=setup.state,
+            tags=setup.tags,
+            reload=setup.reload,
+            hash_algorithm=setup.hash,
+            skip_duplicates=setup.skip_duplicates,
         )
-    if not pyviewer.imageloader.count:
-        print("No media found, exiting...")
-        return 1
+    logging.debug(f"Found {browser.count} files under: {browser.tag}")
+    return browser
+
+
+def start_viewer(setup) -> int:
+    """Initialize the QML application and load media in the root_dir."""
+    from PySide6.QtCore import QTimer, QUrl
+    from PySide6.QtQml import QQmlApplicationEngine
+    from PySide6.QtWidgets import QApplication
+    from pyviewer.pyviewer import PyViewer
+    from pyviewer.provider import (
+        PROVIDER_NAME,
+        SHEET_PROVIDER_NAME,
+        ImageProvider,
+        SheetProvider,
+    )
+    from pyviewer.workers import DecodeWorkers
+
+    pyviewer = PyViewer(
+        prefetch_depth=setup.prefetch,
+        cache_size=setup.cache_size * 2**20,
+        use_provider=not setup.base64,
+        renditions=(
+            RenditionCache(
+                setup.renditions, max_bytes=setup.rendition_size * 2**20
+            )
+            if setup.renditions
+            else None
+        ),
+        decoder=get_decoder(setup.decoder),
+        sheet_pages=setup.sheet_pages,
+        preload_pages=setup.preload_pages,
+        workers=(
+            DecodeWorkers(
+                setup.decode_workers,
+                decoder="auto" if setup.decoder == "qt" else setup.decoder,
+            )
+            if setup.decode_workers > 0
+            else None
+        ),
+    )
+    watcher = (
+        ArchiveWatcher(setup.archive, pyviewer.archives_changed.emit)
+        if setup.watch and setup.archive
+        else None
+    )
+    if not setup.background:
+        pyviewer.load_media(media_browser(setup))
+        report_startup("media")
+        if not pyviewer.imageloader.count:
+            print("No media found, exiting...")
+            return 1
+        if watcher:
+            watcher.start()
     logging.debug("Loading QML Objects.")
     app = QApplication()
     engine = QQmlApplicationEngine()
+    engine.addImageProvider(PROVIDER_NAME, ImageProvider(pyviewer))
+    engine.addImageProvider(SHEET_PROVIDER_NAME, SheetProvider(pyviewer))
     engine.rootContext().setContextProperty("viewer", pyviewer)
     qml_file = os.path.join(os.path.dirname(__file__), "pyviewer.qml")
     engine.load(QUrl(qml_file))
     logging.debug("Launching PyViewer.")
     if not engine.rootObjects():
         return 1
-    return app.exec()
+    QTimer.singleShot(0, lambda: report_startup("window"))
+    if setup.background:
+
+        def media_loaded():
+            # Watcher updates emit loaded again, startup runs only once.
+            pyviewer.loaded.disconnect(media_loaded)
+            report_startup("media")
+            if not pyviewer.imageloader or not pyviewer.imageloader.count:
+                print("No media found, exiting...")
+                app.exit(1)
+            elif watcher:
+                watcher.start()
+
+        pyviewer.loaded.connect(media_loaded)
+        pyviewer.load_media_async(lambda: media_browser(setup))
+    status = app.exec()
+    pyviewer.prefetcher.shutdown()
+    pyviewer.sheet.shutdown()
+    if pyviewer.workers:
+        pyviewer.workers.shutdown()
+    if watcher:
+        watcher.stop()
+    return status
 
 
 def main() -> int:
@@ -135,6 +468,16 @@ def main() -> int:
     parser = pyviewer_parser()
     setup = parser.parse_args()
     setup_logger(setup)
+    if setup.profile:
+        metrics.enabled = True
+        metrics.install_signal()
+        atexit.register(metrics.dump)
+    if setup.command == "validate":
+        return validate_archives(setup)
+    if setup.command == "hash":
+        return hash_images(setup)
+    if setup.command == "dedup":
+        return find_duplicates(setup)
     return start_viewer(setup)
 
 
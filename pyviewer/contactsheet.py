@@ -0,0 +1,157 @@
+"""Contact sheet of thumbnails from the first pages of a tag's archives."""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional
+from .prefetch import ImageCache
+from .rendition import RENDITION_SIZES, RenditionCache, render
+
+
+def sheet_rows(
+    collection: List[List[Any]], pages: int, count: int
+) -> List[Optional[Any]]:
+    """Lay out leading pages of each group as rows padded with None."""
+    entries: List[Optional[Any]] = []
+    for group in collection:
+        if len(entries) >= count:
+            break
+        row = list(group[:pages])
+        if row:
+            entries.extend(row + [None] * (pages - len(row)))
+    return entries[:count]
+
+
+class ContactSheet:
+    """Render thumbnails of a tag concurrently into a bounded cache.
+
+    Only sheet entries and encoded thumbnails are kept, so memory depends
+    on count and max_bytes rather than on the archives under the tag. Each
+    archive fills one row of pages, short ones are padded with empty cells.
+    """
+
+    def __init__(
+        self,
+        pages: int = 4,
+        count: int = 240,
+        max_bytes: int = 64 * 2**20,
+        workers: int = 4,
+        renditions: RenditionCache = None,
+    ):
+        """Create idle sheet showing pages per archive up to count."""
+        self.pages = max(1, pages)
+        self.count = count
+        self.bounds = RENDITION_SIZES["thumb"]
+        self.renditions = renditions
+        self.cache = ImageCache(max_bytes)
+        self.imageloader: Any = None
+        self.tag = ""
+        self.entries: List[Optional[Any]] = []
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="sheet"
+        )
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def load_media(self, imageloader: Any) -> None:
+        """Attach image loader and drop state from any previous one."""
+        self.cancel()
+        self.cache.clear()
+        self.imageloader = imageloader
+        self.tag = ""
+        self.entries = []
+
+    def load_tag(self, tag: str) -> int:
+        """Order entries of tag and start rendering their thumbnails."""
+        if not self.imageloader:
+            return 0
+        if tag != self.tag:
+            self.cancel()
+            self.tag = tag
+            self.entries = sheet_rows(
+                self.imageloader.sheet_collection(tag, self.pages, self.count),
+                self.pages,
+                self.count,
+            )
+            logging.info(f"Contact sheet of {tag}: {len(self.entries)}.")
+        for position in range(len(self.entries)):
+            if self.has_entry(position):
+                self.schedule(position)
+        return len(self.entries)
+
+    def has_entry(self, position: int) -> bool:
+        """Return whether position holds an image rather than padding."""
+        return (
+            0 <= position < len(self.entries)
+            and self.entries[position] is not None
+        )
+
+    def key(self, position: int) -> Hashable:
+        """Cache key of the thumbnail at position of the active tag."""
+        return (self.tag, position)
+
+    def thumbnail(self, tag: str, position: int) -> bytes:
+        """Return thumbnail at position, waiting until it is rendered."""
+        if tag != self.tag or not self.has_entry(position):
+            return bytes()
+        data = self.cache.get(self.key(position))
+        if data is not None:
+            return data
+        future = self.schedule(position)
+        try:
+            return future.result() if future else bytes()
+        except Exception:
+            return bytes()
+
+    def schedule(self, position: int) -> Optional[Future]:
+        """Queue rendering of the thumbnail at position unless cached."""
+        key = self.key(position)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            if key in self.cache:
+                return None
+            future = self._pool.submit(self.render, self.entries[position])
+            self._pending[key] = future
+        future.add_done_callback(
+            lambda result, key=key: self._store(key, result)
+        )
+        return future
+
+    def render(self, entry: Any) -> bytes:
+        """Downscale image of entry, through the rendition cache if set."""
+        if self.renditions:
+            return self.renditions.get(
+                self.imageloader.entry_rendition_key(entry),
+                "thumb",
+                lambda: self.imageloader.load_image(entry),
+            )
+        return render(self.imageloader.load_image(entry), self.bounds)
+
+    def _store(self, key: Hashable, future: Future) -> None:
+        """Move rendered thumbnail into the cache."""
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        if future.cancelled():
+            return
+        if future.exception():
+            logging.warning(f"Thumbnail failed {key}: {future.exception()}")
+            return
+        self.cache.put(key, future.result())
+
+    def cancel(self) -> None:
+        """Cancel all queued thumbnails."""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self) -> None:
+        """Cancel queued work and stop worker threads."""
+        self.cancel()
+        self._pool.shutdown(wait=False)
+
+
+# =]
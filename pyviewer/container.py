@@ -0,0 +1,286 @@
+"""Common interface to archives, tar files and directories of images."""
+
+import os
+import json
+import mmap
+import struct
+import logging
+import tarfile
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Tuple, Union
+from .metrics import metrics
+
+IMAGE_SUFFIXES = (".png", ".jpg")
+META_SUFFIX = "metadata.json"
+CONTAINER_SUFFIXES: Dict[str, str] = {
+    ".zip": "zip",
+    ".cbz": "zip",
+    ".tar": "tar",
+    ".cbt": "tar",
+    ".tar.gz": "tar",
+    ".tgz": "tar",
+    ".tar.bz2": "tar",
+    ".tar.xz": "tar",
+}
+
+
+def container_kind(path: Union[str, Path]) -> str:
+    """Return container type of path from its suffix, empty if unknown."""
+    name = str(path).lower()
+    for suffix, kind in CONTAINER_SUFFIXES.items():
+        if name.endswith(suffix):
+            return kind
+    return ""
+
+
+def container_stat(path: Union[str, Path]) -> Tuple[float, int]:
+    """Return modification time and size used to detect changes.
+
+    Directories report their newest entry and the total size of their
+    files, so edits to members are noticed as well.
+    """
+    stat = os.stat(path)
+    if not os.path.isdir(path):
+        return stat.st_mtime, stat.st_size
+    mtime, size = stat.st_mtime, 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                entry_stat = entry.stat()
+                mtime = max(mtime, entry_stat.st_mtime)
+                size += entry_stat.st_size
+    return mtime, size
+
+
+def member_version(mtime: float, size: int) -> int:
+    """Change token of a member without a stored checksum."""
+    return zlib.crc32(struct.pack("<dq", mtime, size))
+
+
+class Container(ABC):
+    """Collection of image members with optional metadata.
+
+    Subclasses list members, open and load them and report a version
+    that changes whenever a member is modified.
+    """
+
+    filename: str = ""
+    _map: Union[mmap.mmap, bool, None] = None
+    _map_lock: threading.Lock
+
+    @abstractmethod
+    def namelist(self) -> List[str]:
+        """Return names of all members."""
+
+    @abstractmethod
+    def open(self, name: str, mode: str = "r") -> IO[bytes]:
+        """Open member as a binary stream."""
+
+    def load_file(self, file_name: str) -> bytes:
+        """Load member by name."""
+        with self.open(file_name) as file:
+            return file.read()
+
+    def view_file(self, file_name: str) -> Union[bytes, memoryview]:
+        """Return member data, without copying where supported."""
+        return self.load_file(file_name)
+
+    @abstractmethod
+    def version(self, file_name: str) -> int:
+        """Return change token of member."""
+
+    @property
+    def meta_file(self) -> Dict[str, str]:
+        """Fetch the meta file from container."""
+        meta: List[Dict[str, str]] = [
+            json.loads(self.load_file(name))
+            for name in self.namelist()
+            if name[-13:] == META_SUFFIX
+        ]
+        return meta[0] if meta else {}
+
+    @property
+    def image_files(self) -> List[str]:
+        """Return list of image names in container."""
+        return [
+            name for name in self.namelist() if name[-4:] in IMAGE_SUFFIXES
+        ]
+
+    def get_images(self, count: int = 40) -> List[bytes]:
+        """Extract and return images as array of binary objects."""
+        image_list = self.image_files
+        image_list.sort()
+        return [
+            self.load_file(elem)
+            for index, elem in enumerate(image_list)
+            if index < count
+        ]
+
+    def _map_source(self) -> Optional[IO[bytes]]:
+        """Return open file that can be memory mapped."""
+        return None
+
+    def _mapping(self) -> Optional[mmap.mmap]:
+        """Return read only memory map of the container file."""
+        with self._map_lock:
+            source = self._map_source() if self._map is None else None
+            if source:
+                try:
+                    self._map = mmap.mmap(
+                        source.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+                except (AttributeError, OSError, ValueError) as exc:
+                    logging.debug(f"Can not map {self.filename}: {exc}")
+                    self._map = False
+            return self._map or None
+
+    def _release_mapping(self) -> None:
+        """Release the memory map unless views on it are still held."""
+        with self._map_lock:
+            container_map, self._map = self._map, None
+        if container_map:
+            try:
+                container_map.close()
+            except BufferError:
+                # Views are still held by callers, the mapping is released
+                # once the last one is garbage collected.
+                pass
+
+    def close(self) -> None:
+        """Release open resources."""
+        self._release_mapping()
+
+    def __enter__(self):
+        """Use container as context manager."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close container on leaving the context."""
+        self.close()
+
+
+class TarContainer(Container):
+    """Tar archive read through an index of member data offsets.
+
+    Members of uncompressed tars are views on the mapped file, members
+    of compressed tars are decompressed through tarfile.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Open tar file and index the offsets of its regular members."""
+        self.filename = str(path)
+        self._map_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        try:
+            self._tar = tarfile.open(self.filename, "r:")
+            self.compressed = False
+        except tarfile.ReadError:
+            self._tar = tarfile.open(self.filename, "r:*")
+            self.compressed = True
+        self._index: Dict[str, tarfile.TarInfo] = {
+            info.name: info for info in self._tar.getmembers() if info.isreg()
+        }
+
+    def namelist(self) -> List[str]:
+        """Return names of all regular members."""
+        return list(self._index)
+
+    def getinfo(self, name: str) -> tarfile.TarInfo:
+        """Return indexed header of member."""
+        if name not in self._index:
+            raise KeyError(f"There is no item named {name!r} in the archive")
+        return self._index[name]
+
+    def open(self, name: str, mode: str = "r") -> IO[bytes]:
+        """Open member as a binary stream."""
+        return self._tar.extractfile(self.getinfo(name))
+
+    @metrics.timed("archive.load_file")
+    def load_file(self, file_name: str) -> bytes:
+        """Load member by name, reads share the tar file position."""
+        with self._read_lock:
+            return super().load_file(file_name)
+
+    @metrics.timed("archive.view_file")
+    def view_file(self, file_name: str) -> Union[bytes, memoryview]:
+        """Return member of uncompressed tars as a view on the mapping."""
+        info = self.getinfo(file_name)
+        container_map = (
+            None if self.compressed or info.sparse else self._mapping()
+        )
+        if container_map is None:
+            return self.load_file(file_name)
+        end = info.offset_data + info.size
+        if end > len(container_map):
+            raise ValueError(f"Member exceeds archive: {file_name}")
+        return memoryview(container_map)[info.offset_data : end]
+
+    def version(self, file_name: str) -> int:
+        """Return change token from member time, size and offset."""
+        info = self.getinfo(file_name)
+        return member_version(info.mtime, info.size) ^ info.offset_data
+
+    def _map_source(self) -> Optional[IO[bytes]]:
+        """Return the uncompressed tar file."""
+        return (
+            None if self.compressed or self._tar.closed else self._tar.fileobj
+        )
+
+    def close(self) -> None:
+        """Close tar file and release the memory map."""
+        self._release_mapping()
+        self._tar.close()
+
+
+class DirectoryContainer(Container):
+    """Plain directory whose files are the members."""
+
+    def __init__(self, path: Union[str, Path]):
+        """List files directly inside directory."""
+        self.filename = str(path)
+        self._map_lock = threading.Lock()
+        with os.scandir(self.filename) as entries:
+            self._names = sorted(
+                entry.name for entry in entries if entry.is_file()
+            )
+
+    def namelist(self) -> List[str]:
+        """Return names of all files."""
+        return list(self._names)
+
+    def path(self, name: str) -> str:
+        """Return file system path of member."""
+        if name not in self._names:
+            raise KeyError(f"There is no item named {name!r} in the archive")
+        return os.path.join(self.filename, name)
+
+    def open(self, name: str, mode: str = "r") -> IO[bytes]:
+        """Open member file for reading."""
+        return open(self.path(name), "rb")
+
+    @metrics.timed("archive.load_file")
+    def load_file(self, file_name: str) -> bytes:
+        """Load member by name."""
+        return super().load_file(file_name)
+
+    def version(self, file_name: str) -> int:
+        """Return change token from file modification time and size."""
+        stat = os.stat(self.path(file_name))
+        return member_version(stat.st_mtime, stat.st_size)
+
+
+def open_container(path: Union[str, Path]) -> Container:
+    """Open directory, tar or zip container at path by its type."""
+    from .util import Archive
+
+    if os.path.isdir(path):
+        return DirectoryContainer(path)
+    if container_kind(path) == "tar":
+        return TarContainer(path)
+    return Archive(path)
+
+
+# =]
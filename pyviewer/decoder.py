@@ -0,0 +1,226 @@
+"""Pluggable image decoders with reduced resolution decoding."""
+
+import importlib.util
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+Bounds = Optional[Tuple[int, int]]
+ImageData = Union[bytes, memoryview]
+
+JPEG_MAGIC = b"\xff\xd8"
+VERIFY_BOUNDS = (64, 64)
+
+
+class DecodedImage(NamedTuple):
+    """Typed container presenting decoded RGB or RGBA pixels."""
+
+    width: int
+    height: int
+    mode: str
+    data: bytes
+
+
+def fit(size: Tuple[int, int], bounds: Bounds) -> Tuple[int, int]:
+    """Scale size down to fit within bounds, zero meaning unbounded."""
+    if not bounds:
+        return size
+    scale = min(
+        (bounds[0] or size[0]) / size[0],
+        (bounds[1] or size[1]) / size[1],
+        1.0,
+    )
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+class Decoder(ABC):
+    """Decode encoded images into pixels, downscaled to fit bounds."""
+
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        """Return whether the decoder can be used on this host."""
+        return True
+
+    @abstractmethod
+    def decode(self, data: ImageData, bounds: Bounds = None) -> DecodedImage:
+        """Decode image data to pixels fitting within bounds."""
+
+    def decode_qimage(self, data: ImageData, bounds: Bounds = None):
+        """Decode image data into a QImage fitting within bounds."""
+        from PySide6.QtGui import QImage
+
+        image = self.decode(data, bounds)
+        channels = len(image.mode)
+        return QImage(
+            image.data,
+            image.width,
+            image.height,
+            image.width * channels,
+            QImage.Format_RGBA8888 if channels == 4 else QImage.Format_RGB888,
+        ).copy()
+
+    def check(self, data: ImageData) -> None:
+        """Decode image data at a reduced resolution, raising if broken."""
+        self.decode(data, VERIFY_BOUNDS)
+
+    def verify(self, data: ImageData) -> bool:
+        """Check image data decodes completely at a reduced resolution."""
+        try:
+            self.check(data)
+        except Exception:
+            return False
+        return True
+
+
+class PillowDecoder(Decoder):
+    """Pillow decoder scaling JPEG images in the DCT domain via draft."""
+
+    name = "pillow"
+
+    def decode(self, data: ImageData, bounds: Bounds = None) -> DecodedImage:
+        """Decode image data to pixels fitting within bounds."""
+        from PIL import Image
+
+        image = Image.open(BytesIO(data))
+        if bounds:
+            target = fit(image.size, bounds)
+            image.draft("RGB", target)
+            image = self.resize(image, target)
+        return self.pixels(image)
+
+    @classmethod
+    def resize(cls, image, size: Tuple[int, int]):
+        """Resample image to size unless it already matches."""
+        from PIL import Image
+
+        if image.size == size:
+            return image
+        return image.resize(size, Image.BICUBIC, reducing_gap=2.0)
+
+    @classmethod
+    def pixels(cls, image) -> DecodedImage:
+        """Convert Pillow image to RGB or RGBA pixels."""
+        alpha = image.mode in ("RGBA", "LA", "PA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        image = image.convert("RGBA" if alpha else "RGB")
+        return DecodedImage(
+            image.width, image.height, image.mode, image.tobytes()
+        )
+
+
+class SimpleJpegDecoder(PillowDecoder):
+    """libjpeg-turbo decoder through simplejpeg, Pillow for other formats."""
+
+    name = "simplejpeg"
+
+    @classmethod
+    def available(cls) -> bool:
+        """Return whether simplejpeg is installed."""
+        return importlib.util.find_spec("simplejpeg") is not None
+
+    def decode(self, data: ImageData, bounds: Bounds = None) -> DecodedImage:
+        """Decode JPEG at the smallest DCT scale covering bounds."""
+        if bytes(data[:2]) != JPEG_MAGIC:
+            return super().decode(data, bounds)
+        import simplejpeg
+        from PIL import Image
+
+        height, width, _, _ = simplejpeg.decode_jpeg_header(data)
+        target = fit((width, height), bounds)
+        image = Image.fromarray(
+            simplejpeg.decode_jpeg(
+                data,
+                colorspace="RGB",
+                min_width=target[0],
+                min_height=target[1],
+            )
+        )
+        return self.pixels(self.resize(image, target))
+
+
+class QtDecoder(Decoder):
+    """Qt image reader with scaled decoding, the provider default.
+
+    Qt fills in truncated images instead of failing, so verify only
+    catches data it can not read at all.
+    """
+
+    name = "qt"
+
+    @classmethod
+    def available(cls) -> bool:
+        """Return whether PySide6 is installed."""
+        return importlib.util.find_spec("PySide6") is not None
+
+    def decode(self, data: ImageData, bounds: Bounds = None) -> DecodedImage:
+        """Decode image data to pixels fitting within bounds."""
+        from PySide6.QtGui import QImage
+
+        image = self.decode_qimage(data, bounds)
+        if image.isNull():
+            raise ValueError("Qt failed to decode image.")
+        alpha = image.hasAlphaChannel()
+        image = image.convertToFormat(
+            QImage.Format_RGBA8888 if alpha else QImage.Format_RGB888
+        )
+        channels = 4 if alpha else 3
+        pixels = bytes(image.constBits())
+        stride = image.bytesPerLine()
+        row = image.width() * channels
+        if stride != row:
+            pixels = b"".join(
+                pixels[line * stride : line * stride + row]
+                for line in range(image.height())
+            )
+        return DecodedImage(
+            image.width(), image.height(), "RGBA" if alpha else "RGB", pixels
+        )
+
+    def decode_qimage(self, data: ImageData, bounds: Bounds = None):
+        """Decode image data into a QImage fitting within bounds."""
+        from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt
+        from PySide6.QtGui import QImageReader
+
+        buffer = QBuffer()
+        buffer.setData(QByteArray(bytes(data)))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+        size = reader.size()
+        if size.isValid() and bounds:
+            target = fit((size.width(), size.height()), bounds)
+            if target != (size.width(), size.height()):
+                reader.setScaledSize(
+                    size.scaled(QSize(*target), Qt.KeepAspectRatio)
+                )
+        return reader.read()
+
+
+DECODERS: Dict[str, type] = {
+    decoder.name: decoder
+    for decoder in (SimpleJpegDecoder, PillowDecoder, QtDecoder)
+}
+_INSTANCES: Dict[str, Decoder] = {}
+
+
+def available_decoders() -> List[str]:
+    """Return names of decoders usable on this host, preferred first."""
+    return [name for name, decoder in DECODERS.items() if decoder.available()]
+
+
+def get_decoder(name: str = "auto") -> Decoder:
+    """Return shared decoder by name, auto picking the preferred one."""
+    if name == "auto":
+        name = available_decoders()[0]
+    if name not in DECODERS:
+        raise ValueError(f"Unknown decoder: {name}")
+    if not DECODERS[name].available():
+        raise ValueError(f"Decoder {name} is not available on this host.")
+    if name not in _INSTANCES:
+        _INSTANCES[name] = DECODERS[name]()
+    return _INSTANCES[name]
+
+
+# =]
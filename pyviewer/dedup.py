@@ -0,0 +1,187 @@
+"""Duplicate detection from exact and perceptual image hashes."""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .hashing import hamming
+
+
+class BKNode:
+    """Node of a BK-tree holding all items with the same hash."""
+
+    __slots__ = ("value", "items", "children")
+
+    def __init__(self, value: int, item: Any):
+        """Create leaf node for value."""
+        self.value = value
+        self.items = [item]
+        self.children: Dict[int, "BKNode"] = {}
+
+
+class BKTree:
+    """Metric tree answering Hamming radius queries over integer hashes."""
+
+    def __init__(self):
+        """Create empty tree."""
+        self._root: Optional[BKNode] = None
+        self._size = 0
+
+    def add(self, value: int, item: Any) -> None:
+        """Insert item under hash value."""
+        self._size += 1
+        if self._root is None:
+            self._root = BKNode(value, item)
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node.value)
+            if not distance:
+                node.items.append(item)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = BKNode(value, item)
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, Any]]:
+        """Return distance and item of all entries within radius."""
+        found: List[Tuple[int, Any]] = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node.value)
+            if distance <= radius:
+                found.extend((distance, item) for item in node.items)
+            stack.extend(
+                child
+                for edge, child in node.children.items()
+                if distance - radius <= edge <= distance + radius
+            )
+        return found
+
+    def __len__(self) -> int:
+        """Number of items in the tree."""
+        return self._size
+
+
+class DuplicateIndex:
+    """Cluster images sharing a content hash or a close perceptual hash."""
+
+    def __init__(self, distance: int = 4):
+        """Create empty index joining perceptual hashes within distance."""
+        self.distance = distance
+        self._parent: Dict[str, str] = {}
+        self._exact: Dict[str, str] = {}
+        self._tree = BKTree()
+
+    def add(
+        self, key: str, digest: Optional[str], perceptual: Optional[str]
+    ) -> None:
+        """Add image key with its content and perceptual hash."""
+        self._parent.setdefault(key, key)
+        if digest:
+            self._union(key, self._exact.setdefault(digest, key))
+        if perceptual:
+            value = int(perceptual, 16)
+            for _, other in self._tree.search(value, self.distance):
+                self._union(key, other)
+            self._tree.add(value, key)
+
+    def _find(self, key: str) -> str:
+        """Return cluster representative of key with path halving."""
+        while self._parent[key] != key:
+            self._parent[key] = self._parent[self._parent[key]]
+            key = self._parent[key]
+        return key
+
+    def _union(self, key: str, other: str) -> None:
+        """Join the clusters of key and other."""
+        root, other_root = self._find(key), self._find(other)
+        if root != other_root:
+            self._parent[max(root, other_root)] = min(root, other_root)
+
+    def groups(self) -> List[List[str]]:
+        """Return clusters with more than one image in key order."""
+        clusters: Dict[str, List[str]] = {}
+        for key in self._parent:
+            clusters.setdefault(self._find(key), []).append(key)
+        return sorted(
+            sorted(keys) for keys in clusters.values() if len(keys) > 1
+        )
+
+    def clusters(self) -> Dict[str, int]:
+        """Return cluster number of every image that has duplicates."""
+        return {
+            key: number
+            for number, keys in enumerate(self.groups())
+            for key in keys
+        }
+
+    def write_report(self, report: Path) -> List[List[str]]:
+        """Write one JSON line per duplicate cluster and return them."""
+        groups = self.groups()
+        with open(report, mode="w", encoding="utf8") as file:
+            for number, keys in enumerate(groups):
+                file.write(
+                    json.dumps({"cluster": number, "files": keys}) + "\n"
+                )
+        return groups
+
+
+def index_sources(
+    sources: Iterable[Tuple[Any, List[str]]],
+    perceptual: str = "dhash",
+    distance: int = 4,
+) -> DuplicateIndex:
+    """Hash images under the tags of each browser and cluster them."""
+    index = DuplicateIndex(distance)
+    for browser, tags in sources:
+        entries = list(
+            dict.fromkeys(
+                entry for tag in tags for entry in browser.files_at_tag(tag)
+            )
+        )
+        logging.info(f"Hashing {len(entries)} images for duplicates.")
+        digests = browser.hash_entries(entries)
+        similar = browser.hash_entries(entries, perceptual)
+        for entry in entries:
+            key = browser.entry_key(entry)
+            index.add(key, digests.get(key), similar.get(key))
+    return index
+
+
+class DuplicateFilter:
+    """Hide images whose duplicate cluster was already shown.
+
+    Filtering has no side effects, a cluster only counts as shown once
+    one of its images is displayed and passed to mark_shown.
+    """
+
+    def __init__(self, clusters: Dict[str, int]):
+        """Create filter over the cluster number of each image key."""
+        self.clusters = clusters
+        self.shown: Dict[int, str] = {}
+
+    def unseen(self, entries: Iterable[Any], key: Callable) -> List[Any]:
+        """Return first members of clusters not shown under other keys."""
+        kept = []
+        first: Dict[int, str] = dict(self.shown)
+        for entry in entries:
+            name = key(entry)
+            cluster = self.clusters.get(name)
+            if cluster is not None:
+                if first.setdefault(cluster, name) != name:
+                    continue
+            kept.append(entry)
+        return kept
+
+    def mark_shown(self, name: str) -> None:
+        """Record image key as displayed, hiding its duplicates from now."""
+        cluster = self.clusters.get(name)
+        if cluster is not None:
+            self.shown.setdefault(cluster, name)
+
+
+# =]
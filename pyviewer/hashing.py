@@ -0,0 +1,242 @@
+"""Content hashes of images cached in the state store."""
+
+import os
+import re
+import math
+import hashlib
+import logging
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from .container import Container, open_container
+
+HASH_ALGORITHMS = ("md5", "sha1", "blake2b", "xxh3")
+PERCEPTUAL_HASHES = ("dhash", "phash")
+MD5_NAME = re.compile(r"[0-9a-f]{32}")
+DCT_SIZE = 32
+DCT_KEEP = 8
+DCT_COSINES = [
+    [
+        math.cos(math.pi * (2 * index + 1) * frequency / (2 * DCT_SIZE))
+        for index in range(DCT_SIZE)
+    ]
+    for frequency in range(DCT_KEEP)
+]
+
+
+def grayscale(data: bytes, size: Tuple[int, int]) -> List[int]:
+    """Decode image and return its pixels downscaled to size in grayscale."""
+    from PIL import Image
+
+    image = Image.open(BytesIO(data))
+    image.draft("L", (size[0] * 4, size[1] * 4))
+    return list(
+        image.convert("L").resize(size, Image.BILINEAR).tobytes()
+    )
+
+
+def dhash(data: bytes, size: int = 8) -> int:
+    """Difference hash comparing horizontally adjacent pixels."""
+    pixels = grayscale(data, (size + 1, size))
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            value = value << 1 | (left > pixels[row * (size + 1) + col + 1])
+    return value
+
+
+def phash(data: bytes) -> int:
+    """DCT hash comparing low frequencies of the image with their median."""
+    pixels = grayscale(data, (DCT_SIZE, DCT_SIZE))
+    rows = [
+        [
+            sum(c * p for c, p in zip(cosines, pixels[y * DCT_SIZE :]))
+            for cosines in DCT_COSINES
+        ]
+        for y in range(DCT_SIZE)
+    ]
+    coefficients = [
+        sum(cosines[y] * rows[y][u] for y in range(DCT_SIZE))
+        for cosines in DCT_COSINES
+        for u in range(DCT_KEEP)
+    ][1:]
+    median = sorted(coefficients)[len(coefficients) // 2]
+    value = 0
+    for coefficient in coefficients:
+        value = value << 1 | (coefficient > median)
+    return value
+
+
+def hamming(left: int, right: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(left ^ right).count("1")
+
+
+def hasher(algorithm: str) -> Callable[[bytes], str]:
+    """Return function computing the hex digest of data for algorithm."""
+    if algorithm == "dhash":
+        return lambda data: f"{dhash(data):016x}"
+    if algorithm == "phash":
+        return lambda data: f"{phash(data):016x}"
+    if algorithm == "xxh3":
+        try:
+            import xxhash
+        except ImportError as exc:
+            raise ValueError("Hash xxh3 requires the xxhash package.") from exc
+        return lambda data: xxhash.xxh3_128_hexdigest(data)
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+    return lambda data: hashlib.new(algorithm, data).hexdigest()
+
+
+def hash_archive(
+    path: str,
+    members: List[str],
+    algorithm: str,
+    cached: Dict[str, Tuple[int, str]],
+) -> List[Tuple[str, int, str, bool]]:
+    """Return member, CRC, digest and whether it was computed."""
+    digest = hasher(algorithm)
+    results: List[Tuple[str, int, str, bool]] = []
+    try:
+        with open_container(path) as archive:
+            for member in members:
+                crc = archive.version(member)
+                if member in cached and cached[member][0] == crc:
+                    results.append((member, crc, cached[member][1], False))
+                    continue
+                try:
+                    data = archive.view_file(member)
+                    results.append((member, crc, digest(data), True))
+                except Exception as exc:
+                    logging.warning(f"Failed to hash {path}/{member}: {exc}")
+    except Exception as exc:
+        logging.warning(f"Failed to hash archive {path}: {exc}")
+    return results
+
+
+def hash_file(path: str, algorithm: str) -> Tuple[str, int, str]:
+    """Return path, modification time and digest of file."""
+    with open(path, "rb") as file:
+        return (
+            path,
+            os.fstat(file.fileno()).st_mtime_ns,
+            hasher(algorithm)(file.read()),
+        )
+
+
+class HashService:
+    """Compute image digests once and reuse them from the state store."""
+
+    def __init__(self, store, algorithm: str = "md5", workers: int = None):
+        """Attach store holding cached digests and validate algorithm."""
+        self.store = store
+        self.algorithm = algorithm
+        self.workers = workers or os.cpu_count() or 1
+        self.digest = hasher(algorithm)
+
+    def member_hash(self, archive: Container, member: str) -> str:
+        """Return digest of archive member, validated by its version."""
+        path = str(archive.filename)
+        crc = archive.version(member)
+        cached = self.store.content_hash(path, member, self.algorithm)
+        if cached and cached[0] == crc:
+            return cached[1]
+        digest = self.digest(archive.view_file(member))
+        self.store.save_content_hashes(
+            path, self.algorithm, [(member, crc, digest)]
+        )
+        return digest
+
+    def file_hash(self, path: Union[str, Path]) -> str:
+        """Return digest of file, using the md5 in its name when possible."""
+        path = Path(path)
+        if self.algorithm == "md5" and MD5_NAME.fullmatch(path.stem):
+            return path.stem
+        mtime = os.stat(path).st_mtime_ns
+        cached = self.store.content_hash(str(path), "", self.algorithm)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        _, mtime, digest = hash_file(str(path), self.algorithm)
+        self.store.save_content_hashes(
+            str(path), self.algorithm, [("", mtime, digest)]
+        )
+        return digest
+
+    def hash_members(
+        self, entries: Iterable[Tuple[Union[str, Path], str]]
+    ) -> Dict[Tuple[str, str], str]:
+        """Hash archive members in parallel, one archive per task."""
+        by_archive: Dict[str, List[str]] = {}
+        for archive, member in entries:
+            by_archive.setdefault(str(archive), []).append(member)
+        digests: Dict[Tuple[str, str], str] = {}
+        computed = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                path: pool.submit(
+                    hash_archive,
+                    path,
+                    members,
+                    self.algorithm,
+                    self.store.content_hashes(path, self.algorithm),
+                )
+                for path, members in by_archive.items()
+            }
+            for path, future in futures.items():
+                fresh = []
+                for member, crc, digest, new in future.result():
+                    digests[(path, member)] = digest
+                    if new:
+                        fresh.append((member, crc, digest))
+                self.store.save_content_hashes(path, self.algorithm, fresh)
+                computed += len(fresh)
+        logging.info(
+            f"Hashed {len(digests)} members in {len(by_archive)} archives,"
+            + f" {computed} not cached."
+        )
+        return digests
+
+    def hash_files(
+        self, paths: Iterable[Union[str, Path]]
+    ) -> Dict[str, Optional[str]]:
+        """Hash files in parallel, using the md5 in names when possible."""
+        digests: Dict[str, Optional[str]] = {}
+        pending: List[str] = []
+        for path in map(Path, paths):
+            if self.algorithm == "md5" and MD5_NAME.fullmatch(path.stem):
+                digests[str(path)] = path.stem
+                continue
+            cached = self.store.content_hash(str(path), "", self.algorithm)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if cached and cached[0] == mtime:
+                digests[str(path)] = cached[1]
+            else:
+                pending.append(str(path))
+        if not pending:
+            return digests
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                path: pool.submit(hash_file, path, self.algorithm)
+                for path in pending
+            }
+            for path, future in futures.items():
+                try:
+                    _, mtime, digest = future.result()
+                except Exception as exc:
+                    logging.warning(f"Failed to hash file {path}: {exc}")
+                    digests[path] = None
+                    continue
+                digests[path] = digest
+                self.store.save_content_hashes(
+                    path, self.algorithm, [("", mtime, digest)]
+                )
+        return digests
+
+
+# =]
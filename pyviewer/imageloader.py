@@ -1,151 +1,450 @@
 """File system interface that manages and retrieves media."""
 
 import os
-import glob
 import atexit
-import hashlib
 import logging
+import threading
+import weakref
+from math import ceil
 from pathlib import Path
-from typing import List, Dict, Tuple
-from functools import cached_property
-import psycopg2
-from io import BytesIO
-from PIL import Image
-from .util import Archive, TagManager
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from .util import ArchivePool, TagManager
+from .indexer import (
+    ArchiveRecord,
+    TagIndexer,
+    discover_archives,
+    media_roots,
+)
+from .container import container_stat
+from .statestore import StateStore
+from .hashing import HashService
+from .dedup import DuplicateFilter
+from .rendition import rendition_key
+from .metrics import metrics
 
 
 class ArchiveBrowser(TagManager):
     """Archive manager for loading and organizing images with tag filters."""
 
+    decoder = "auto"
+
     def __init__(
         self,
-        media_dir: Path,
+        media_dir: Union[Path, Iterable[Path]],
         state_file: Path = Path("pyviewer.state"),
         tags: List[str] = [],
         reload: bool = False,
+        max_open: int = 32,
+        workers: int = None,
+        hash_algorithm: str = "md5",
+        skip_duplicates: bool = False,
     ):
-        """Create empty media handler."""
-        state_data = TagManager.load_state(state_file)
-        if str(media_dir) not in state_data.tag_map or reload:
-            state_data.tag_map[str(media_dir)] = self.load_tag_map(
-                media_dir, selected_tags=tags
+        """Create media handler for one or several media directories."""
+        self._archives = ArchivePool(max_open)
+        self._listings: Dict[str, Tuple[float, int, List[str]]] = {}
+        self._warmed: Set[str] = set()
+        self._warmer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="listing"
+        )
+        self._store = StateStore(state_file)
+        self.hasher = HashService(self._store, hash_algorithm, workers)
+        self.duplicates = (
+            DuplicateFilter(self._store.load_duplicates())
+            if skip_duplicates
+            else None
+        )
+        root = self._root = os.pathsep.join(media_roots(media_dir))
+        self._records = self._store.load_archive_index(root)
+        tag_map = None if reload else self._store.load_tag_map(root)
+        if tag_map is None:
+            self._records = self.index_archives(
+                media_dir, self._records, workers
+            )
+            self._store.save_archive_index(root, self._records)
+            tag_map = self.load_tag_map(
+                media_dir, selected_tags=tags, records=self._records
             )
+            self._store.save_tag_map(root, tag_map)
         super().__init__(
-            tag_map=state_data.tag_map[str(media_dir)],
-            tag_filter=state_data.tag_filter,
+            tag_map=tag_map,
+            tag_filter=self._store.load_filter(),
             tag_selection=tags,
+            store=self._store,
         )
-        atexit.register(
-            self.save_state, file_path=state_file, media_path=media_dir
-        )
+        atexit.register(self.save_state)
+        atexit.register(self._archives.close)
+        atexit.register(self._warmer.shutdown, wait=False)
+
+    @classmethod
+    def index_archives(
+        cls,
+        media_dir: Union[Path, Iterable[Path]],
+        records: Dict[str, ArchiveRecord] = None,
+        workers: int = None,
+    ) -> Dict[str, ArchiveRecord]:
+        """Scan new or modified archives and drop records of deleted ones."""
+        roots = media_roots(media_dir)
+        logging.info(f"Indexing archives in: {', '.join(roots)}")
+        return TagIndexer(workers).update(discover_archives(roots), records)
 
     @classmethod
     def load_tag_map(
-        cls, media_dir: Path, selected_tags: List[str] = None
+        cls,
+        media_dir: Union[Path, Iterable[Path]],
+        selected_tags: List[str] = None,
+        records: Dict[str, ArchiveRecord] = None,
     ) -> Dict[str, Tuple[str, ...]]:
         """Find archives and generate association map for each tag."""
         logging.info(f"Regenerating tag map for: {media_dir}")
-        meta_list: Dict[str, Tuple[str, ...]] = {}
-        for archive in glob.glob(os.path.join(str(media_dir), "*.zip")):
-            logging.info(f"Found archive: {archive}")
-            meta_data = Archive(archive).meta_file
-            tags = (
-                meta_data["artist"]
-                if "artist" in meta_data and len(meta_data["artist"]) <= 3
-                else []
+        if records is None:
+            records = cls.index_archives(media_dir)
+        return TagIndexer.tag_map(records, selected_tags)
+
+    def update_archives(self, paths: Iterable[str]) -> List[str]:
+        """Re-index changed archives and return the tags they affect.
+
+        Removed directories also drop the archives that were below them.
+        """
+        paths = {str(path) for path in paths}
+        removed = [
+            os.path.join(path, "")
+            for path in paths
+            if not os.path.exists(path)
+        ]
+        if removed:
+            paths.update(
+                path
+                for path in self._records
+                if path.startswith(tuple(removed))
             )
-            for tag in tags:
-                if "|" in tag:
-                    for sub_tag in tag.split("|"):
-                        sub_tag.strip()
-                        if (
-                            sub_tag in meta_list
-                            and archive not in meta_list[sub_tag]
-                        ):
-                            meta_list[sub_tag] = (archive,) + meta_list[
-                                sub_tag
-                            ]
-                        elif sub_tag not in meta_list:
-                            meta_list[sub_tag] = (archive,)
-                else:
-                    tag.strip()
-                    if tag in meta_list and archive not in meta_list[tag]:
-                        meta_list[tag] = (archive,) + meta_list[tag]
-                    elif tag not in meta_list:
-                        meta_list[tag] = (archive,)
-        return (
-            meta_list
-            if not selected_tags
-            else {
-                elem: meta_list[elem]
-                for elem in selected_tags
-                if elem in meta_list
+        paths = sorted(paths)
+        present = [path for path in paths if os.path.exists(path)]
+        records = TagIndexer(1).update(
+            present,
+            {
+                path: self._records[path]
+                for path in present
+                if path in self._records
+            },
+        )
+        changes: Dict[str, Optional[ArchiveRecord]] = {}
+        tag_values: Dict[str, Tuple[str, ...]] = {}
+        affected: Set[str] = set()
+        for path in paths:
+            old, new = self._records.pop(path, None), records.get(path)
+            if new:
+                self._records[path] = new
+            if old == new:
+                continue
+            changes[path] = new
+            self._archives.discard(path)
+            self._listings.pop(path, None)
+            old_tags = set(old.tags) if old else set()
+            new_tags = set(new.tags) if new else set()
+            affected.update(old_tags | new_tags)
+            for tag in old_tags - new_tags:
+                values = tag_values.get(tag, self._tag_map.get(tag, ()))
+                tag_values[tag] = tuple(
+                    elem for elem in values if elem != path
+                )
+            for tag in new_tags - old_tags:
+                values = tag_values.get(tag, self._tag_map.get(tag, ()))
+                tag_values[tag] = (path,) + values
+        if self._selection:
+            affected.intersection_update(self._selection)
+            tag_values = {
+                tag: values
+                for tag, values in tag_values.items()
+                if tag in affected
             }
+        if not changes:
+            return []
+        logging.info(
+            f"Updated {len(changes)} archives affecting {len(affected)} tags."
         )
+        self._store.update_archive_index(self._root, changes)
+        self._store.save_tag_values(self._root, tag_values)
+        if self.tag in affected:
+            self.reset_files()
+        self.update_tag_map(tag_values)
+        self._warmed.difference_update(affected)
+        self.release_files(keep=self._resolved.keys() - affected)
+        return sorted(affected)
 
-    def validate_all(self) -> bool:
+    def validate_all(self, report: Path = None, workers: int = None) -> bool:
         """Check all archives for broken images."""
-        return any(self.validate_tag(tag) for tag in self._tag_map.keys())
+        from .validation import ArchiveValidator
+
+        paths = list(self._records) + [
+            path for tag in self._tag_map for path in self._tag_map[tag]
+        ]
+        return bool(
+            ArchiveValidator(report, workers, self.decoder).validate(paths)
+        )
 
-    def validate_tag(self, tag_string: str) -> bool:
+    def validate_tag(
+        self, tag_string: str, report: Path = None, workers: int = None
+    ) -> bool:
         """Check for any broken archives under tag."""
-        error_flag = False
-        logging.info(f"Validating archives: {tag_string}")
-        for path in self._tag_map[tag_string]:
-            archive = Archive(path)
-            if any(
-                self.validate_image(archive.load_file(file))
-                for file in archive.image_files
-            ):
-                logging.warning(f"Found broken image: {path}")
-                error_flag = True
-        return error_flag
+        from .validation import ArchiveValidator
 
-    @classmethod
-    def validate_image(cls, image_data: bytes) -> bool:
-        """Check if image data is broken."""
-        try:
-            Image.open(BytesIO(image_data)).verify()
-        except Exception:
-            return False
-        return True
+        logging.info(f"Validating archives: {tag_string}")
+        return bool(
+            ArchiveValidator(report, workers, self.decoder).validate(
+                self._tag_map[tag_string]
+            )
+        )
 
     @property
     def count(self) -> int:
         """File count."""
         return len(self.files)
 
-    @cached_property
-    def files(self) -> List[Tuple[Path, str]]:
-        """Extract archives associated with active tag."""
-        logging.info(f"Loading archive: {self.value}.")
+    @metrics.timed("archive.files")
+    def load_files(self, tag: str) -> List[Tuple[Path, str]]:
+        """Extract archives associated with tag."""
+        logging.info(f"Loading archive: {self._tag_map.get(tag, ())}.")
+        files = self.resolved_files(tag)
+        if self.duplicates:
+            files = self.duplicates.unseen(files, self.entry_key)
+        self.warm_listings()
+        return files
+
+    def files_at_tag(self, tag: str) -> List[Tuple[Path, str]]:
+        """Return image members of all archives associated with tag."""
         return [
             (Path(path), elem)
-            for path in self.value
-            for elem in Archive(path).image_files
+            for path in self._tag_map.get(tag, ())
+            for elem in self.image_files(path)
         ]
 
+    def image_files(self, path: str) -> List[str]:
+        """Return image members of archive using the listing cache."""
+        mtime, size = container_stat(path)
+        listing = self._listings.get(path) or self._store.image_files(path)
+        if listing and listing[0] == mtime and listing[1] == size:
+            self._listings[path] = listing
+            return listing[2]
+        self._archives.discard(path)
+        with self._archives.lease(path) as archive:
+            members = archive.image_files
+        self._listings[path] = (mtime, size, members)
+        self._store.save_image_files(path, mtime, size, members)
+        return members
+
+    def warm_listings(self, radius: int = 1) -> None:
+        """Cache member listings of tags adjacent to the index.
+
+        Tags are warmed once while they stay adjacent, so listings of a tag
+        visited again are checked against the archives on disk.
+        """
+        tags = self.adjacent_tags(radius)
+        self._warmed.intersection_update(tags)
+        for tag in tags:
+            if tag not in self._warmed:
+                self._warmed.add(tag)
+                self._warmer.submit(self._warm_tag, tag)
+
+    def _warm_tag(self, tag: str) -> None:
+        """Load member listings for archives under tag."""
+        for path in self._tag_map.get(tag, ()):
+            try:
+                self.image_files(path)
+            except Exception as exc:
+                logging.warning(f"Failed to list archive {path}: {exc}")
+
     def hash(self, image_index: int = 0) -> str:
         """Return image hash at index."""
-        if self.count:
-            archive, file = self.files[image_index % self.count]
-            return hashlib.md5(Archive(archive).load_file(file)).hexdigest()
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            path, file = entry
+            with self._archives.lease(path) as archive:
+                return self.hasher.member_hash(archive, file)
         return ""
 
-    def image(self, image_index: int = 0) -> bytes:
+    def hash_entries(
+        self, entries: Iterable[Tuple[Path, str]], algorithm: str = None
+    ) -> Dict[str, str]:
+        """Return digests of archive members, hashed in parallel."""
+        hasher = (
+            HashService(self._store, algorithm, self.hasher.workers)
+            if algorithm and algorithm != self.hasher.algorithm
+            else self.hasher
+        )
+        return {
+            self.entry_key(entry): digest
+            for entry, digest in hasher.hash_members(entries).items()
+        }
+
+    def hash_tag(self, tag: str = None) -> Dict[str, str]:
+        """Return digests of all images under tag, hashed in parallel."""
+        return self.hash_entries(
+            self.files if tag is None else self.files_at_tag(tag)
+        )
+
+    @metrics.timed("archive.image")
+    def image(self, image_index: int = 0) -> Union[bytes, memoryview]:
         """Return image at index."""
-        if self.count:
-            archive, file = self.files[image_index % self.count]
-            return Archive(archive).load_file(file)
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            return self.load_image(entry)
         return bytes()
 
+    def load_image(self, entry: Tuple[Path, str]) -> Union[bytes, memoryview]:
+        """Load image data for archive member, stored ones without copies."""
+        path, file = entry
+        with self._archives.lease(path) as archive:
+            return archive.view_file(file)
+
     def path(self, image_index: int = 0) -> str:
         """Return file path at index."""
-        if self.count:
-            archive, file = self.files[image_index % self.count]
-            return f"{archive}/{file}"
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            return self.entry_key(entry)
+        return ""
+
+    @classmethod
+    def entry_key(cls, entry: Tuple[Path, str]) -> str:
+        """Return name identifying an archive member across sources."""
+        return f"{entry[0]}/{entry[1]}"
+
+    @classmethod
+    def entry_source(cls, entry: Tuple[Path, str]) -> Tuple[str, str]:
+        """Return container path and member read by decode workers."""
+        return str(entry[0]), entry[1]
+
+    def rendition_key(self, image_index: int = 0) -> str:
+        """Return cache key derived from archive, member and its version."""
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            return self.entry_rendition_key(entry)
         return ""
 
+    def entry_rendition_key(self, entry: Tuple[Path, str]) -> str:
+        """Return cache key of archive member from its version."""
+        path, file = entry
+        with self._archives.lease(path) as archive:
+            version = archive.version(file)
+        return rendition_key(path, file, version)
+
+    def sheet_collection(
+        self, tag: str, pages: int = 4, count: int = 240
+    ) -> List[List[Tuple[Path, str]]]:
+        """Return first pages of each archive under tag, up to count."""
+        collection = []
+        for path in self._tag_map.get(tag, ())[: ceil(count / pages)]:
+            try:
+                members = self.image_files(path)[:pages]
+            except Exception as exc:
+                logging.warning(f"Failed to list archive {path}: {exc}")
+                continue
+            collection.append([(Path(path), elem) for elem in members])
+        return collection
+
+
+BOORU_DATABASE = {"dbname": "danbooru2", "user": "lbl11", "password": ""}
+
+POST_CONDITION = (
+    "WHERE tag_index @@ {}::tsquery "
+    + "AND 'jpg png jpeg JPG PNG JPEG'::tsvector @@ to_tsquery(file_ext)"
+)
+
+ARTIST_TAGS_QUERY = (
+    "SELECT id, name, post_count FROM tags "
+    + "WHERE category = 1 AND post_count >= 25;"
+)
+
+PREPARED_STATEMENTS = {
+    "pyviewer_tags": "SELECT id, name, post_count FROM tags "
+    + "WHERE name = ANY($1) AND category = 1 AND post_count >= 10",
+    "pyviewer_count": "SELECT COUNT(*) FROM posts "
+    + POST_CONDITION.format("$1"),
+    "pyviewer_files": "SELECT id, md5, file_ext FROM posts "
+    + POST_CONDITION.format("$1")
+    + " AND ($2::bigint IS NULL OR id < $2) ORDER BY id DESC LIMIT $3",
+}
+POOL_TIMEOUT = 30.0
+
+
+def tsquery(tag: str) -> str:
+    """Quote tag as a single tsquery lexeme."""
+    return "'{}'".format(tag.replace("\\", "\\\\").replace("'", "''"))
+
+
+class PagedFiles(Sequence):
+    """File list fetched page by page as the index nears the loaded end.
+
+    Each page is requested with the id of the last row loaded, so no
+    database connection is held between pages.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Optional[Callable[[Optional[int], int], List[tuple]]],
+        count: int,
+        file_path: Callable[[str, str], Path],
+        page_size: int = 200,
+    ):
+        """Wrap page query that yields id, md5 and file extension rows."""
+        self._fetch_page = fetch_page
+        self._last_id: Optional[int] = None
+        self._count = count
+        self._file_path = file_path
+        self._files: List[Path] = []
+        self.page_size = page_size
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of files matched by the query."""
+        return self._count
+
+    def __getitem__(self, index: int) -> Path:
+        """Return file at index fetching pages as the index nears the end.
+
+        Indexes past the rows the query returned raise IndexError, with the
+        count reduced to the rows actually found.
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        with self._lock:
+            self._fetch(index + self.page_size // 2)
+            if index >= len(self._files):
+                self._count = len(self._files)
+                raise IndexError(index)
+            return self._files[index]
+
+    def _fetch(self, index: int) -> None:
+        """Fetch pages until index is loaded or the query is exhausted."""
+        while self._fetch_page and index >= len(self._files):
+            rows = self._fetch_page(self._last_id, self.page_size)
+            self._files.extend(
+                self._file_path(md5, file_ext) for _, md5, file_ext in rows
+            )
+            if rows:
+                self._last_id = rows[-1][0]
+            if len(rows) < self.page_size:
+                self._fetch_page = None
+                self._count = len(self._files)
+
+    @property
+    def loaded(self) -> int:
+        """Number of files fetched so far."""
+        return len(self._files)
+
 
 class BooruBrowser(TagManager):
     """Booru manager for loading and organizing images with tag filters."""
@@ -156,126 +455,243 @@ class BooruBrowser(TagManager):
         state_file: Path = Path("pyviewer.state"),
         tags: List[str] = None,
         reload: bool = False,
+        page_size: int = 200,
+        pool_size: int = 8,
+        hash_algorithm: str = "md5",
+        skip_duplicates: bool = False,
     ):
         """Connect to PG database on creation."""
         self._data_root = "/mnt/media/Media/booru_archive/data/original"
-        self.pgdb = psycopg2.connect(
-            dbname="danbooru2",
-            user="lbl11",
-            password="",
-            host=media_host,
+        self.page_size = page_size
+        self.media_host = media_host
+        self._prepared: "weakref.WeakSet" = weakref.WeakSet()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self.pool = self._connect(pool_size)
+        self._store = StateStore(state_file)
+        self.hasher = HashService(self._store, hash_algorithm)
+        self.duplicates = (
+            DuplicateFilter(self._store.load_duplicates())
+            if skip_duplicates
+            else None
         )
-        state_data = TagManager.load_state(state_file)
-        if str(media_host) not in state_data.tag_map or reload:
-            state_data.tag_map[str(media_host)] = self.load_tag_map(
-                selected_tags=tags
-            )
+        root = str(media_host)
+        tag_map = None if reload else self._store.load_tag_map(root)
+        if tag_map is None:
+            tag_map = self.load_tag_map(selected_tags=tags)
+            self._store.save_tag_map(root, tag_map)
         super().__init__(
-            tag_map=state_data.tag_map[str(media_host)],
-            tag_filter=state_data.tag_filter,
+            tag_map=tag_map,
+            tag_filter=self._store.load_filter(),
             tag_selection=tags,
+            store=self._store,
+        )
+        atexit.register(self.save_state)
+        atexit.register(self.close)
+
+    def _connect(self, pool_size: int):
+        """Create pool of connections to the booru database."""
+        from psycopg2.pool import ThreadedConnectionPool
+
+        return ThreadedConnectionPool(
+            1, pool_size, host=self.media_host, **BOORU_DATABASE
         )
 
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.pool.closeall()
+
+    @contextmanager
+    def connection(self):
+        """Borrow pooled connection with the prepared statements in place."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _acquire(self):
+        """Take connection from pool and prepare statements once.
+
+        Waits up to POOL_TIMEOUT for a connection to be returned, as the
+        pool raises instead of blocking once all connections are in use.
+        """
+        if not self._slots.acquire(timeout=POOL_TIMEOUT):
+            raise TimeoutError("No booru connection became available.")
+        try:
+            conn = self.pool.getconn()
+            try:
+                if conn not in self._prepared:
+                    with conn.cursor() as cursor:
+                        for name, query in PREPARED_STATEMENTS.items():
+                            cursor.execute(f"PREPARE {name} AS {query}")
+                    conn.commit()
+                    self._prepared.add(conn)
+            except Exception:
+                # Statements may be prepared in part, so the connection is
+                # closed rather than handed out again.
+                self.pool.putconn(conn, close=True)
+                raise
+        except Exception:
+            self._slots.release()
+            raise
+        return conn
+
+    def _release(self, conn) -> None:
+        """End read transaction and return connection to pool."""
+        try:
+            if not conn.closed:
+                conn.rollback()
+            self.pool.putconn(conn)
+        finally:
+            self._slots.release()
+
     @property
     def count(self) -> int:
         """File count."""
         return len(self.files)
 
-    @cached_property
-    def files(self) -> List[Path]:
-        """Extract archives associated with active tag."""
-        return self.files_at_tag(self.tag, self.value[1])
+    def load_files(self, tag: str) -> Union[PagedFiles, List[Path]]:
+        """Extract media associated with tag."""
+        files = self.resolved_files(tag)
+        if self.duplicates:
+            return self.duplicates.unseen(files, self.entry_key)
+        return files
 
     def hash(self, image_index: int = 0) -> str:
         """Return image hash at index."""
-        if self.count:
-            with open(self.files[image_index % self.count], "rb") as file:
-                return hashlib.md5(file.read()).hexdigest()
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            return self.hasher.file_hash(entry)
         return ""
 
+    def hash_entries(
+        self, entries: Iterable[Path], algorithm: str = None
+    ) -> Dict[str, Optional[str]]:
+        """Return digests of files, md5 taken from names where possible."""
+        hasher = (
+            HashService(self._store, algorithm)
+            if algorithm and algorithm != self.hasher.algorithm
+            else self.hasher
+        )
+        return hasher.hash_files(entries)
+
+    def hash_tag(self, tag: str = None) -> Dict[str, Optional[str]]:
+        """Return digests of all images under tag."""
+        return self.hash_entries(
+            self.files if tag is None else self.files_at_tag(tag)
+        )
+
+    @classmethod
+    def entry_key(cls, entry: Path) -> str:
+        """Return name identifying a post image across sources."""
+        return str(entry)
+
+    @classmethod
+    def entry_source(cls, entry: Path) -> Tuple[str, str]:
+        """Return file path read by decode workers."""
+        return str(entry), ""
+
     def image(self, image_index: int = 0) -> bytes:
         """Return image at index."""
-        if self.count:
-            return self.load_image(self.files[image_index % self.count])
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            return self.load_image(entry)
         return bytes()
 
     def path(self, image_index: int = 0) -> Path:
         """Return file path at index."""
-        if self.count:
-            return self.files[image_index % self.count]
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            return entry
         return Path()
 
+    def rendition_key(self, image_index: int = 0) -> str:
+        """Return cache key derived from the md5 in the file name."""
+        entry = self.entry_at(image_index)
+        if entry is not None:
+            return self.entry_rendition_key(entry)
+        return ""
+
+    @classmethod
+    def entry_rendition_key(cls, entry: Path) -> str:
+        """Return cache key of file from the md5 in its name."""
+        return rendition_key(entry.stem)
+
+    def sheet_collection(
+        self, tag: str, pages: int = 4, count: int = 240
+    ) -> List[List[Path]]:
+        """Return the first count files under tag in rows of pages."""
+        files = self.files if tag == self.tag else self.files_at_tag(tag)
+        total = min(count, len(files))
+        return [
+            [files[index] for index in range(start, min(start + pages, total))]
+            for start in range(0, total, pages)
+        ]
+
     @classmethod
+    @metrics.timed("booru.load_image")
     def load_image(cls, file_path: Path) -> bytes:
         """Load binary image data."""
         with open(file_path, "rb") as file:
             return file.read()
 
-    def _query_tag(self, tag: str) -> Tuple[str, ...]:
-        cursor = self.pgdb.cursor()
-        cursor.execute(
-            "SELECT * FROM tags WHERE name @@ $$'{}'$$".format(tag)
-            + " AND category = 1 AND post_count >= 10 LIMIT 5"
-        )
-        entry = cursor.fetchone()
-        cursor.close()
-        return (entry[0], entry[2]) if entry and entry[1] == tag else (0, 0)
-
     def _get_selected_tags(
         self, tags: List[str]
     ) -> Dict[str, Tuple[str, ...]]:
-        return {elem: self._query_tag(elem) for elem in tags}
+        """Resolve all selected tags in a single query."""
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("EXECUTE pyviewer_tags(%s)", (list(tags),))
+            found = {name: (tag_id, count) for tag_id, name, count in cursor}
+        return {elem: found.get(elem, (0, 0)) for elem in tags}
 
     def load_tag_map(
         self, selected_tags: List[str] = None
     ) -> Dict[str, Tuple[str, ...]]:
         """Query booru for media tags."""
-        logging.info(f"Regenerating tag map for {self.pgdb.info}.")
+        logging.info(f"Regenerating tag map for {self.media_host}.")
         if selected_tags:
             return self._get_selected_tags(selected_tags)
-        cursor = self.pgdb.cursor()
-        cursor.execute(
-            "SELECT * FROM tags WHERE category = 1 AND post_count >= 25 ;"
-        )
-        tag_map: Dict[str, Tuple[str, ...]] = {
-            str(artist[1]): (str(artist[0]), str(artist[2]))
-            for artist in cursor.fetchall()
-        }
-        cursor.close()
-        return tag_map
-
-    def files_at_tag(
-        self, tag: str, count: str = "40", offset: str = "0"
-    ) -> List[Path]:
-        # TODO use named tuple when fetching from sql
-        # from collections import namedtuple
-        # derive from table index names
-        # namedtuple('query',['name','age','DOB'])
-        """Query media at target index."""
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(ARTIST_TAGS_QUERY)
+            return {
+                str(name): (str(tag_id), str(count))
+                for tag_id, name, count in cursor
+            }
+
+    @metrics.timed("booru.files_at_tag")
+    def files_at_tag(self, tag: str) -> PagedFiles:
+        """Query media at tag, fetching files lazily page by page."""
         logging.info(f"SQL query for files matching {tag}.")
-        file_list = []
-        if tag:
-            cursor = self.pgdb.cursor()
+        if not tag:
+            return PagedFiles(None, 0, self._file_path)
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("EXECUTE pyviewer_count(%s)", (tsquery(tag),))
+            count = cursor.fetchone()[0]
+        return PagedFiles(
+            lambda after, limit: self._files_page(tag, after, limit),
+            count,
+            self._file_path,
+            self.page_size,
+        )
+
+    def _files_page(
+        self, tag: str, after: Optional[int], limit: int
+    ) -> List[tuple]:
+        """Return rows of posts at tag with ids below after."""
+        with self.connection() as conn, conn.cursor() as cursor:
             cursor.execute(
-                "SELECT * FROM posts WHERE tag_index "
-                + f"@@ $$'{tag}'$$::tsquery "
-                + "AND 'jpg png jpeg JPG PNG JPEG'::tsvector @@ to_tsquery(file_ext) "
-                # + f"AND file_size < 6400000 LIMIT {count} OFFSET {offset} "
-                + f"ORDER BY id DESC;"
+                "EXECUTE pyviewer_files(%s, %s, %s)",
+                (tsquery(tag), after, limit),
             )
-            file_list = [
-                Path(
-                    os.path.join(
-                        self._data_root,
-                        entry[7][0:2],
-                        entry[7][2:4],
-                        f"{entry[7]}.{entry[30]}",
-                    )
-                )
-                for entry in cursor.fetchall()
-            ]
-            cursor.close()
-        return file_list
+            return cursor.fetchall()
+
+    def _file_path(self, md5: str, file_ext: str) -> Path:
+        """Return location of post image under the data root."""
+        return Path(
+            os.path.join(
+                self._data_root, md5[0:2], md5[2:4], f"{md5}.{file_ext}"
+            )
+        )
 
 
 # =]
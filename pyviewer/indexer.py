@@ -0,0 +1,220 @@
+"""Parallel and incremental indexing of archive meta data."""
+
+import os
+import time
+import logging
+from itertools import chain
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from pathlib import Path
+from .container import (
+    IMAGE_SUFFIXES,
+    container_kind,
+    container_stat,
+    open_container,
+)
+
+
+class ArchiveRecord(NamedTuple):
+    """Typed container presenting an indexed archive."""
+
+    mtime: float
+    size: int
+    tags: List[str]
+
+
+def archive_tags(meta_data: Dict[str, List[str]]) -> List[str]:
+    """Derive tags from archive meta data."""
+    tags = (
+        meta_data["artist"]
+        if "artist" in meta_data and len(meta_data["artist"]) <= 3
+        else []
+    )
+    return list(
+        dict.fromkeys(
+            sub_tag for tag in tags for sub_tag in str(tag).split("|")
+        )
+    )
+
+
+def media_roots(media_dir: Union[str, Path, Iterable]) -> List[str]:
+    """Return media directories given as one path or several."""
+    if isinstance(media_dir, (str, Path)):
+        return [str(media_dir)]
+    return [str(root) for root in media_dir]
+
+
+def discover_archives(roots: Iterable[str]) -> Iterator[str]:
+    """Yield paths of containers below roots as directories are read.
+
+    Archives are recognized by suffix and directories holding images are
+    containers themselves. Files and directories reached through several
+    symlinks or roots are visited once, which also guards against cycles.
+    """
+    seen: Set[Tuple[int, int]] = set()
+    stack = [str(root) for root in reversed(list(roots))]
+    while stack:
+        directory = stack.pop()
+        try:
+            stat = os.stat(directory)
+            if (stat.st_dev, stat.st_ino) in seen:
+                continue
+            seen.add((stat.st_dev, stat.st_ino))
+            with os.scandir(directory) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError as exc:
+            logging.warning(f"Failed to read directory {directory}: {exc}")
+            continue
+        if any(entry.name[-4:] in IMAGE_SUFFIXES for entry in entries):
+            yield directory
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif container_kind(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    if (stat.st_dev, stat.st_ino) not in seen:
+                        seen.add((stat.st_dev, stat.st_ino))
+                        yield entry.path
+            except OSError as exc:
+                logging.warning(f"Failed to read {entry.path}: {exc}")
+        stack.extend(reversed(subdirs))
+
+
+def scan_archive(path: str) -> Tuple[str, ArchiveRecord, str]:
+    """Read tags of a single archive, returning any error as a message."""
+    mtime, size = container_stat(path)
+    try:
+        with open_container(path) as archive:
+            tags = archive_tags(archive.meta_file)
+        error = ""
+    except Exception as exc:
+        tags, error = [], str(exc)
+    return path, ArchiveRecord(mtime, size, tags), error
+
+
+def scan_archives(paths: List[str]) -> List[Tuple[str, ArchiveRecord, str]]:
+    """Read tags of a chunk of archives."""
+    return [scan_archive(path) for path in paths]
+
+
+class TagIndexer:
+    """Scan archives on a process pool re-parsing only changed files."""
+
+    def __init__(self, workers: Optional[int] = None, chunksize: int = 32):
+        """Configure worker count, defaults to the number of cpus."""
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.report_interval = 2.0
+
+    def update(
+        self,
+        paths: Iterable[str],
+        records: Dict[str, ArchiveRecord] = None,
+    ) -> Dict[str, ArchiveRecord]:
+        """Return records for paths reusing unchanged entries in records.
+
+        Changed archives are handed to the worker pool in chunks while
+        paths are still being consumed, so discovery and parsing overlap.
+        """
+        records = records or {}
+        index: Dict[str, Optional[ArchiveRecord]] = {}
+        changed: List[str] = []
+        chunks: List[Future] = []
+        pool = None
+        try:
+            for path in paths:
+                mtime, size = container_stat(path)
+                record = records.get(path)
+                if record and record.mtime == mtime and record.size == size:
+                    index[path] = record
+                    continue
+                index[path] = None
+                changed.append(path)
+                if self.workers > 1 and len(changed) % self.chunksize == 0:
+                    pool = pool or ProcessPoolExecutor(
+                        max_workers=self.workers
+                    )
+                    chunks.append(
+                        pool.submit(scan_archives, changed[-self.chunksize :])
+                    )
+            removed = len(set(records) - set(index))
+            logging.info(
+                f"Indexing {len(index)} archives: {len(changed)} new or"
+                + f" changed, {removed} removed."
+            )
+            remainder = changed[len(chunks) * self.chunksize :]
+            for path, record in self._scan(chunks, remainder, len(changed)):
+                index[path] = record
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+        return {path: record for path, record in index.items() if record}
+
+    def _scan(
+        self, chunks: List[Future], remainder: List[str], total: int
+    ) -> Iterable[Tuple[str, ArchiveRecord]]:
+        """Parse the remainder while collecting chunks and log progress."""
+        if not total:
+            return
+        start = last_report = time.perf_counter()
+        results = chain(
+            map(scan_archive, remainder),
+            chain.from_iterable(
+                future.result() for future in as_completed(chunks)
+            ),
+        )
+        for count, (path, record, error) in enumerate(results, 1):
+            if error:
+                logging.warning(f"Failed to index {path}: {error}")
+            yield path, record
+            now = time.perf_counter()
+            if now - last_report >= self.report_interval:
+                last_report = now
+                logging.info(
+                    f"Indexed {count}/{total} archives"
+                    + f" ({count / (now - start):.1f} archives/s)."
+                )
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        logging.info(
+            f"Indexed {total} archives in {elapsed:.2f}s"
+            + f" ({total / elapsed:.1f} archives/s)."
+        )
+
+    @classmethod
+    def tag_map(
+        cls,
+        records: Dict[str, ArchiveRecord],
+        selected_tags: List[str] = None,
+    ) -> Dict[str, Tuple[str, ...]]:
+        """Generate association map for each tag from archive records."""
+        tag_lists: Dict[str, List[str]] = {}
+        for path, record in records.items():
+            for tag in record.tags:
+                tag_lists.setdefault(tag, []).append(path)
+        meta_list = {
+            tag: tuple(reversed(paths)) for tag, paths in tag_lists.items()
+        }
+        return (
+            meta_list
+            if not selected_tags
+            else {
+                elem: meta_list[elem]
+                for elem in selected_tags
+                if elem in meta_list
+            }
+        )
+
+
+# =]
@@ -0,0 +1,152 @@
+"""Opt-in latency instrumentation for viewer hot paths."""
+
+import sys
+import math
+import time
+import signal
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, TextIO
+
+
+class Histogram:
+    """Latency histogram with logarithmically spaced buckets."""
+
+    RESOLUTION = 1.05
+    MINIMUM = 1e-6
+
+    def __init__(self):
+        """Create empty histogram."""
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self._buckets: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Add a single sample in seconds."""
+        bucket = (
+            int(math.log(seconds / self.MINIMUM, self.RESOLUTION))
+            if seconds > self.MINIMUM
+            else 0
+        )
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.maximum = max(self.maximum, seconds)
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        """Return upper bound of the bucket holding the percentile."""
+        with self._lock:
+            target = fraction * self.count
+            seen = 0
+            for bucket in sorted(self._buckets):
+                seen += self._buckets[bucket]
+                if seen >= target:
+                    return min(
+                        self.maximum,
+                        self.MINIMUM * self.RESOLUTION ** (bucket + 1),
+                    )
+        return 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """Return sample count and p50, p95, p99 and max in milliseconds."""
+        return {
+            "count": self.count,
+            "p50": 1e3 * self.percentile(0.50),
+            "p95": 1e3 * self.percentile(0.95),
+            "p99": 1e3 * self.percentile(0.99),
+            "max": 1e3 * self.maximum,
+        }
+
+
+class Metrics:
+    """Registry of per-stage latency histograms."""
+
+    def __init__(self):
+        """Create disabled registry."""
+        self.enabled = False
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        """Return histogram for stage, creating it on first use."""
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            return self.histograms[stage]
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block under stage when enabled."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).record(time.perf_counter() - start)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorate function so its calls are timed under stage."""
+
+        def decorator(function: Callable) -> Callable:
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.histogram(stage).record(time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def report(self) -> str:
+        """Return table of latency percentiles for all stages."""
+        lines = [
+            f"{'stage':<24}{'count':>8}{'p50':>10}{'p95':>10}"
+            + f"{'p99':>10}{'max':>10}  (ms)"
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            stats = histogram.summary()
+            lines.append(
+                f"{stage:<24}{stats['count']:>8}{stats['p50']:>10.2f}"
+                + f"{stats['p95']:>10.2f}{stats['p99']:>10.2f}"
+                + f"{stats['max']:>10.2f}"
+            )
+        return "\n".join(lines)
+
+    def overlay(self, stages=("viewer.image",)) -> str:
+        """Return compact single line summary for the viewer status."""
+        return "  ".join(
+            f"{stage} p50 {stats['p50']:.1f} p99 {stats['p99']:.1f} ms"
+            for stage, stats in (
+                (stage, self.histograms[stage].summary())
+                for stage in stages
+                if stage in self.histograms
+            )
+        )
+
+    def dump(self, file: TextIO = None) -> None:
+        """Write latency report to file, defaults to standard error."""
+        if self.histograms:
+            print(self.report(), file=file or sys.stderr)
+
+    def install_signal(self, signum: int = None) -> None:
+        """Dump the report whenever the process receives signum."""
+        signum = signum or getattr(signal, "SIGUSR1", None)
+        if signum:
+            signal.signal(signum, lambda *args: self.dump())
+
+
+metrics = Metrics()
+
+
+# =]
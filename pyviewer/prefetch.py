@@ -0,0 +1,231 @@
+"""Background prefetching of images surrounding the viewer index."""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class ImageCache:
+    """Thread safe image buffer bounded by its total size in bytes."""
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        """Create empty cache holding at most max_bytes of image data."""
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return cached image data and mark it as recently used."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        """Store image data evicting the least recently used entries."""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def clear(self) -> None:
+        """Drop all cached images."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check if key is cached."""
+        return key in self._entries
+
+    def __len__(self) -> int:
+        """Number of cached images."""
+        return len(self._entries)
+
+
+class Prefetcher:
+    """Load images ahead of and behind the viewer index on a thread pool.
+
+    The first pages of the tags next to the active one are loaded as
+    well, so switching tags does not start from cold archives.
+    """
+
+    def __init__(
+        self,
+        depth: int = 4,
+        max_bytes: int = 256 * 2**20,
+        workers: int = 2,
+        pages: int = 2,
+    ):
+        """Create idle prefetcher that keeps depth images on either side."""
+        self.depth = max(0, depth)
+        self.pages = max(0, pages)
+        self.cache = ImageCache(max_bytes)
+        self.imageloader: Any = None
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="prefetch"
+        )
+        self._pending: Dict[Hashable, Future] = {}
+        self._preloads: Dict[str, Tuple[threading.Event, Future]] = {}
+        self._lock = threading.Lock()
+
+    def load_media(self, imageloader: Any) -> None:
+        """Attach image loader and drop state from any previous one."""
+        self.cancel()
+        self.cancel_preloads()
+        self.cache.clear()
+        self.imageloader = imageloader
+
+    def key(self, image_index: int) -> Hashable:
+        """Cache key of the image at index under the active tag.
+
+        Images are keyed by their entry rather than their index, since
+        lists with duplicates skipped shrink between visits of a tag.
+        """
+        return self.imageloader.entry_key(
+            self.imageloader.entry_at(image_index)
+        )
+
+    def image(self, image_index: int = 0) -> bytes:
+        """Return image at index from cache and prefetch its neighbours."""
+        if not self.imageloader or not self.imageloader.count:
+            return bytes()
+        entry = self.imageloader.entry_at(image_index)
+        if entry is None:
+            return bytes()
+        key = self.imageloader.entry_key(entry)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._wait(key)
+        if data is None:
+            data = self.imageloader.load_image(entry)
+            self.cache.put(key, data)
+        self.schedule(image_index)
+        return data
+
+    def schedule(self, image_index: int) -> None:
+        """Queue loading of images surrounding index."""
+        files = self.imageloader.files if self.imageloader else ()
+        count = len(files)
+        if not count or not self.depth:
+            return
+        for offset in range(1, min(self.depth, count) + 1):
+            for index in (image_index + offset, image_index - offset):
+                if index < 0:
+                    continue
+                entry = files[index % count]
+                key = self.imageloader.entry_key(entry)
+                with self._lock:
+                    if key in self.cache or key in self._pending:
+                        continue
+                    future = self._pool.submit(
+                        self.imageloader.load_image, entry
+                    )
+                    self._pending[key] = future
+                future.add_done_callback(
+                    lambda result, key=key: self._store(key, result)
+                )
+
+    @property
+    def preloaded(self) -> List[str]:
+        """Tags whose first pages are loaded or being loaded."""
+        return list(self._preloads)
+
+    def preload(self, radius: int = 1) -> None:
+        """Resolve media of tags next to the active one and load pages."""
+        imageloader = self.imageloader
+        if not imageloader or not self.pages:
+            return
+        tags = imageloader.adjacent_tags(radius)
+        keep = {imageloader.tag, *tags}
+        imageloader.release_files(keep=keep)
+        self.cancel_preloads(keep=keep)
+        with self._lock:
+            for tag in tags:
+                if tag not in self._preloads:
+                    # The token exists before the task can run, so only a
+                    # cancelled preload stops loading its pages.
+                    cancelled = threading.Event()
+                    self._preloads[tag] = cancelled, self._pool.submit(
+                        self._preload_tag, imageloader, tag, cancelled
+                    )
+
+    def _preload_tag(
+        self, imageloader: Any, tag: str, cancelled: threading.Event
+    ) -> None:
+        """Resolve media of tag and cache its first pages until cancelled."""
+        try:
+            files = imageloader.preload_files(tag)
+            # Deduplicated lists depend on the images shown until the tag
+            # becomes active, so only the listing is resolved.
+            if getattr(imageloader, "duplicates", None):
+                return
+            for index in range(min(self.pages, len(files))):
+                key = imageloader.entry_key(files[index])
+                if cancelled.is_set() or key in self.cache:
+                    continue
+                data = imageloader.load_image(files[index])
+                if imageloader is self.imageloader:
+                    self.cache.put(key, data)
+        except Exception as exc:
+            logging.warning(f"Preload failed {tag}: {exc}")
+
+    def cancel_preloads(self, keep: Iterable[str] = ()) -> None:
+        """Cancel preloading of tags not in keep."""
+        keep = set(keep)
+        with self._lock:
+            stale = [tag for tag in self._preloads if tag not in keep]
+            preloads = [self._preloads.pop(tag) for tag in stale]
+        for cancelled, future in preloads:
+            cancelled.set()
+            future.cancel()
+
+    def _wait(self, key: Hashable) -> Optional[bytes]:
+        """Wait for an in-flight prefetch instead of loading twice."""
+        with self._lock:
+            future = self._pending.get(key)
+        if future is None or future.cancel():
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def _store(self, key: Hashable, future: Future) -> None:
+        """Move completed prefetch result into the cache."""
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        if future.cancelled():
+            return
+        if future.exception():
+            logging.warning(f"Prefetch failed {key}: {future.exception()}")
+            return
+        self.cache.put(key, future.result())
+
+    def cancel(self) -> None:
+        """Cancel all queued prefetch requests."""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self) -> None:
+        """Cancel queued work and stop worker threads."""
+        self.cancel()
+        self.cancel_preloads()
+        self._pool.shutdown(wait=False)
+
+
+# =]
@@ -0,0 +1,133 @@
+"""QML image provider serving decoded images from the viewer backend."""
+
+from typing import Tuple, Union
+from urllib.parse import quote, unquote
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QImage
+from PySide6.QtQml import QQmlImageProviderBase
+from PySide6.QtQuick import QQuickImageProvider
+from .decoder import Decoder, get_decoder
+from .metrics import metrics
+
+PROVIDER_NAME = "pyviewer"
+SHEET_PROVIDER_NAME = "sheet"
+
+
+def image_url(tag: str, image_index: int, generation: int = 0) -> str:
+    """Return provider url for image at index under tag.
+
+    The media generation changes the url once the images under tag
+    change, so QML requests them again instead of keeping old pixels.
+    """
+    return (
+        f"image://{PROVIDER_NAME}/{quote(tag, safe='')}"
+        + f"/{generation}/{image_index}"
+    )
+
+
+def sheet_url(tag: str, position: int, generation: int = 0) -> str:
+    """Return provider url for contact sheet thumbnail under tag."""
+    return (
+        f"image://{SHEET_PROVIDER_NAME}/{quote(tag, safe='')}"
+        + f"/{generation}/{position}"
+    )
+
+
+def parse_image_id(image_id: str) -> Tuple[str, int]:
+    """Return tag and index of a provider url id, ignoring generation."""
+    path, _, index = image_id.rpartition("/")
+    return unquote(path.rpartition("/")[0]), int(index)
+
+
+@metrics.timed("provider.decode")
+def decode_image(
+    data: Union[bytes, memoryview],
+    requested_size: QSize = QSize(),
+    decoder: Decoder = None,
+) -> QImage:
+    """Decode image data scaled down to fit the requested size."""
+    bounds = (
+        (requested_size.width(), requested_size.height())
+        if requested_size.isValid()
+        else None
+    )
+    return (decoder or get_decoder("qt")).decode_qimage(data, bounds)
+
+
+@metrics.timed("provider.frame")
+def frame_image(frame) -> QImage:
+    """Copy shared memory frame into a QImage and release its slot."""
+    with frame:
+        return QImage(
+            frame.data,
+            frame.width,
+            frame.height,
+            frame.stride,
+            (
+                QImage.Format_RGBA8888
+                if frame.mode == "RGBA"
+                else QImage.Format_RGB888
+            ),
+        ).copy()
+
+
+class ImageProvider(QQuickImageProvider):
+    """Image provider resolving image://pyviewer/<tag>/<gen>/<index> urls."""
+
+    def __init__(self, viewer):
+        """Attach provider to the viewer that supplies image data."""
+        super().__init__(
+            QQmlImageProviderBase.ImageType.Image,
+            QQmlImageProviderBase.Flag.ForceAsynchronousImageLoading,
+        )
+        self.viewer = viewer
+
+    def requestImage(
+        self, image_id: str, size: QSize, requested_size: QSize
+    ) -> QImage:
+        """Decode image for the url id on a QML loader thread."""
+        tag, index = parse_image_id(image_id)
+        if self.viewer.workers:
+            frame = self.viewer.decode_frame(
+                tag,
+                index,
+                requested_size.width(),
+                requested_size.height(),
+            )
+            image = frame_image(frame) if frame else QImage()
+        else:
+            data = self.viewer.fetch(
+                tag,
+                index,
+                requested_size.width(),
+                requested_size.height(),
+            )
+            image = (
+                decode_image(data, requested_size, self.viewer.decoder)
+                if data
+                else QImage()
+            )
+        size.setWidth(image.width())
+        size.setHeight(image.height())
+        return image
+
+
+class SheetProvider(ImageProvider):
+    """Image provider resolving image://sheet/<tag>/<gen>/<position> urls."""
+
+    def requestImage(
+        self, image_id: str, size: QSize, requested_size: QSize
+    ) -> QImage:
+        """Wait for contact sheet thumbnail on a QML loader thread."""
+        data = self.viewer.sheet_thumbnail(*parse_image_id(image_id))
+        image = (
+            decode_image(data, requested_size, self.viewer.decoder)
+            if data
+            else QImage()
+        )
+        size.setWidth(image.width())
+        size.setHeight(image.height())
+        return image
+
+
+# =]
@@ -1,28 +1,110 @@
 """Main QObject with qml bindings that prompt excusion from user interface."""
 
-from typing import Union
+import logging
+import threading
+from typing import Callable, Iterable, Optional, Union
 from PySide6.QtCore import QByteArray, QObject, Property, Signal, Slot
 from .imageloader import ArchiveBrowser, BooruBrowser
+from .prefetch import Prefetcher
+from .contactsheet import ContactSheet
+from .provider import image_url, sheet_url
+from .rendition import RenditionCache
+from .decoder import Decoder
+from .workers import DecodeWorkers, Frame
+from .metrics import metrics
+
+OVERLAY_STAGES = ("viewer.image", "viewer.fetch", "provider.decode")
 
 
 class PyViewer(QObject):
     """QObject for binging user interface to imageloader."""
 
-    def __init__(self, parent=None):
+    loaded = Signal()
+    _media_ready = Signal(object)
+    archives_changed = Signal(object)
+
+    def __init__(
+        self,
+        parent=None,
+        prefetch_depth: int = 4,
+        cache_size: int = 256 * 2**20,
+        use_provider: bool = True,
+        renditions: RenditionCache = None,
+        decoder: Decoder = None,
+        sheet_pages: int = 4,
+        workers: DecodeWorkers = None,
+        preload_pages: int = 2,
+    ):
         """Initialize image loader backend and load defaults."""
         super().__init__(parent)
         self.imageloader = None
+        # Frames decoded by workers never read the prefetch cache, so it
+        # is left empty rather than holding compressed images nobody uses.
+        self.prefetcher = (
+            Prefetcher(0, 0, pages=0)
+            if workers
+            else Prefetcher(prefetch_depth, cache_size, pages=preload_pages)
+        )
+        self.use_provider = use_provider
+        self.renditions = renditions
+        self.decoder = decoder
+        self.workers = workers
+        self.sheet = ContactSheet(sheet_pages, renditions=renditions)
         self._image_index = 0
+        self.generation = 0
+        self._media_ready.connect(self.load_media)
+        self.archives_changed.connect(self.update_archives)
 
     def load_media(
         self, imageloader: Union[BooruBrowser, ArchiveBrowser]
     ) -> None:
         """Load media path and refresh viewer."""
         self.imageloader = imageloader
+        self.generation += 1
+        self.prefetcher.load_media(imageloader)
+        self.sheet.load_media(imageloader)
+        if imageloader:
+            self.prefetcher.preload()
+        self.loaded.emit()
+
+    def load_media_async(
+        self, factory: Callable[[], Union[BooruBrowser, ArchiveBrowser]]
+    ) -> threading.Thread:
+        """Build image loader on a background thread and load it when done."""
+
+        def build():
+            try:
+                imageloader = factory()
+            except Exception:
+                logging.exception("Failed to load media.")
+                imageloader = None
+            self._media_ready.emit(imageloader)
+
+        thread = threading.Thread(target=build, name="media", daemon=True)
+        thread.start()
+        return thread
+
+    def update_archives(self, paths: Iterable[str]) -> None:
+        """Apply archive changes and refresh if the active tag changed."""
+        if not hasattr(self.imageloader, "update_archives"):
+            return
+        tag = self.imageloader.tag
+        tags = self.imageloader.update_archives(paths)
+        if tag in tags or tag != self.imageloader.tag:
+            self.generation += 1
+            self.prefetcher.load_media(self.imageloader)
+            self.sheet.load_media(self.imageloader)
+            self.prefetcher.preload()
+            self.loaded.emit()
+        elif set(tags) & set(self.prefetcher.preloaded):
+            self.prefetcher.load_media(self.imageloader)
+            self.prefetcher.preload()
 
     @Slot(int)
     def hash(self, image_index: int = 0):
         """Print image hash at index."""
+        if not self.imageloader:
+            return
         print(
             f"{self.file_name}: {self.imageloader.path(image_index)}"
             + f" - {self.imageloader.hash(image_index)}"
@@ -31,27 +113,127 @@ class PyViewer(QObject):
     @Slot(bool)
     def update_tag_filter(self, filter_state: bool):
         """Print image hash at index."""
+        if not self.imageloader:
+            return
         self.imageloader.update_tag_filter(filter_state)
-        del self.imageloader.files
+        self.reset_files()
+        self.prefetcher.cancel()
 
     @Slot()
     def undo_last_filter(self):
         """Print image hash at index."""
+        if not self.imageloader:
+            return
         self.imageloader.undo_last_filter()
-        del self.imageloader.files
+        self.reset_files()
+        self.prefetcher.cancel()
+
+    def reset_files(self) -> None:
+        """Reload media of the active tag under new provider urls."""
+        self.imageloader.reset_files()
+        self.generation += 1
 
     @Slot(int)
     def index(self, image_index: int) -> None:
         """Adjust image index."""
+        if abs(image_index - self._image_index) > self.prefetcher.depth:
+            self.prefetcher.cancel()
         self._image_index = image_index
 
+    @Slot(int, result=str)
+    def source(self, image_index: int) -> str:
+        """Return image provider url for image at index."""
+        if not self.imageloader or not self.imageloader.count:
+            return ""
+        self.index(image_index)
+        return image_url(self.imageloader.tag, image_index, self.generation)
+
+    @metrics.timed("viewer.fetch")
+    def fetch(
+        self, tag: str, image_index: int, width: int = 0, height: int = 0
+    ) -> bytes:
+        """Return image data at index provided tag is still active."""
+        if not self.imageloader or tag != self.imageloader.tag:
+            return bytes()
+        size = self.renditions.fit(width, height) if self.renditions else ""
+        data = (
+            self.renditions.get(
+                self.imageloader.rendition_key(image_index),
+                size,
+                lambda: self.prefetcher.image(image_index),
+            )
+            if size
+            else self.prefetcher.image(image_index)
+        )
+        if tag != self.imageloader.tag:
+            return bytes()
+        self.mark_shown(image_index)
+        return data
+
+    @metrics.timed("viewer.frame")
+    def decode_frame(
+        self, tag: str, image_index: int, width: int = 0, height: int = 0
+    ) -> Optional[Frame]:
+        """Return frame decoded by the workers provided tag is active."""
+        if not self.imageloader or tag != self.imageloader.tag:
+            return None
+        entry = self.imageloader.entry_at(image_index)
+        if entry is None:
+            return None
+        frame = self.workers.decode(
+            self.imageloader.entry_source(entry), (width, height)
+        )
+        self.mark_shown(image_index)
+        return frame
+
+    def mark_shown(self, image_index: int) -> None:
+        """Record image at index as displayed for duplicate skipping."""
+        duplicates = getattr(self.imageloader, "duplicates", None)
+        entry = self.imageloader.entry_at(image_index) if duplicates else None
+        if entry is not None:
+            duplicates.mark_shown(self.imageloader.entry_key(entry))
+
     @Slot(int)
     def load_next_archive(self, direction: int) -> None:
         """Adjust tag index and clear image cache."""
+        if not self.imageloader:
+            return
         self.imageloader.adjust_index(direction)
-        del self.imageloader.files
+        self.reset_files()
+        self.prefetcher.cancel()
+        self.prefetcher.preload()
+        self.sheet.cancel()
+
+    @Slot(result=int)
+    def sheet_length(self) -> int:
+        """Start contact sheet of the active tag and return its size."""
+        if not self.imageloader:
+            return 0
+        return self.sheet.load_tag(self.imageloader.tag)
+
+    @Slot(int, result=str)
+    def sheet_source(self, position: int) -> str:
+        """Return image provider url for contact sheet thumbnail."""
+        if not self.imageloader or not self.sheet.has_entry(position):
+            return ""
+        return sheet_url(self.sheet.tag, position, self.generation)
+
+    @metrics.timed("viewer.thumbnail")
+    def sheet_thumbnail(self, tag: str, position: int) -> bytes:
+        """Return contact sheet thumbnail provided tag is still shown."""
+        return self.sheet.thumbnail(tag, position)
+
+    @Property(int, constant=True)
+    def sheet_pages(self) -> int:
+        """Return number of pages shown per archive on the sheet."""
+        return self.sheet.pages
+
+    @Property(bool, notify=loaded)
+    def ready(self) -> bool:
+        """Return whether media has been loaded."""
+        return self.imageloader is not None
 
-    @Property(int)
+    @Property(int, notify=loaded)
     def length_images(self) -> int:
         """Return number of available images."""
         return self.imageloader.count if self.imageloader else 0
@@ -63,17 +245,37 @@ class PyViewer(QObject):
 
     @Property(str)
     def status(self) -> str:
-        """Return extracted image at index."""
-        return self.imageloader.tag_filter_state if self.imageloader else ""
+        """Return tag filter state with latencies when profiling."""
+        status = self.imageloader.tag_filter_state if self.imageloader else ""
+        return (
+            f"{status}\n{metrics.overlay(OVERLAY_STAGES)}"
+            if metrics.enabled
+            else status
+        )
+
+    @Property(bool, constant=True)
+    def profiling(self) -> bool:
+        """Return whether latency instrumentation is enabled."""
+        return metrics.enabled
+
+    @Property(bool, constant=True)
+    def provider(self) -> bool:
+        """Return whether images are served through the image provider."""
+        return self.use_provider
 
     @Property(QByteArray)
+    @metrics.timed("viewer.image")
     def image(self) -> QByteArray:
-        """Return an image at index."""
-        return (
-            QByteArray(self.imageloader.image(self._image_index)).toBase64()
+        """Return base64 encoded image at index as provider fallback."""
+        data = (
+            self.prefetcher.image(self._image_index)
             if self.imageloader
-            else QByteArray().toBase64()
+            else bytes()
         )
+        if data:
+            self.mark_shown(self._image_index)
+        with metrics.timer("viewer.base64"):
+            return QByteArray(bytes(data)).toBase64()
 
 
 # =]
@@ -13,6 +13,7 @@ ApplicationWindow {
   property var layout: [4,2]
   property int tile_count: main.layout[0] * main.layout[1]
   property int index: 0
+  property bool grid: false
   // Adjustable sub-container for aggregating images on a grid
   Component{
       id: path_delegate
@@ -30,6 +31,9 @@ ApplicationWindow {
               anchors.fill: parent
               fillMode: Image.PreserveAspectFit
               mipmap: true
+              asynchronous: true
+              sourceSize.width: width
+              sourceSize.height: height
             }
           }
         }
@@ -39,6 +43,7 @@ ApplicationWindow {
   PathView {
     id: info
     anchors.fill: parent
+    visible: !main.grid
     snapMode: PathView.SnapOneItem
     model: main.panel_count
     delegate: path_delegate
@@ -58,16 +63,41 @@ ApplicationWindow {
       for (var tile = 0; tile < main.tile_count; tile++) {
         var data = ""
         if(j+index_start >= 0) {
-          viewer.index(j+index_start)
-          data = viewer.image
+          if (viewer.provider) data = viewer.source(j+index_start)
+          else {
+            viewer.index(j+index_start)
+            data = viewer.image
+            if (data != "") data = "data:image;base64," + data
+          }
         }
-        if (data != "") info.children[1+panel].children[tile].children[0].source = "data:image;base64," + data
-        else info.children[1+panel].children[tile].children[0].source = ""
+        info.children[1+panel].children[tile].children[0].source = data
         j++
       }
       panel = (panel + 1) % main.panel_count
     }
-    info_text.text = viewer.file_name
+    info_text.text = !viewer.ready ? "Loading..." : viewer.profiling ? viewer.file_name + "\n" + viewer.status : viewer.file_name
+    }
+  }
+  // Contact sheet of the active tag, thumbnails stream in as they render
+  GridView {
+    id: sheet
+    anchors.fill: parent
+    visible: main.grid
+    model: 0
+    cellWidth: width / viewer.sheet_pages
+    cellHeight: cellWidth
+    delegate: Image {
+      width: sheet.cellWidth - 2
+      height: sheet.cellHeight - 2
+      fillMode: Image.PreserveAspectFit
+      asynchronous: true
+      source: viewer.sheet_source(index)
+      sourceSize.width: width
+      sourceSize.height: height
+    }
+    function update_sheet() {
+      sheet.model = main.grid ? viewer.sheet_length() : 0
+      sheet.positionViewAtBeginning()
     }
   }
   Rectangle {
@@ -78,18 +108,28 @@ ApplicationWindow {
     anchors.leftMargin: 20;
     Keys.enabled: true
     Keys.onEscapePressed: Qt.quit()
+    // Toggle contact sheet grid mode
+    Keys.onPressed: (event) => {
+      if (event.key === Qt.Key_G) {
+        main.grid = !main.grid
+        sheet.update_sheet()
+        event.accepted = true
+      }
+    }
     // Default Naviation
     Keys.onUpPressed: {
       viewer.load_next_archive(1);
       info.currentIndex = 0
       main.index = 0
       info.update_info(0,main.tile_count*3,0)
+      sheet.update_sheet()
     }
     Keys.onDownPressed: {
       viewer.load_next_archive(-1);
       info.currentIndex = 0
       main.index = 0
       info.update_info(0,main.tile_count*3,0)
+      sheet.update_sheet()
     }
     Keys.onLeftPressed: {
       if ( main.index > 0 ) { // avoid negative index on main
@@ -109,18 +149,21 @@ ApplicationWindow {
       info.currentIndex = 0
       main.index = 0
       info.update_info(0,main.tile_count*3,0)
+      sheet.update_sheet()
     }
     Keys.onSpacePressed: {
       viewer.update_tag_filter(true)
       info.currentIndex = 0
       main.index = 0
       info.update_info(0,main.tile_count*3,0)
+      sheet.update_sheet()
     }
     Keys.onDeletePressed: {
       viewer.undo_last_filter()
       info.currentIndex = 0
       main.index = 0
       info.update_info(0,main.tile_count*3,0)
+      sheet.update_sheet()
     }
     // Fetch image data relative to index
     Keys.onDigit1Pressed:{viewer.hash(main.index+0)}
@@ -161,5 +204,15 @@ ApplicationWindow {
       smooth: true
     }
   }
+  // Refresh once media finishes loading in the background
+  Connections {
+    target: viewer
+    function onLoaded() {
+      info.currentIndex = 0
+      main.index = 0
+      info.update_info(0,main.tile_count*3,0)
+      sheet.update_sheet()
+    }
+  }
   Component.onCompleted: info.update_info(main.index,main.tile_count*2,0)
 }
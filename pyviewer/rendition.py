@@ -0,0 +1,122 @@
+"""Disk cache of downscaled image renditions."""
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+RENDITION_SIZES: Dict[str, Tuple[int, int]] = {
+    "thumb": (256, 256),
+    "screen": (2560, 1440),
+}
+
+
+def rendition_key(*parts: object) -> str:
+    """Derive a stable cache key from the parts identifying an image."""
+    return hashlib.sha1(
+        "\0".join(str(part) for part in parts).encode("utf8")
+    ).hexdigest()
+
+
+def render(image_data: bytes, bounds: Tuple[int, int]) -> bytes:
+    """Downscale encoded image to fit within bounds."""
+    from PIL import Image
+
+    image = Image.open(BytesIO(image_data))
+    image.draft("RGB", bounds)
+    image.thumbnail(bounds)
+    output = BytesIO()
+    if image.mode in ("RGBA", "LA", "P"):
+        image.save(output, format="PNG", optimize=False)
+    else:
+        image.convert("RGB").save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+class RenditionCache:
+    """Size-bounded disk store of pre-scaled images."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 2**30,
+        sizes: Dict[str, Tuple[int, int]] = None,
+    ):
+        """Open cache directory and account for renditions already stored."""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.sizes = sizes or RENDITION_SIZES
+        self._lock = threading.Lock()
+        self.nbytes = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        """Iterate over stored rendition files."""
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                yield from (
+                    entry
+                    for entry in os.scandir(shard.path)
+                    if entry.name.endswith(".img")
+                )
+
+    def path(self, key: str, size: str) -> Path:
+        """Return storage path of rendition."""
+        return self.cache_dir / key[:2] / f"{key}-{size}.img"
+
+    def fit(self, width: int, height: int) -> str:
+        """Return smallest rendition size covering the requested size."""
+        for name, bounds in sorted(
+            self.sizes.items(), key=lambda item: item[1][0] * item[1][1]
+        ):
+            if 0 < width <= bounds[0] and 0 < height <= bounds[1]:
+                return name
+        return ""
+
+    def get(self, key: str, size: str, loader: Callable[[], bytes]) -> bytes:
+        """Return rendition, rendering it from loader output on a miss."""
+        path = self.path(key, size)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            pass
+        data = render(loader(), self.sizes[size])
+        path.parent.mkdir(exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.nbytes += len(data)
+            overflow = self.nbytes > self.max_bytes
+        if overflow:
+            self.evict()
+        return data
+
+    def evict(self) -> None:
+        """Remove least recently used renditions until within budget."""
+        with self._lock:
+            entries = sorted(
+                ((entry.stat(), entry.path) for entry in self._entries()),
+                key=lambda item: item[0].st_mtime,
+            )
+            self.nbytes = sum(stat.st_size for stat, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for stat, path in entries:
+                if self.nbytes <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self.nbytes -= stat.st_size
+                except OSError as exc:
+                    logging.warning(f"Failed to evict rendition {path}: {exc}")
+
+
+# =]
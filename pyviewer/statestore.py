@@ -0,0 +1,352 @@
+"""SQLite backed persistence for tag maps, listings and filter decisions."""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from .util import FilterEntry, TagManager
+from .indexer import ArchiveRecord
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tags (
+    root TEXT NOT NULL,
+    tag_position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (root, tag_position, position)
+);
+CREATE INDEX IF NOT EXISTS tags_by_name ON tags (root, tag);
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS archives (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    PRIMARY KEY (root, path)
+);
+CREATE TABLE IF NOT EXISTS listings (
+    archive TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    members TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS filters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tag TEXT NOT NULL,
+    state INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS filters_by_tag ON filters (tag);
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT NOT NULL,
+    member TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (path, algorithm, member)
+);
+CREATE TABLE IF NOT EXISTS duplicates (
+    key TEXT PRIMARY KEY,
+    cluster INTEGER NOT NULL
+);
+"""
+
+
+class StateStore:
+    """Persistent viewer state kept in a SQLite database."""
+
+    def __init__(self, file_path: Path):
+        """Open state database, migrating a legacy JSON state file."""
+        self.file_path = Path(file_path)
+        legacy = self._legacy_state(self.file_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.file_path), check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if legacy:
+            self._migrate(legacy)
+
+    @classmethod
+    def _legacy_state(cls, file_path: Path):
+        """Move JSON state file aside and return its content."""
+        if not os.access(file_path, os.R_OK) or not file_path.stat().st_size:
+            return None
+        with open(file_path, "rb") as file:
+            if file.read(len(SQLITE_HEADER)) == SQLITE_HEADER:
+                return None
+        state = TagManager.load_state(file_path)
+        backup = file_path.with_name(file_path.name + ".json")
+        os.replace(file_path, backup)
+        logging.info(f"Migrating JSON state file, backup at: {backup}")
+        return state
+
+    def _migrate(self, state) -> None:
+        """Import tag maps, archive index and filters from JSON state."""
+        for root, tag_map in state.tag_map.items():
+            self.save_tag_map(root, tag_map)
+        for root, records in state.archive_index.items():
+            self.save_archive_index(
+                root,
+                {path: ArchiveRecord(*elem) for path, elem in records.items()},
+            )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO filters (tag, state) VALUES (?, ?)",
+                [
+                    (str(elem[0]), int(bool(elem[1])))
+                    for elem in state.tag_filter
+                ],
+            )
+
+    def load_tag_map(self, root: str) -> Optional[Dict[str, Tuple[str, ...]]]:
+        """Return tag map for root or None if it was never indexed."""
+        with self._lock:
+            if not self._conn.execute(
+                "SELECT 1 FROM roots WHERE root = ?", (root,)
+            ).fetchone():
+                return None
+            rows = self._conn.execute(
+                "SELECT tag, value FROM tags WHERE root = ?"
+                + " ORDER BY tag_position, position",
+                (root,),
+            ).fetchall()
+        tag_map: Dict[str, List[str]] = {}
+        for tag, value in rows:
+            tag_map.setdefault(tag, []).append(value)
+        return {tag: tuple(values) for tag, values in tag_map.items()}
+
+    def tag_values(self, root: str, tag: str) -> Tuple[str, ...]:
+        """Return values associated with a single tag."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value FROM tags WHERE root = ? AND tag = ?"
+                + " ORDER BY position",
+                (root, tag),
+            ).fetchall()
+        return tuple(row[0] for row in rows)
+
+    def save_tag_map(
+        self, root: str, tag_map: Dict[str, Tuple[str, ...]]
+    ) -> None:
+        """Replace tag map stored for root."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tags WHERE root = ?", (root,))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO roots (root) VALUES (?)", (root,)
+            )
+            self._conn.executemany(
+                "INSERT INTO tags VALUES (?, ?, ?, ?, ?)",
+                (
+                    (root, tag_position, tag, position, str(value))
+                    for tag_position, (tag, values) in enumerate(
+                        tag_map.items()
+                    )
+                    for position, value in enumerate(values)
+                ),
+            )
+
+    def save_tag_values(
+        self, root: str, tag_values: Dict[str, Tuple[str, ...]]
+    ) -> None:
+        """Replace values of tags in place, empty values drop the tag."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO roots (root) VALUES (?)", (root,)
+            )
+            for tag, values in tag_values.items():
+                row = (
+                    self._conn.execute(
+                        "SELECT tag_position FROM tags"
+                        + " WHERE root = ? AND tag = ?",
+                        (root, tag),
+                    ).fetchone()
+                    or self._conn.execute(
+                        "SELECT COALESCE(MAX(tag_position), -1) + 1 FROM tags"
+                        + " WHERE root = ?",
+                        (root,),
+                    ).fetchone()
+                )
+                self._conn.execute(
+                    "DELETE FROM tags WHERE root = ? AND tag = ?", (root, tag)
+                )
+                self._conn.executemany(
+                    "INSERT INTO tags VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (root, row[0], tag, position, str(value))
+                        for position, value in enumerate(values)
+                    ),
+                )
+
+    def load_archive_index(self, root: str) -> Dict[str, ArchiveRecord]:
+        """Return archive records indexed under root."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, mtime, size, tags FROM archives WHERE root = ?",
+                (root,),
+            ).fetchall()
+        return {
+            path: ArchiveRecord(mtime, size, json.loads(tags))
+            for path, mtime, size, tags in rows
+        }
+
+    def save_archive_index(
+        self, root: str, records: Dict[str, ArchiveRecord]
+    ) -> None:
+        """Replace archive records stored for root."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM archives WHERE root = ?", (root,))
+            self._conn.executemany(
+                "INSERT INTO archives VALUES (?, ?, ?, ?, ?)",
+                (
+                    (root, path, rec.mtime, rec.size, json.dumps(rec.tags))
+                    for path, rec in records.items()
+                ),
+            )
+
+    def update_archive_index(
+        self, root: str, records: Dict[str, Optional[ArchiveRecord]]
+    ) -> None:
+        """Store or, for None records, remove individual archive records."""
+        with self._lock, self._conn:
+            for path, rec in records.items():
+                if rec is None:
+                    self._conn.execute(
+                        "DELETE FROM archives WHERE root = ? AND path = ?",
+                        (root, path),
+                    )
+                    self._conn.execute(
+                        "DELETE FROM listings WHERE archive = ?", (path,)
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO archives"
+                        + " VALUES (?, ?, ?, ?, ?)",
+                        (
+                            root,
+                            path,
+                            rec.mtime,
+                            rec.size,
+                            json.dumps(rec.tags),
+                        ),
+                    )
+
+    def image_files(
+        self, archive: str
+    ) -> Optional[Tuple[float, int, List[str]]]:
+        """Return stored member listing of archive with its mtime and size."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime, size, members FROM listings WHERE archive = ?",
+                (archive,),
+            ).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def save_image_files(
+        self, archive: str, mtime: float, size: int, members: List[str]
+    ) -> None:
+        """Store member listing of archive."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)",
+                (archive, mtime, size, json.dumps(members)),
+            )
+
+    def content_hash(
+        self, path: str, member: str, algorithm: str
+    ) -> Optional[Tuple[int, str]]:
+        """Return version and digest cached for member of path."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, digest FROM hashes"
+                + " WHERE path = ? AND algorithm = ? AND member = ?",
+                (path, algorithm, member),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def content_hashes(
+        self, path: str, algorithm: str
+    ) -> Dict[str, Tuple[int, str]]:
+        """Return version and digest cached for all members of path."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT member, version, digest FROM hashes"
+                + " WHERE path = ? AND algorithm = ?",
+                (path, algorithm),
+            ).fetchall()
+        return {member: (version, digest) for member, version, digest in rows}
+
+    def save_content_hashes(
+        self,
+        path: str,
+        algorithm: str,
+        hashes: Iterable[Tuple[str, int, str]],
+    ) -> None:
+        """Store member digests of path with the version they belong to."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                (
+                    (path, member, algorithm, version, digest)
+                    for member, version, digest in hashes
+                ),
+            )
+
+    def load_duplicates(self) -> Dict[str, int]:
+        """Return duplicate cluster number of each image key."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, cluster FROM duplicates"
+            ).fetchall()
+        return dict(rows)
+
+    def save_duplicates(self, clusters: Dict[str, int]) -> None:
+        """Replace duplicate clusters."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM duplicates")
+            self._conn.executemany(
+                "INSERT INTO duplicates VALUES (?, ?)", clusters.items()
+            )
+
+    def load_filter(self) -> List[FilterEntry]:
+        """Return filter decisions in the order they were made."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tag, state FROM filters ORDER BY id"
+            ).fetchall()
+        return [FilterEntry(tag, bool(state)) for tag, state in rows]
+
+    def add_filter(self, entry: FilterEntry) -> None:
+        """Record a filter decision."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO filters (tag, state) VALUES (?, ?)",
+                (entry.tag, int(entry.state)),
+            )
+
+    def remove_filter(self, tag: str) -> None:
+        """Revert the most recent filter decision on tag."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM filters WHERE id ="
+                + " (SELECT MAX(id) FROM filters WHERE tag = ?)",
+                (tag,),
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+# =]
@@ -2,48 +2,203 @@
 
 import json
 import os
+import mmap
+import struct
+import logging
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from math import ceil
 from pathlib import Path
-from typing import NamedTuple, List, Dict, Set, Any, Tuple
-from zipfile import ZipFile
-
-
-class Archive(ZipFile):
+from typing import (
+    AbstractSet,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+from zipfile import ZIP_STORED, ZipFile
+from .container import Container, open_container
+from .metrics import metrics
+
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+class Archive(ZipFile, Container):
     """Simple file handler for compressed archives."""
 
+    def __init__(self, *args, **kwargs):
+        """Open archive with the memory map created on first use."""
+        self._map: Union[mmap.mmap, bool, None] = None
+        self._map_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    @metrics.timed("archive.load_file")
     def load_file(self, file_name: str) -> bytes:
         """Load file from archive by name."""
         with self.open(file_name, "r") as file:
             return file.read()
 
-    @property
-    def meta_file(self) -> Dict[str, str]:
-        """Fetch the meta file from archive."""
-        meta: List[Dict[str, str]] = [
-            json.loads(self.load_file(elem.filename))
-            for elem in self.infolist()
-            if elem.filename[-13:] == "metadata.json"
-        ]
-        return meta[0] if meta else {}
+    @metrics.timed("archive.view_file")
+    def view_file(self, file_name: str) -> Union[bytes, memoryview]:
+        """Return stored members as a view on the mapped archive.
+
+        Compressed or encrypted members, and archives that can not be
+        mapped, fall back to load_file. Views skip the CRC check.
+        """
+        info = self.getinfo(file_name)
+        if info.compress_type != ZIP_STORED or info.flag_bits & 0x1:
+            return self.load_file(file_name)
+        archive_map = self._mapping()
+        if archive_map is None:
+            return self.load_file(file_name)
+        offset = info.header_offset
+        header = archive_map[offset : offset + LOCAL_HEADER.size]
+        if len(header) != LOCAL_HEADER.size:
+            raise ValueError(f"Truncated local header for: {file_name}")
+        fields = LOCAL_HEADER.unpack(header)
+        if fields[0] != LOCAL_HEADER_SIGNATURE:
+            raise ValueError(f"Bad local header magic for: {file_name}")
+        start = offset + LOCAL_HEADER.size + fields[10] + fields[11]
+        end = start + info.file_size
+        if end > len(archive_map):
+            raise ValueError(f"Stored member exceeds archive: {file_name}")
+        return memoryview(archive_map)[start:end]
+
+    def version(self, file_name: str) -> int:
+        """Return CRC of member as its change token."""
+        return self.getinfo(file_name).CRC
+
+    def _map_source(self):
+        """Return the archive file while it is open for reading."""
+        return self.fp if self.fp and self.mode == "r" else None
+
+    def close(self) -> None:
+        """Close archive and release the memory map."""
+        self._release_mapping()
+        super().close()
+
+
+class ArchivePool:
+    """Bounded pool of open archives evicted in least-recently-used order.
+
+    Archives checked out through lease are closed only once returned, so
+    evicting or discarding them never breaks reads on other threads.
+    """
+
+    def __init__(self, max_open: int = 32):
+        """Create empty pool that holds at most max_open file handles."""
+        self.max_open = max(1, max_open)
+        self.hits = 0
+        self.misses = 0
+        self._archives: "OrderedDict[str, Container]" = OrderedDict()
+        self._leases: Counter = Counter()
+        self._retired: Dict[int, Container] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Union[str, Path]) -> Container:
+        """Return open container for path, opening it on a pool miss.
+
+        The container may be closed by a later eviction, callers sharing
+        the pool between threads use lease instead.
+        """
+        with self._lock:
+            archive, evicted = self._checkout(str(path))
+        self._close(evicted)
+        return archive
+
+    @contextmanager
+    def lease(self, path: Union[str, Path]) -> Iterator[Container]:
+        """Check out container for path, deferring its close until returned."""
+        with self._lock:
+            archive, evicted = self._checkout(str(path))
+            self._leases[id(archive)] += 1
+        self._close(evicted)
+        try:
+            yield archive
+        finally:
+            with self._lock:
+                self._leases[id(archive)] -= 1
+                released = (
+                    self._release(archive)
+                    if self._leases[id(archive)] <= 0
+                    else None
+                )
+            self._close([released] if released else [])
+
+    def _checkout(self, key: str) -> Tuple[Container, List[Container]]:
+        """Return pooled container and those evicted to make room for it."""
+        if key in self._archives:
+            self.hits += 1
+            self._archives.move_to_end(key)
+            return self._archives[key], []
+        self.misses += 1
+        with metrics.timer("archive.open"):
+            archive = open_container(key)
+        self._archives[key] = archive
+        evicted = []
+        while len(self._archives) > self.max_open:
+            _, container = self._archives.popitem(last=False)
+            evicted.append(self._retire(container))
+        return archive, [elem for elem in evicted if elem]
+
+    def _retire(self, archive: Container) -> Optional[Container]:
+        """Return archive for closing unless it is still leased."""
+        if self._leases[id(archive)] > 0:
+            self._retired[id(archive)] = archive
+            return None
+        self._leases.pop(id(archive), None)
+        return archive
+
+    def _release(self, archive: Container) -> Optional[Container]:
+        """Return archive for closing if it was retired while leased."""
+        del self._leases[id(archive)]
+        return self._retired.pop(id(archive), None)
+
+    @classmethod
+    def _close(cls, archives: Iterable[Container]) -> None:
+        """Close containers outside of the pool lock."""
+        for archive in archives:
+            archive.close()
+
+    def discard(self, path: Union[str, Path]) -> None:
+        """Forget archive at path, closing it once no longer leased."""
+        with self._lock:
+            archive = self._archives.pop(str(path), None)
+            archive = self._retire(archive) if archive else None
+        self._close([archive] if archive else [])
+
+    def close(self) -> None:
+        """Close all pooled archives, leased ones once returned."""
+        with self._lock:
+            archives = [
+                self._retire(archive) for archive in self._archives.values()
+            ]
+            self._archives.clear()
+        self._close(archive for archive in archives if archive)
+        logging.debug(f"Archive pool closed: {self.stats}")
 
     @property
-    def image_files(self) -> List[str]:
-        """Return list of file names in archive."""
-        return [
-            file.filename
-            for file in self.infolist()
-            if file.filename[-4:] == ".png" or file.filename[-4:] == ".jpg"
-        ]
-
-    def get_images(self, count: int = 40) -> List[bytes]:
-        """Extract and return images as array of binary objects."""
-        image_list = self.image_files
-        image_list.sort()
-        return [
-            self.load_file(elem)
-            for index, elem in enumerate(image_list)
-            if index < count
-        ]
+    def stats(self) -> Dict[str, int]:
+        """Return pool usage counters."""
+        return {
+            "open": len(self._archives),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def __len__(self) -> int:
+        """Number of open archives."""
+        return len(self._archives)
 
 
 class FilterEntry(NamedTuple):
@@ -58,6 +213,107 @@ class FilterState(NamedTuple):
 
     tag_map: Dict[str, Dict[str, Tuple[str, ...]]] = {}
     tag_filter: List[FilterEntry] = []
+    archive_index: Dict[str, Dict[str, Any]] = {}
+
+
+class TagIndex:
+    """Ordered tag collection with logarithmic removal and lookup."""
+
+    def __init__(self, tags: Iterable[str] = ()):
+        """Index tags in order with all of them active."""
+        self._tags: List[str] = list(dict.fromkeys(tags))
+        self._position = {tag: pos for pos, tag in enumerate(self._tags)}
+        self._active = [True] * len(self._tags)
+        self._size = len(self._tags)
+        self._tree = [0] + [1] * len(self._tags)
+        for pos in range(1, len(self._tree)):
+            parent = pos + (pos & -pos)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[pos]
+
+    def _update(self, pos: int, delta: int) -> None:
+        """Add delta to the active count at position."""
+        pos += 1
+        while pos < len(self._tree):
+            self._tree[pos] += delta
+            pos += pos & -pos
+
+    def _prefix(self, pos: int) -> int:
+        """Count active tags before position."""
+        total = 0
+        while pos > 0:
+            total += self._tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def __len__(self) -> int:
+        """Number of active tags."""
+        return self._size
+
+    def __contains__(self, tag: object) -> bool:
+        """Check if tag is active."""
+        pos = self._position.get(tag)  # type: ignore
+        return pos is not None and self._active[pos]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over active tags in order."""
+        return (tag for pos, tag in enumerate(self._tags) if self._active[pos])
+
+    def __getitem__(self, index: int) -> str:
+        """Return active tag by its rank."""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        pos, step = 0, 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            if (
+                pos + step < len(self._tree)
+                and self._tree[pos + step] <= index
+            ):
+                pos += step
+                index -= self._tree[pos]
+            step >>= 1
+        return self._tags[pos]
+
+    def index(self, tag: str) -> int:
+        """Return rank of active tag."""
+        if tag not in self:
+            raise ValueError(f"{tag} is not an active tag")
+        return self._prefix(self._position[tag])
+
+    def remove(self, tag: str) -> None:
+        """Deactivate tag."""
+        if tag not in self:
+            raise ValueError(f"{tag} is not an active tag")
+        pos = self._position[tag]
+        self._active[pos] = False
+        self._size -= 1
+        self._update(pos, -1)
+
+    def add(self, tag: str) -> int:
+        """Append new tag or reactivate a known one and return its rank."""
+        if tag in self._position:
+            return self.restore(tag)
+        pos = len(self._tags)
+        node = pos + 1
+        self._tree.append(
+            1 + self._prefix(node - 1) - self._prefix(node - (node & -node))
+        )
+        self._tags.append(tag)
+        self._position[tag] = pos
+        self._active.append(True)
+        self._size += 1
+        return self._size - 1
+
+    def restore(self, tag: str) -> int:
+        """Reactivate tag at its original position and return its rank."""
+        pos = self._position[tag]
+        if not self._active[pos]:
+            self._active[pos] = True
+            self._size += 1
+            self._update(pos, 1)
+        return self._prefix(pos)
 
 
 class TagManager:
@@ -68,26 +324,63 @@ class TagManager:
         tag_map: Dict[str, Tuple[str, ...]],
         tag_filter: List[FilterEntry],
         tag_selection: List[str] = None,
+        store: Any = None,
     ):
         """Initialize with empty struct since loading is expensive."""
         self.index = 0
+        self._store = store
         self._selection = tag_selection
         self._tag_map = tag_map
         self._filter = [FilterEntry(*elem) for elem in tag_filter]
+        self._filter_tags = Counter(elem.tag for elem in self._filter)
         self._tagstack: List[FilterEntry] = []
-        self._tag_buffer = self.tags
+        self._resolved: Dict[str, Future] = {}
+        self._resolved_lock = threading.Lock()
+        self._files: Optional[Tuple[str, Sequence]] = None
+        self._generation = 0
+        self._files_lock = threading.Lock()
+        self._tag_buffer = TagIndex(
+            [key for key in self._selection if key in self._tag_map]
+            if self._selection
+            else [key for key in self._tag_map if key not in self.filter]
+        )
 
     def update_tag_filter(self, filter_bool: bool) -> None:
         """Update tag filter with filter decision."""
-        if self._tag_map:
-            self._tagstack.append(FilterEntry(self.tag, filter_bool))
-            self._tag_buffer.remove(self.tag)
+        if self._tag_map and self._tag_buffer:
+            entry = FilterEntry(self.tag, filter_bool)
+            self._tagstack.append(entry)
+            self._filter_tags[entry.tag] += 1
+            self._tag_buffer.remove(entry.tag)
+            if self._store:
+                self._store.add_filter(entry)
 
     def undo_last_filter(self) -> None:
         """Revert last filter decision."""
         if len(self._tagstack) > 0:
             entry = self._tagstack.pop(-1)
-            self._tag_buffer.insert(self.index, entry.tag)
+            self._filter_tags[entry.tag] -= 1
+            if self._filter_tags[entry.tag] <= 0:
+                del self._filter_tags[entry.tag]
+            self.index = self._tag_buffer.restore(entry.tag)
+            if self._store:
+                self._store.remove_filter(entry.tag)
+
+    def update_tag_map(self, tag_values: Dict[str, Tuple[str, ...]]) -> None:
+        """Replace values of tags, adding new tags and dropping empty ones."""
+        tag = self.tag
+        for name, values in tag_values.items():
+            if self._selection and name not in self._selection:
+                continue
+            if values:
+                self._tag_map[name] = values
+                if name not in self.filter:
+                    self._tag_buffer.add(name)
+            else:
+                self._tag_map.pop(name, None)
+                if name in self._tag_buffer:
+                    self._tag_buffer.remove(name)
+        self.set_tag(tag)
 
     def adjust_index(self, direction: int) -> None:
         """Accumulate the current index with direction."""
@@ -96,10 +389,107 @@ class TagManager:
 
     def _tag_index(self, tag_name: str) -> int:
         """Find tag name in filtered tag list to derive its index."""
-        match = [
-            index for index, tag in enumerate(self.tags) if tag == tag_name
-        ]
-        return match[0] if len(match) >= 0 else self.index
+        return (
+            self._tag_buffer.index(tag_name)
+            if tag_name in self._tag_buffer
+            else self.index
+        )
+
+    def adjacent_tags(self, radius: int = 1) -> List[str]:
+        """Return tags within radius of the index, nearest first."""
+        tags: List[str] = []
+        for offset in range(1, radius + 1):
+            for direction in (offset, -offset):
+                tag = self.tag_at(self.index + direction)
+                if tag and tag != self.tag and tag not in tags:
+                    tags.append(tag)
+        return tags
+
+    @property
+    def files(self) -> Sequence:
+        """Media of the active tag, loaded once until reset.
+
+        Media loaded for a tag that was left or reset meanwhile is returned
+        to its caller but not cached.
+        """
+        with self._files_lock:
+            cached, generation, tag = self._files, self._generation, self.tag
+        if cached and cached[0] == tag:
+            return cached[1]
+        files = self.load_files(tag)
+        with self._files_lock:
+            if generation == self._generation and tag == self.tag:
+                self._files = (tag, files)
+        return files
+
+    @files.deleter
+    def files(self) -> None:
+        """Reset media of the active tag."""
+        self.reset_files()
+
+    def entry_at(self, image_index: int) -> Any:
+        """Return media entry at index, wrapping around the active files.
+
+        Paged media may shrink while being read, the index then wraps
+        around the reduced count.
+        """
+        files = self.files
+        while len(files):
+            try:
+                return files[image_index % len(files)]
+            except IndexError:
+                continue
+        return None
+
+    def reset_files(self) -> None:
+        """Drop cached media so the active tag is loaded again."""
+        with self._files_lock:
+            self._generation += 1
+            self._files = None
+
+    def load_files(self, tag: str) -> Sequence:
+        """Load media of tag becoming active."""
+        return self.resolved_files(tag)
+
+    def files_at_tag(self, tag: str) -> Sequence:
+        """Return media associated with tag."""
+        return self._tag_map.get(tag, ())
+
+    def preload_files(self, tag: str) -> Sequence:
+        """Resolve media of tag once, sharing the result between threads."""
+        with self._resolved_lock:
+            future = self._resolved.get(tag)
+            owner = future is None
+            if owner:
+                future = self._resolved[tag] = Future()
+        if owner:
+            try:
+                future.set_result(self.files_at_tag(tag))
+            except Exception as exc:
+                future.set_exception(exc)
+        return future.result()
+
+    def resolved_files(self, tag: str) -> Sequence:
+        """Return media of tag, taking over a listing resolved ahead."""
+        try:
+            return self.preload_files(tag)
+        finally:
+            with self._resolved_lock:
+                self._resolved.pop(tag, None)
+
+    def release_files(self, keep: AbstractSet[str] = frozenset()) -> None:
+        """Drop media resolved ahead for tags not in keep."""
+        with self._resolved_lock:
+            stale = [
+                self._resolved.pop(tag)
+                for tag in list(self._resolved)
+                if tag not in keep
+            ]
+        for future in stale:
+            if future.done() and not future.exception():
+                close = getattr(future.result(), "close", None)
+                if close:
+                    close()
 
     def tag_at(self, index: int) -> str:
         """Tag at index in filtered tag list."""
@@ -114,22 +504,14 @@ class TagManager:
         self.index = self._tag_index(tag_name)
 
     @property
-    def filter(self) -> Set[str]:
+    def filter(self) -> AbstractSet[str]:
         """Return the current tag filter being applied."""
-        return {elem.tag for elem in self._filter + self._tagstack}
+        return self._filter_tags.keys()
 
     @property
     def tags(self) -> List[str]:
         """Return all tags derived from media directory."""
-        if self._selection:
-            self._tag_buffer = [
-                key for key in self._selection if key in self._tag_map
-            ]
-        else:
-            self._tag_buffer = [
-                key for key in self._tag_map if key not in self.filter
-            ]
-        return self._tag_buffer
+        return list(self._tag_buffer)
 
     @property
     def tag(self) -> str:
@@ -158,22 +540,17 @@ class TagManager:
 
     @classmethod
     def load_state(cls, file_path: Path) -> FilterState:
-        """Load tag filter from file."""
+        """Load legacy JSON tag filter state from file."""
         if os.access(file_path, os.R_OK):
             with open(file_path, mode="r", encoding="utf8") as file:
                 return FilterState(*json.load(file))
-        return FilterState()
+        return FilterState({}, [], {})
 
-    def save_state(self, file_path: Path, media_path: Path) -> None:
-        """Save current tag filter to file."""
+    def save_state(self) -> None:
+        """Report tag filter state and release the state store."""
         print(self.tag_filter_state)
-        old_state = self.load_state(file_path)
-        old_state.tag_map[str(media_path)] = self._tag_map
-        with open(file_path, mode="w", encoding="utf8") as file:
-            json.dump(
-                FilterState(old_state.tag_map, self._filter + self._tagstack),
-                file,
-            )
+        if self._store:
+            self._store.close()
 
 
 def sample_collection(
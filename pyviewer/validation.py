@@ -0,0 +1,164 @@
+"""Parallel validation of archives with resumable reports."""
+
+import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+)
+from .container import Container, open_container
+from .decoder import get_decoder
+
+
+class ValidationError(NamedTuple):
+    """Typed container presenting a broken archive member."""
+
+    archive: str
+    member: str
+    error: str
+
+
+def validate_member(
+    archive: Container, member: str, decoder: str = "auto"
+) -> None:
+    """Read member to check zip CRCs, then decode it at reduced size."""
+    with archive.open(member) as file:
+        data = file.read()
+    get_decoder(decoder).check(data)
+
+
+def validate_archive(
+    path: str, decoder: str = "auto"
+) -> List[ValidationError]:
+    """Return all broken image members of archive."""
+    errors: List[ValidationError] = []
+    try:
+        with open_container(path) as archive:
+            for member in archive.image_files:
+                try:
+                    validate_member(archive, member, decoder)
+                except Exception as exc:
+                    errors.append(
+                        ValidationError(
+                            path, member, f"{type(exc).__name__}: {exc}"
+                        )
+                    )
+    except Exception as exc:
+        errors.append(
+            ValidationError(path, "", f"{type(exc).__name__}: {exc}")
+        )
+    return errors
+
+
+class ArchiveValidator:
+    """Validate archives on a process pool writing a JSON lines report.
+
+    Each archive is recorded on a single line together with its errors,
+    so an interrupted run leaves at most one truncated line, which is
+    skipped and validated again on resume.
+    """
+
+    def __init__(
+        self,
+        report: Optional[Path] = None,
+        workers: int = None,
+        decoder: str = "auto",
+    ):
+        """Configure report file, worker count and verifying decoder."""
+        self.report = Path(report) if report else None
+        self.workers = workers or os.cpu_count() or 1
+        self.decoder = decoder
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Yield archive records of the report, skipping truncated lines."""
+        if not self.report or not self.report.exists():
+            return
+        with open(self.report, mode="r", encoding="utf8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and "errors" in entry:
+                    yield entry
+
+    def checkpoint(self) -> Set[str]:
+        """Return archives completed in a previous run of the report."""
+        return {entry["archive"] for entry in self.entries()}
+
+    def errors(self) -> List[ValidationError]:
+        """Return all errors recorded in the report."""
+        return [
+            ValidationError(entry["archive"], error[0], error[1])
+            for entry in self.entries()
+            for error in entry["errors"]
+        ]
+
+    def validate(self, paths: Iterable[str]) -> List[ValidationError]:
+        """Validate paths and return their errors, recorded ones included."""
+        paths = list(dict.fromkeys(paths))
+        errors = self.run(paths)
+        if not self.report:
+            return errors
+        selected = set(paths)
+        return [error for error in self.errors() if error.archive in selected]
+
+    def _open_report(self):
+        """Open report for appending after any truncated last line."""
+        report = open(self.report, mode="a+", encoding="utf8")
+        if report.tell():
+            report.seek(report.tell() - 1)
+            if report.read(1) != "\n":
+                report.write("\n")
+        return report
+
+    def run(self, paths: Iterable[str]) -> List[ValidationError]:
+        """Validate archives not yet in the report and return new errors."""
+        done = self.checkpoint()
+        pending = [path for path in dict.fromkeys(paths) if path not in done]
+        logging.info(
+            f"Validating {len(pending)} archives, {len(done)} already done."
+        )
+        errors: List[ValidationError] = []
+        report = self._open_report() if self.report else None
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    pool.submit(validate_archive, path, self.decoder): path
+                    for path in pending
+                }
+                for count, future in enumerate(as_completed(futures), 1):
+                    path = futures[future]
+                    result = future.result()
+                    for error in result:
+                        logging.warning(
+                            f"Found broken image: {error.archive}"
+                            + f"/{error.member} ({error.error})"
+                        )
+                    errors.extend(result)
+                    if report:
+                        record = {
+                            "archive": path,
+                            "errors": [
+                                (error.member, error.error) for error in result
+                            ],
+                        }
+                        report.write(json.dumps(record) + "\n")
+                        report.flush()
+                    logging.debug(f"Validated {count}/{len(pending)}: {path}")
+        finally:
+            if report:
+                report.close()
+        return errors
+
+
+# =]
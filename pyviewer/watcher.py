@@ -0,0 +1,176 @@
+"""Watch media directories for created, modified and removed archives."""
+
+import os
+import time
+import logging
+import threading
+import importlib.util
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Set, Tuple, Union
+from .container import (
+    IMAGE_SUFFIXES,
+    META_SUFFIX,
+    container_kind,
+    container_stat,
+)
+from .indexer import discover_archives, media_roots
+
+
+def snapshot(roots: Iterable[str]) -> Dict[str, Tuple[float, int]]:
+    """Return modification time and size of archives below roots."""
+    stats: Dict[str, Tuple[float, int]] = {}
+    for path in discover_archives(roots):
+        try:
+            stats[path] = container_stat(path)
+        except OSError:
+            continue
+    return stats
+
+
+class ArchiveWatcher:
+    """Report archives below roots once they stop changing.
+
+    Events come from inotify through watchdog when it is installed,
+    otherwise the directories are polled every interval seconds. Paths are
+    passed to callback after settle seconds without further changes, so
+    archives still being written are only indexed once complete.
+    """
+
+    def __init__(
+        self,
+        media_dir: Union[Path, Iterable[Path]],
+        callback: Callable[[Set[str]], None],
+        interval: float = 2.0,
+        settle: float = 1.0,
+        polling: bool = False,
+    ):
+        """Create stopped watcher for one or several media directories."""
+        self.roots = [
+            os.path.realpath(root) for root in media_roots(media_dir)
+        ]
+        self.callback = callback
+        self.interval = interval
+        self.settle = settle
+        self.polling = polling or importlib.util.find_spec("watchdog") is None
+        self._pending: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshot: Dict[str, Tuple[float, int]] = {}
+        self._observer = None
+        self._thread = threading.Thread(
+            target=self._run, name="watcher", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start watching roots."""
+        if self.polling:
+            self._snapshot = snapshot(self.roots)
+        else:
+            self._observer = self._observe()
+        mode = "polling" if self.polling else "events"
+        logging.info(f"Watching {', '.join(self.roots)} by {mode}.")
+        self._thread.start()
+
+    def _observe(self):
+        """Start watchdog observer feeding file events into the watcher."""
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        watcher = self
+
+        class ArchiveEvents(FileSystemEventHandler):
+            """Forward archive paths of file system events."""
+
+            def on_any_event(self, event):
+                """Mark source and destination of event as changed."""
+                dest_path = getattr(event, "dest_path", "")
+                if not event.is_directory:
+                    watcher.touch((event.src_path, dest_path))
+                elif event.event_type in ("moved", "deleted"):
+                    watcher.touch_directory(event.src_path, dest_path)
+                elif event.event_type == "created":
+                    watcher.touch_directory("", event.src_path)
+
+        observer = Observer()
+        for root in self.roots:
+            observer.schedule(ArchiveEvents(), root, recursive=True)
+        observer.start()
+        return observer
+
+    def touch(self, paths: Iterable[str]) -> None:
+        """Mark containers of changed paths as changed now."""
+        now = time.monotonic()
+        with self._lock:
+            for path in map(os.fsdecode, paths):
+                if container_kind(path):
+                    self._pending[path] = now
+                elif path[-4:] in IMAGE_SUFFIXES or path.endswith(META_SUFFIX):
+                    self._pending[os.path.dirname(path)] = now
+
+    def touch_directory(
+        self, src_path: Union[str, bytes], dest_path: Union[str, bytes] = ""
+    ) -> None:
+        """Mark a moved, removed or added directory as changed now.
+
+        The source is passed on as a container path, since directories of
+        images are containers and nothing below it is left to be reported.
+        Containers found below the destination are reported as added.
+        """
+        src_path, dest_path = os.fsdecode(src_path), os.fsdecode(dest_path)
+        added = list(discover_archives([dest_path])) if dest_path else []
+        now = time.monotonic()
+        with self._lock:
+            for path in [src_path] + added:
+                if path:
+                    self._pending[path] = now
+
+    def poll(self) -> None:
+        """Compare directory against the previous snapshot."""
+        current = snapshot(self.roots)
+        self.touch(
+            path
+            for path in set(current) | set(self._snapshot)
+            if current.get(path) != self._snapshot.get(path)
+        )
+        self._snapshot = current
+
+    def flush(self) -> Set[str]:
+        """Pass settled paths to the callback and return them."""
+        now = time.monotonic()
+        with self._lock:
+            ready = {
+                path
+                for path, changed in self._pending.items()
+                if now - changed >= self.settle
+            }
+            for path in ready:
+                del self._pending[path]
+        if ready:
+            try:
+                self.callback(ready)
+            except Exception:
+                logging.exception("Failed to update changed archives.")
+        return ready
+
+    def _run(self) -> None:
+        """Poll and flush until stopped."""
+        wait = self.interval if self.polling else min(self.interval, 0.5)
+        while not self._stop.wait(wait):
+            if self.polling:
+                try:
+                    self.poll()
+                except OSError as exc:
+                    logging.warning(f"Failed to scan media: {exc}")
+            self.flush()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the watcher threads to exit."""
+        self._stop.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+# =]
@@ -0,0 +1,287 @@
+"""Decode worker processes handing frames over through shared memory."""
+
+import os
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, TimeoutError
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+from .decoder import Bounds, get_decoder
+
+FRAME_BOUNDS = (2560, 1440)
+FRAME_CHANNELS = 4
+CHECK_INTERVAL = 0.5
+
+Source = Tuple[str, str]
+
+
+def read_source(archives, source: Source):
+    """Read member of a container, or a plain file for empty members."""
+    path, member = source
+    if member:
+        return archives.get(path).view_file(member)
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def decode_worker(
+    ring_name: str,
+    slot_bytes: int,
+    decoder_name: str,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    max_open: int = 8,
+) -> None:
+    """Decode sources from tasks into ring slots until a None task."""
+    from .util import ArchivePool
+
+    ring = shared_memory.SharedMemory(name=ring_name)
+    decoder = get_decoder(decoder_name)
+    archives = ArchivePool(max_open)
+    try:
+        for task_id, slot, source, bounds in iter(tasks.get, None):
+            try:
+                image = decoder.decode(read_source(archives, source), bounds)
+                if len(image.data) > slot_bytes:
+                    raise ValueError("Frame exceeds ring slot.")
+                start = slot * slot_bytes
+                ring.buf[start : start + len(image.data)] = image.data
+                results.put(
+                    (task_id, image.width, image.height, image.mode, "")
+                )
+            except Exception as exc:
+                results.put(
+                    (task_id, 0, 0, "", f"{type(exc).__name__}: {exc}")
+                )
+    finally:
+        archives.close()
+        ring.close()
+
+
+class Frame:
+    """Decoded pixels held in a ring slot until released."""
+
+    def __init__(
+        self,
+        workers: "DecodeWorkers",
+        slot: int,
+        size: Tuple[int, int],
+        mode: str,
+    ):
+        """Wrap slot holding width by height pixels in mode."""
+        self.width, self.height = size
+        self.mode = mode
+        self._workers = workers
+        self._slot = slot
+        start = slot * workers.slot_bytes
+        self.data: Optional[memoryview] = workers.ring.buf[
+            start : start + self.width * self.height * len(mode)
+        ]
+
+    @property
+    def stride(self) -> int:
+        """Number of bytes per row."""
+        return self.width * len(self.mode)
+
+    def release(self) -> None:
+        """Return slot to the ring, the data must not be used afterwards."""
+        if self.data is not None:
+            self.data.release()
+            self.data = None
+            self._workers.release(self._slot)
+
+    def __enter__(self) -> "Frame":
+        """Use frame as context manager."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Release frame on leaving the context."""
+        self.release()
+
+
+class DecodeWorkers:
+    """Pool of decode processes writing frames into a recycled ring.
+
+    Workers read compressed data themselves, so the viewer process only
+    handles decoded pixels. Submitting blocks while all slots are held.
+    Each worker has its own task queue, so the requests of a worker that
+    exits are failed and their slots freed before it is restarted.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        slots: int = None,
+        bounds: Tuple[int, int] = FRAME_BOUNDS,
+        decoder: str = "auto",
+    ):
+        """Allocate frame ring and start worker processes."""
+        self.workers = workers or os.cpu_count() or 1
+        self.bounds = bounds
+        self.slots = slots or 2 * self.workers
+        self.slot_bytes = bounds[0] * bounds[1] * FRAME_CHANNELS
+        self.ring = shared_memory.SharedMemory(
+            create=True, size=self.slots * self.slot_bytes
+        )
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+        self.decoder = decoder
+        self._pending: Dict[int, Tuple[Future, int, int]] = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._stopping = False
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._tasks: List[multiprocessing.Queue] = []
+        self._processes: List[multiprocessing.Process] = []
+        for index in range(self.workers):
+            self._tasks.append(self._context.Queue())
+            self._processes.append(self._start(index))
+        self._collector = threading.Thread(
+            target=self._collect, name="frames", daemon=True
+        )
+        self._collector.start()
+
+    def _start(self, index: int) -> multiprocessing.Process:
+        """Start worker process reading the task queue at index."""
+        process = self._context.Process(
+            target=decode_worker,
+            args=(
+                self.ring.name,
+                self.slot_bytes,
+                self.decoder,
+                self._tasks[index],
+                self._results,
+            ),
+            name=f"decode-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def submit(
+        self, source: Source, bounds: Bounds = None, timeout: float = None
+    ) -> Future:
+        """Queue decoding of source and return future of its Frame.
+
+        Raises TimeoutError if no slot is released within timeout seconds.
+        """
+        bounds = (
+            (
+                min(bounds[0] or self.bounds[0], self.bounds[0]),
+                min(bounds[1] or self.bounds[1], self.bounds[1]),
+            )
+            if bounds
+            else self.bounds
+        )
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No frame slot was released.") from None
+        future: Future = Future()
+        with self._lock:
+            task_id = self._next_id
+            self._next_id += 1
+            load = [0] * self.workers
+            for _, _, worker in self._pending.values():
+                load[worker] += 1
+            worker = load.index(min(load))
+            self._pending[task_id] = (future, slot, worker)
+            self._tasks[worker].put((task_id, slot, source, bounds))
+        return future
+
+    def decode(
+        self, source: Source, bounds: Bounds = None, timeout: float = 30.0
+    ) -> Frame:
+        """Decode source and wait for its frame."""
+        future = self.submit(source, bounds, timeout)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.add_done_callback(self._discard)
+            raise
+
+    @classmethod
+    def _discard(cls, future: Future) -> None:
+        """Release frame of a request that is no longer awaited."""
+        if not future.cancelled() and not future.exception():
+            future.result().release()
+
+    def _collect(self) -> None:
+        """Resolve futures as workers report finished frames."""
+        while True:
+            self._reap()
+            try:
+                result = self._results.get(timeout=CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            if result is None:
+                break
+            task_id, width, height, mode, error = result
+            with self._lock:
+                future, slot, _ = self._pending.pop(task_id, (None, 0, 0))
+            if future is None:
+                # Requests of exited workers were already failed.
+                continue
+            if error:
+                self.release(slot)
+                future.set_exception(ValueError(error))
+            else:
+                future.set_result(Frame(self, slot, (width, height), mode))
+
+    def _reap(self) -> None:
+        """Fail requests of exited workers, free their slots and restart."""
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._stopping:
+                continue
+            logging.warning(
+                f"Decode worker {process.name} exited: {process.exitcode}."
+            )
+            with self._lock:
+                lost = [
+                    task_id
+                    for task_id, (_, _, worker) in self._pending.items()
+                    if worker == index
+                ]
+                failed = [self._pending.pop(task_id) for task_id in lost]
+                self._tasks[index] = self._context.Queue()
+                self._processes[index] = self._start(index)
+            for future, slot, _ in failed:
+                self.release(slot)
+                future.set_exception(
+                    RuntimeError(f"Decode worker {process.name} exited.")
+                )
+
+    def release(self, slot: int) -> None:
+        """Return slot to the ring."""
+        self._free.put(slot)
+
+    def shutdown(self) -> None:
+        """Stop workers and free the frame ring."""
+        self._stopping = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._collector.join()
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future, _, _ in pending:
+            future.cancel()
+        try:
+            self.ring.close()
+        except BufferError:
+            # Frames still held by callers keep the mapping alive.
+            pass
+        self.ring.unlink()
+        logging.debug("Decode workers stopped.")
+
+
+# =]
@@ -35,6 +35,10 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require={
+        "async": ["psycopg[pool]>=3.1"],
+        "watch": ["watchdog>=2.0"],
+    },
     license="MIT license",
     long_description=readme + "\n\n" + history,
     include_package_data=True,
@@ -0,0 +1,151 @@
+"""Test module for the asyncio booru backend."""
+
+import time
+import asyncio
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import pytest
+from pyviewer.asyncbooru import AsyncBooruBrowser
+
+
+class DummyCursor:
+    """Mocking object for an async cursor answering tag and post queries."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.rows = []
+
+    async def execute(self, query, params=None):
+        self.pool.queries.append((query, params))
+        await asyncio.sleep(self.pool.delay)
+        if "FROM tags" in query:
+            self.rows = self.pool.tags
+            return
+        posts = self.pool.posts.get(params[0].strip("'"), [])
+        if "COUNT(*)" in query:
+            self.rows = [(len(posts),)]
+        else:
+            _, after, _, limit = params
+            self.rows = [
+                row for row in posts if after is None or row[0] < after
+            ][:limit]
+
+    async def fetchall(self):
+        return self.rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class DummyConnection:
+    """Mocking object for an async database connection."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return DummyCursor(self.pool)
+
+
+class DummyPool:
+    """Mocking object for an async connection pool tracking concurrency."""
+
+    def __init__(self, tags, posts, delay=0.0):
+        self.tags = tags
+        self.posts = posts
+        self.delay = delay
+        self.queries = []
+        self.active = 0
+        self.peak = 0
+
+    @asynccontextmanager
+    async def connection(self):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            yield DummyConnection(self)
+        finally:
+            self.active -= 1
+
+    async def close(self):
+        pass
+
+
+class DummyBooruBrowser(AsyncBooruBrowser):
+    """Async browser connected to a dummy pool."""
+
+    dummy_pool = None
+
+    def _connect(self, pool_size):
+        return self.dummy_pool
+
+
+@pytest.fixture
+def browser(tmp_path):
+    """Async browser over two tags with posts written under tmp_path."""
+    posts = {
+        tag: [(2, f"{tag * 32}"[:32], "jpg"), (1, f"{tag * 31}x"[:32], "png")]
+        for tag in "ab"
+    }
+    DummyBooruBrowser.dummy_pool = DummyPool(
+        [(1, "a", 30), (2, "b", 12)], posts, delay=0.05
+    )
+    booru = DummyBooruBrowser(
+        state_file=tmp_path / "state", tags=["a", "b", "c"]
+    )
+    booru._data_root = str(tmp_path)
+    for rows in posts.values():
+        for _, md5, file_ext in rows:
+            path = booru._file_path(md5, file_ext)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(md5.encode())
+    yield booru
+    booru.close()
+
+
+def test_tag_map(browser):
+    """Selected tags are resolved through the async pool."""
+    assert browser._tag_map["a"] == (1, 30)
+    assert browser._tag_map["c"] == (0, 0)
+
+
+def test_concurrent_queries(browser):
+    """Prefetched tags are queried while the active tag loads."""
+    browser.set_tag("a")
+    browser.prefetch_tag("b")
+    assert browser.files_at_tag("a")[0].stem == "a" * 32
+    assert browser.pool.peak == 2
+    assert len(browser.files_at_tag("b")) == 2
+
+
+def test_cancel_stale_queries(browser):
+    """Queries for tags the user moved away from are cancelled."""
+    browser.set_tag("a")
+    stale = browser.prefetch_tag("b")
+    assert browser.count == 2
+    with pytest.raises(CancelledError):
+        stale.result()
+
+
+def test_requery_cancelled(browser):
+    """A query cancelled while awaited is started again."""
+    thread = ThreadPoolExecutor(1).submit(browser.files_at_tag, "a")
+    time.sleep(0.01)
+    browser.cancel()
+    files = thread.result()
+    assert len(files) == 2 and files[1].suffix == ".png"
+
+
+def test_paged_media(browser):
+    """Files are fetched in pages after counting the posts."""
+    browser.page_size = 1
+    files = browser.files_at_tag("b")
+    assert len(files) == 2 and files.loaded == 0
+    assert [path.read_bytes() for path in files] == [
+        b"b" * 32,
+        b"b" * 31 + b"x",
+    ]
+    assert sum("LIMIT" in query for query, _ in browser.pool.queries) == 2
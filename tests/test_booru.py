@@ -0,0 +1,182 @@
+"""Test module for booru database access."""
+
+import pytest
+import threading
+import weakref
+from pathlib import Path
+from pyviewer.imageloader import BooruBrowser, PagedFiles, tsquery
+
+
+class DummyCursor:
+    """Mocking object for a cursor over post rows."""
+
+    def __init__(self, rows, queries=None, fail=""):
+        self.rows = rows
+        self.queries = queries if queries is not None else []
+        self.closed = False
+        self.fail = fail
+
+    def execute(self, query, params=None):
+        if self.fail and query.startswith(self.fail):
+            raise RuntimeError(query)
+        self.queries.append((query, params))
+
+    def fetchone(self):
+        return (len(self.rows),)
+
+    def fetchall(self):
+        _, after, limit = self.queries[-1][1]
+        return [row for row in self.rows if after is None or row[0] < after][
+            :limit
+        ]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+
+class DummyConnection:
+    """Mocking object for a pooled database connection."""
+
+    closed = False
+
+    def __init__(self, rows, fail=""):
+        self.rows = rows
+        self.queries = []
+        self.fail = fail
+
+    def cursor(self, name=None):
+        return DummyCursor(self.rows, self.queries, self.fail)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class DummyPool:
+    """Mocking object for a threaded connection pool."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.borrowed = 0
+        self.discarded = 0
+
+    def getconn(self):
+        self.borrowed += 1
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        self.borrowed -= 1
+        self.discarded += close
+
+
+def booru_browser(pool):
+    """Create a browser bound to pool without connecting to a server."""
+    browser = BooruBrowser.__new__(BooruBrowser)
+    browser._data_root = "/booru"
+    browser.page_size = 200
+    browser.pool = pool
+    browser._prepared = weakref.WeakSet()
+    browser._slots = threading.BoundedSemaphore(2)
+    return browser
+
+
+def file_path(md5, file_ext):
+    return Path(f"{md5}.{file_ext}")
+
+
+def post_rows(count):
+    """Return post rows ordered by descending id."""
+    return [(count - index, f"{index:032x}", "jpg") for index in range(count)]
+
+
+def page_source(rows):
+    """Return page query over rows and the list of requested offsets."""
+    requests = []
+
+    def fetch_page(after, limit):
+        requests.append(after)
+        return [row for row in rows if after is None or row[0] < after][:limit]
+
+    return fetch_page, requests
+
+
+def test_paged_files():
+    """Pages are fetched only as the index approaches the loaded end."""
+    fetch_page, requests = page_source(post_rows(25))
+    files = PagedFiles(fetch_page, 25, file_path, page_size=10)
+    assert len(files) == 25 and files.loaded == 0
+    assert files[0] == Path(f"{0:032x}.jpg")
+    assert files.loaded == 10 and requests == [None]
+    assert files[6] == Path(f"{6:032x}.jpg")
+    assert files.loaded == 20 and requests == [None, 16]
+    assert files[-1] == Path(f"{24:032x}.jpg")
+    assert len(list(files)) == 25 and len(requests) == 3
+
+
+def test_paged_files_shrink():
+    """Count follows the rows actually returned by the query."""
+    fetch_page, _ = page_source(post_rows(1))
+    files = PagedFiles(fetch_page, 3, file_path, page_size=10)
+    with pytest.raises(IndexError):
+        files[2]
+    assert len(files) == 1 and files[0] == Path(f"{0:032x}.jpg")
+    fetch_page, _ = page_source([])
+    assert list(PagedFiles(fetch_page, 2, file_path)) == []
+
+
+def test_paged_connections():
+    """Connections are returned after every page."""
+    conn = DummyConnection(post_rows(25))
+    browser = booru_browser(DummyPool(conn))
+    browser.page_size = 10
+    files = browser.files_at_tag("a")
+    assert len(files) == 25 and browser.pool.borrowed == 0
+    assert files[24] == Path(f"/booru/00/00/{24:032x}.jpg")
+    assert browser.pool.borrowed == 0
+    assert conn.queries[-1] == (
+        "EXECUTE pyviewer_files(%s, %s, %s)",
+        ("'a'", 6, 10),
+    )
+
+
+def test_batched_tag_lookup():
+    """Selected tags resolve with one prepared query per connection."""
+    conn = DummyConnection([(1, "a", 30), (3, "c", 12)])
+    browser = booru_browser(DummyPool(conn))
+    assert browser._get_selected_tags(["a", "b", "c"]) == {
+        "a": (1, 30),
+        "b": (0, 0),
+        "c": (3, 12),
+    }
+    browser._get_selected_tags(["a"])
+    executed = [query for query, _ in conn.queries]
+    assert executed.count("EXECUTE pyviewer_tags(%s)") == 2
+    assert sum(query.startswith("PREPARE") for query in executed) == 3
+    assert conn.queries[3][1] == (["a", "b", "c"],)
+    assert browser.pool.borrowed == 0
+
+
+def test_failed_prepare():
+    """Connections failing to prepare statements are closed and returned."""
+    browser = booru_browser(DummyPool(DummyConnection([], fail="PREPARE")))
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            browser._get_selected_tags(["a"])
+    assert browser.pool.borrowed == 0 and browser.pool.discarded == 3
+    assert browser._slots.acquire(blocking=False)
+
+
+def test_tsquery_quoting():
+    """Tags are passed as single quoted lexemes."""
+    assert tsquery("o'neil") == "'o''neil'"
@@ -0,0 +1,83 @@
+"""Test module for the contact sheet grid mode."""
+
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+from pyviewer import ArchiveBrowser
+from pyviewer.contactsheet import ContactSheet, sheet_rows
+
+MOCK_DATA_DIR = Path("tests/data")
+
+
+class SheetSource:
+    """Image loader stub with several archives of solid images."""
+
+    def sheet_collection(self, tag, pages, count):
+        """Return first pages of three archives."""
+        return [
+            [(archive, page) for page in range(pages)] for archive in "abc"
+        ]
+
+    def load_image(self, entry):
+        """Encode an image sized by its archive."""
+        output = BytesIO()
+        Image.new("RGB", (1024, 512 + 256 * "abc".index(entry[0]))).save(
+            output, format="JPEG"
+        )
+        return output.getvalue()
+
+
+def test_sheet_order():
+    """Leading pages of each archive are grouped in archive order."""
+    sheet = ContactSheet(pages=2, count=5)
+    sheet.load_media(SheetSource())
+    assert sheet.load_tag("tag") == 5
+    assert sheet.entries == [("a", 0), ("a", 1), ("b", 0), ("b", 1), ("c", 0)]
+    size = Image.open(BytesIO(sheet.thumbnail("tag", 4))).size
+    assert size == (256, 256)
+    assert sheet.thumbnail("other", 0) == bytes()
+    sheet.shutdown()
+
+
+def test_sheet_rows():
+    """Every archive keeps its row, short ones padded with empty cells."""
+    assert sheet_rows([["a0"], ["b0"], ["c0"]], 4, 240) == [
+        "a0",
+        None,
+        None,
+        None,
+        "b0",
+        None,
+        None,
+        None,
+        "c0",
+        None,
+        None,
+        None,
+    ]
+    rows = sheet_rows([["a0", "a1"], ["b0", "b1", "b2", "b3"], ["c0"]], 2, 9)
+    assert rows == ["a0", "a1", "b0", "b1", "c0", None]
+    assert sheet_rows([[], ["b0"]], 2, 1) == ["b0"]
+
+
+def test_sheet_budget():
+    """Thumbnails stay within the cache budget."""
+    sheet = ContactSheet(pages=4, count=12, max_bytes=4096)
+    sheet.load_media(SheetSource())
+    sheet.load_tag("tag")
+    sheet._pool.shutdown(wait=True)
+    assert 0 < len(sheet.cache) < 12 and sheet.cache.nbytes <= 4096
+
+
+def test_sheet_archive(tmp_path):
+    """Archive browser supplies the first pages of its archives."""
+    browser = ArchiveBrowser(MOCK_DATA_DIR, state_file=tmp_path / "state")
+    sheet = ContactSheet(pages=3)
+    sheet.load_media(browser)
+    assert sheet.load_tag("name") == 3
+    assert sheet.entries == browser.files_at_tag("name")[:3]
+    assert Image.open(BytesIO(sheet.thumbnail("name", 0))).width <= 256
+    sheet.shutdown()
+
+
+# =]
@@ -0,0 +1,84 @@
+"""Test module for the tar and directory containers."""
+
+import io
+import json
+import tarfile
+from pathlib import Path
+from pyviewer import ArchiveBrowser
+from pyviewer.container import (
+    DirectoryContainer,
+    TarContainer,
+    container_kind,
+    open_container,
+)
+from pyviewer.indexer import discover_archives
+from pyviewer.util import Archive
+
+MOCK_ARCHIVE = Path("tests/data/test.zip")
+META = json.dumps({"artist": ["name"]}).encode("utf8")
+
+
+def write_tar(path: Path, mode: str = "w") -> None:
+    """Write tar with metadata and two images."""
+    with tarfile.open(path, mode) as tar:
+        for name, data in (
+            ("metadata.json", META),
+            ("1.jpg", b"jpeg" * 64),
+            ("2.png", b"png" * 64),
+        ):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def test_tar_container(tmp_path):
+    """Uncompressed tar members are views located by the offset index."""
+    write_tar(tmp_path / "plain.tar")
+    write_tar(tmp_path / "packed.tar.gz", "w:gz")
+    with open_container(tmp_path / "plain.tar") as tar:
+        assert isinstance(tar, TarContainer) and not tar.compressed
+        assert tar.image_files == ["1.jpg", "2.png"]
+        assert tar.meta_file == {"artist": ["name"]}
+        view = tar.view_file("1.jpg")
+        assert isinstance(view, memoryview) and view == b"jpeg" * 64
+    with open_container(tmp_path / "packed.tar.gz") as tar:
+        assert tar.compressed and tar.view_file("2.png") == b"png" * 64
+    assert container_kind("a.CBZ") == "zip" and container_kind("a.txt") == ""
+
+
+def test_directory_container(tmp_path):
+    """Files of a plain directory are its members."""
+    (tmp_path / "metadata.json").write_bytes(META)
+    (tmp_path / "1.jpg").write_bytes(b"jpeg")
+    with open_container(tmp_path) as directory:
+        assert isinstance(directory, DirectoryContainer)
+        assert directory.image_files == ["1.jpg"]
+        assert directory.load_file("1.jpg") == b"jpeg"
+        version = directory.version("1.jpg")
+    (tmp_path / "1.jpg").write_bytes(b"jpeg2")
+    assert DirectoryContainer(tmp_path).version("1.jpg") != version
+    assert isinstance(open_container(MOCK_ARCHIVE), Archive)
+
+
+def test_browse_containers(tmp_path):
+    """Archives, tars and image directories are browsed without repacking."""
+    library = tmp_path / "library"
+    (library / "pages").mkdir(parents=True)
+    (library / "pages" / "metadata.json").write_bytes(META)
+    (library / "pages" / "1.jpg").write_bytes(b"jpeg")
+    (library / "book.cbz").write_bytes(MOCK_ARCHIVE.read_bytes())
+    write_tar(library / "book.tar")
+    assert list(discover_archives([library])) == [
+        str(library / name) for name in ("book.cbz", "book.tar", "pages")
+    ]
+    browser = ArchiveBrowser(library, state_file=tmp_path / "state")
+    assert set(browser.value) == {
+        str(library / name) for name in ("book.cbz", "book.tar", "pages")
+    }
+    files = browser.files
+    assert (library / "pages", "1.jpg") in files
+    assert browser.load_image((library / "book.tar", "1.jpg")) == b"jpeg" * 64
+    assert browser.load_image((library / "pages", "1.jpg")) == b"jpeg"
+
+
+# =]
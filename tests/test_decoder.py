@@ -0,0 +1,58 @@
+"""Test module for pluggable image decoders."""
+
+from io import BytesIO
+import pytest
+from PIL import Image
+from pyviewer.decoder import (
+    Decoder,
+    available_decoders,
+    fit,
+    get_decoder,
+)
+
+
+def encode(fmt: str, mode: str = "RGB", size=(400, 300)) -> bytes:
+    """Encode a gradient test image."""
+    image = Image.linear_gradient("L").resize(size).convert(mode)
+    output = BytesIO()
+    image.save(output, format=fmt)
+    return output.getvalue()
+
+
+def test_fit():
+    """Sizes shrink to bounds keeping aspect ratio and never grow."""
+    assert fit((400, 300), (200, 200)) == (200, 150)
+    assert fit((400, 300), (0, 150)) == (200, 150)
+    assert fit((400, 300), (800, 800)) == (400, 300)
+    assert fit((400, 300), None) == (400, 300)
+
+
+@pytest.mark.parametrize("name", available_decoders())
+def test_decode_scaled(name):
+    """Every available backend decodes within the requested bounds."""
+    decoder = get_decoder(name)
+    image = decoder.decode(encode("JPEG"), (100, 100))
+    assert (image.width, image.height) == (100, 75)
+    assert image.mode == "RGB" and len(image.data) == 100 * 75 * 3
+    image = decoder.decode(encode("PNG", "RGBA"))
+    assert (image.width, image.height, image.mode) == (400, 300, "RGBA")
+    assert decoder.verify(encode("PNG")) and not decoder.verify(b"broken")
+    assert decoder.decode_qimage(encode("JPEG"), (40, 0)).width() == 40
+
+
+def test_verify_truncated():
+    """Pillow based decoders catch truncated images."""
+    assert get_decoder("pillow").verify(encode("JPEG"))
+    assert not get_decoder("pillow").verify(encode("JPEG")[:-200])
+
+
+def test_abstract_decoder():
+    """Decoders must implement decode."""
+    with pytest.raises(TypeError):
+        Decoder()
+
+
+def test_unknown_decoder():
+    """Unknown backends are rejected."""
+    with pytest.raises(ValueError):
+        get_decoder("gif")
@@ -0,0 +1,98 @@
+"""Test module for duplicate detection."""
+
+import json
+import random
+from io import BytesIO
+from zipfile import ZipFile
+from PIL import Image
+from pyviewer import ArchiveBrowser
+from pyviewer.dedup import BKTree, DuplicateFilter, DuplicateIndex
+from pyviewer.hashing import dhash, hamming, phash
+from pyviewer.statestore import StateStore
+
+
+def encode(image: Image.Image, quality: int = 90) -> bytes:
+    """Encode image as JPEG."""
+    output = BytesIO()
+    image.convert("RGB").save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def test_bk_tree_search():
+    """Radius queries match a brute force scan."""
+    rand = random.Random(0)
+    values = [rand.getrandbits(16) for _ in range(500)]
+    tree = BKTree()
+    for position, value in enumerate(values):
+        tree.add(value, position)
+    assert len(tree) == 500
+    query = rand.getrandbits(16)
+    assert sorted(tree.search(query, 3)) == sorted(
+        (hamming(query, value), position)
+        for position, value in enumerate(values)
+        if hamming(query, value) <= 3
+    )
+
+
+def test_perceptual_hashes():
+    """Rescaled copies stay close while different images do not."""
+    image = Image.effect_mandelbrot((320, 240), (-2, -1.5, 1, 1.5), 64)
+    original = encode(image)
+    scaled = encode(image.resize((160, 120)), quality=50)
+    other = encode(Image.effect_noise((320, 240), 64))
+    for function in (dhash, phash):
+        assert hamming(function(original), function(scaled)) <= 6
+        assert hamming(function(original), function(other)) > 12
+
+
+def test_duplicate_index(tmp_path):
+    """Exact and near matches end up in one cluster per image."""
+    index = DuplicateIndex(distance=2)
+    index.add("a", "x", "00ff")
+    index.add("b", "x", "f000")
+    index.add("c", "y", "00fe")
+    index.add("d", "z", "ffff")
+    assert index.groups() == [["a", "b", "c"]]
+    assert index.clusters() == {"a": 0, "b": 0, "c": 0}
+    index.write_report(tmp_path / "report")
+    report = (tmp_path / "report").read_text().splitlines()
+    assert json.loads(report[0]) == {"cluster": 0, "files": ["a", "b", "c"]}
+
+
+def test_duplicate_filter():
+    """Only the first shown member of a cluster is kept."""
+    hidden = DuplicateFilter({"a": 0, "b": 0})
+    assert hidden.unseen(["a", "x", "b"], str) == ["a", "x"]
+    assert hidden.unseen(["b", "y", "a"], str) == ["b", "y"]
+    hidden.mark_shown("a")
+    hidden.mark_shown("x")
+    assert hidden.unseen(["b", "y", "a"], str) == ["y", "a"]
+
+
+def test_skip_duplicates(tmp_path):
+    """Archive browser hides images shown under an earlier tag."""
+    data = encode(Image.effect_mandelbrot((64, 64), (-2, -1.5, 1, 1.5), 64))
+    for name, artist in (("a.zip", "first"), ("b.zip", "second")):
+        with ZipFile(tmp_path / name, "w") as zip:
+            zip.writestr("metadata.json", json.dumps({"artist": [artist]}))
+            zip.writestr("1.jpg", data)
+            zip.writestr(f"{name}.jpg", encode(Image.new("L", (8, 8), 9)))
+    state = tmp_path / "state"
+    browser = ArchiveBrowser(tmp_path, state_file=state)
+    digests = browser.hash_entries(
+        browser.files_at_tag("first") + browser.files_at_tag("second")
+    )
+    assert len(digests) == 4 and len(set(digests.values())) == 2
+    index = DuplicateIndex(distance=0)
+    for key, digest in digests.items():
+        index.add(key, digest, None)
+    StateStore(state).save_duplicates(index.clusters())
+    browser = ArchiveBrowser(tmp_path, state_file=state, skip_duplicates=True)
+    browser.set_tag("first")
+    assert browser.count == 2
+    browser.set_tag("second")
+    assert browser.count == 2
+    browser.set_tag("first")
+    browser.duplicates.mark_shown(browser.path(0))
+    browser.set_tag("second")
+    assert browser.count == 1
@@ -0,0 +1,73 @@
+"""Test module for cached content hashes."""
+
+import hashlib
+from zipfile import ZipFile
+import pytest
+from pyviewer.hashing import HashService, hasher
+from pyviewer.statestore import StateStore
+from pyviewer.util import Archive
+
+
+def write_archive(path, members):
+    """Write archive with the given member contents."""
+    with ZipFile(path, "w") as zip:
+        for name, data in members.items():
+            zip.writestr(name, data)
+
+
+def test_member_hash_cache(tmp_path):
+    """Member digests are reused until the member CRC changes."""
+    path = tmp_path / "a.zip"
+    write_archive(path, {"1.jpg": b"one"})
+    service = HashService(StateStore(tmp_path / "state"), "blake2b")
+    with Archive(path) as archive:
+        digest = service.member_hash(archive, "1.jpg")
+    assert digest == hashlib.blake2b(b"one").hexdigest()
+    service.store.save_content_hashes(
+        str(path),
+        "blake2b",
+        [("1.jpg", ZipFile(path).getinfo("1.jpg").CRC, "cached")],
+    )
+    with Archive(path) as archive:
+        assert service.member_hash(archive, "1.jpg") == "cached"
+    write_archive(path, {"1.jpg": b"changed"})
+    with Archive(path) as archive:
+        assert service.member_hash(archive, "1.jpg") == (
+            hashlib.blake2b(b"changed").hexdigest()
+        )
+
+
+def test_file_hash_from_name(tmp_path):
+    """Booru file names already carry the md5 of their content."""
+    service = HashService(StateStore(tmp_path / "state"))
+    name = tmp_path / f"{'0' * 32}.jpg"
+    assert service.file_hash(name) == "0" * 32
+    other = tmp_path / "other.jpg"
+    other.write_bytes(b"data")
+    assert service.hash_files([name, other]) == {
+        str(name): "0" * 32,
+        str(other): hashlib.md5(b"data").hexdigest(),
+    }
+
+
+def test_hash_members(tmp_path):
+    """Bulk hashing finds identical images across archives."""
+    write_archive(tmp_path / "a.zip", {"1.jpg": b"same", "2.jpg": b"a"})
+    write_archive(tmp_path / "b.zip", {"1.jpg": b"same"})
+    service = HashService(StateStore(tmp_path / "state"), workers=2)
+    entries = [
+        (str(tmp_path / "a.zip"), "1.jpg"),
+        (str(tmp_path / "a.zip"), "2.jpg"),
+        (str(tmp_path / "b.zip"), "1.jpg"),
+    ]
+    digests = service.hash_members(entries)
+    assert digests[entries[0]] == digests[entries[2]] != digests[entries[1]]
+    cached = service.store.content_hashes(str(tmp_path / "a.zip"), "md5")
+    assert set(cached) == {"1.jpg", "2.jpg"}
+    assert service.hash_members(entries) == digests
+
+
+def test_unknown_algorithm():
+    """Unsupported algorithms are rejected up front."""
+    with pytest.raises(ValueError):
+        hasher("crc32")
@@ -0,0 +1,64 @@
+"""Test module for incremental archive indexing."""
+
+import os
+import shutil
+from pyviewer.indexer import (
+    TagIndexer,
+    archive_tags,
+    discover_archives,
+    scan_archive,
+)
+
+MOCK_ARCHIVE = "tests/data/test.zip"
+
+
+def test_archive_tags():
+    """Artist tags are split on separators and large lists are ignored."""
+    assert archive_tags({"artist": ["a|b", "c", "a"]}) == ["a", "b", "c"]
+    assert archive_tags({"artist": ["a", "b", "c", "d"]}) == []
+    assert archive_tags({}) == []
+
+
+def test_incremental_update(tmp_path):
+    """Only new or modified archives are parsed again on update."""
+    for name in ("one.zip", "two.zip"):
+        shutil.copy(MOCK_ARCHIVE, tmp_path / name)
+    paths = [str(tmp_path / name) for name in ("one.zip", "two.zip")]
+    indexer = TagIndexer(workers=1)
+    records = indexer.update(paths)
+    assert records[paths[0]].tags == ["name"]
+    assert TagIndexer.tag_map(records) == {"name": tuple(reversed(paths))}
+    stale = records[paths[0]]._replace(tags=["stale"])
+    records = indexer.update(paths, {**records, paths[0]: stale})
+    assert records[paths[0]].tags == ["stale"]
+    os.utime(paths[0], (0, 0))
+    os.remove(paths[1])
+    records = indexer.update(paths[:1], records)
+    assert list(records) == paths[:1]
+    assert records[paths[0]].tags == ["name"]
+
+
+def test_discover_archives(tmp_path):
+    """Archives are found recursively across roots, symlinks once."""
+    (tmp_path / "one" / "nested").mkdir(parents=True)
+    (tmp_path / "two").mkdir()
+    for name in ("one/a.zip", "one/nested/b.zip", "two/c.zip"):
+        shutil.copy(MOCK_ARCHIVE, tmp_path / name)
+    (tmp_path / "one" / "notes.txt").write_bytes(b"")
+    os.symlink(tmp_path / "one" / "a.zip", tmp_path / "two" / "link.zip")
+    os.symlink(tmp_path / "one", tmp_path / "two" / "loop")
+    found = list(discover_archives([tmp_path / "one", tmp_path / "two"]))
+    assert found == [
+        str(tmp_path / name)
+        for name in ("one/a.zip", "one/nested/b.zip", "two/c.zip")
+    ]
+    records = TagIndexer(workers=2, chunksize=1).update(iter(found))
+    assert list(records) == found
+
+
+def test_scan_broken(tmp_path):
+    """Unreadable archives are reported instead of raising."""
+    broken = tmp_path / "broken.zip"
+    broken.write_bytes(b"not a zip")
+    path, record, error = scan_archive(str(broken))
+    assert record.tags == [] and error
@@ -0,0 +1,33 @@
+"""Test module for latency instrumentation."""
+
+from io import StringIO
+from pyviewer.metrics import Histogram, Metrics
+
+
+def test_histogram_percentiles():
+    """Percentiles fall within the bucket resolution of the samples."""
+    histogram = Histogram()
+    for index in range(1, 101):
+        histogram.record(index * 1e-3)
+    stats = histogram.summary()
+    assert stats["count"] == 100
+    assert 50 <= stats["p50"] <= 50 * Histogram.RESOLUTION
+    assert 99 <= stats["p99"] <= 100
+    assert stats["max"] == 100
+
+
+def test_timed_opt_in():
+    """Stages are only recorded while instrumentation is enabled."""
+    registry = Metrics()
+    double = registry.timed("double")(lambda value: 2 * value)
+    assert double(2) == 4 and not registry.histograms
+    registry.enabled = True
+    assert double(3) == 6
+    with registry.timer("block"):
+        pass
+    assert registry.histograms["double"].count == 1
+    assert registry.histograms["block"].count == 1
+    output = StringIO()
+    registry.dump(output)
+    assert "double" in output.getvalue()
+    assert "double p50" in registry.overlay(("double", "missing"))
@@ -0,0 +1,96 @@
+"""Test module for background image prefetching."""
+
+import json
+from pathlib import Path
+from zipfile import ZipFile
+from pyviewer import ArchiveBrowser
+from pyviewer.prefetch import ImageCache, Prefetcher
+from pyviewer.statestore import StateStore
+
+MOCK_DATA_DIR = Path("tests/data")
+
+
+def test_cache_budget():
+    """Cache evicts oldest entries once its byte budget is exceeded."""
+    cache = ImageCache(max_bytes=10)
+    cache.put("a", bytes(4))
+    cache.put("b", bytes(4))
+    cache.get("a")
+    cache.put("c", bytes(4))
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.nbytes == 8
+    cache.put("d", bytes(11))
+    assert "d" not in cache
+
+
+def test_prefetch_neighbours(tmp_path):
+    """Images surrounding the index are loaded into the cache."""
+    browser = ArchiveBrowser(MOCK_DATA_DIR, state_file=tmp_path / "state")
+    browser.set_tag("name")
+    prefetcher = Prefetcher(depth=2)
+    prefetcher.load_media(browser)
+    assert prefetcher.image(5) == browser.image(5)
+    prefetcher._pool.shutdown(wait=True)
+    for index in (3, 4, 5, 6, 7):
+        assert prefetcher.cache.get(prefetcher.key(index)) == browser.image(
+            index
+        )
+    assert prefetcher.key(8) not in prefetcher.cache
+
+
+def test_preload_adjacent(tmp_path):
+    """First pages of the tags next to the active one are loaded ahead."""
+    for artist in ("a", "b", "c", "d"):
+        with ZipFile(tmp_path / f"{artist}.zip", "w") as zip:
+            zip.writestr("metadata.json", json.dumps({"artist": [artist]}))
+            for page in range(3):
+                zip.writestr(f"{page}.jpg", f"{artist}{page}")
+    browser = ArchiveBrowser(tmp_path, state_file=tmp_path / "state")
+    browser.set_tag("b")
+    prefetcher = Prefetcher(depth=0, pages=2)
+    prefetcher.load_media(browser)
+    prefetcher.preload()
+    assert sorted(prefetcher.preloaded) == ["a", "c"]
+    for _, future in list(prefetcher._preloads.values()):
+        future.result()
+    files = browser.files_at_tag("c")
+    assert prefetcher.cache.get(browser.entry_key(files[1])) == b"c1"
+    assert browser.entry_key(files[2]) not in prefetcher.cache
+    browser.set_tag("c")
+    assert "c" in browser._resolved
+    assert browser.files == browser.files_at_tag("c")
+    assert "c" not in browser._resolved
+    prefetcher.preload()
+    assert sorted(prefetcher.preloaded) == ["b", "c", "d"]
+    assert set(browser._resolved) <= {"b", "c", "d"}
+    assert prefetcher.image(0) == b"c0"
+    prefetcher.shutdown()
+
+
+def test_skipped_duplicates(tmp_path):
+    """Cached images follow a list that shrank once a duplicate was shown."""
+    for artist, pages in (("a", "d"), ("b", "xdq")):
+        with ZipFile(tmp_path / f"{artist}.zip", "w") as zip:
+            zip.writestr("metadata.json", json.dumps({"artist": [artist]}))
+            for page, data in enumerate(pages):
+                zip.writestr(f"{page}.jpg", data)
+    state = tmp_path / "state"
+    browser = ArchiveBrowser(tmp_path, state_file=state)
+    StateStore(state).save_duplicates(
+        {
+            browser.entry_key(browser.files_at_tag("a")[0]): 0,
+            browser.entry_key(browser.files_at_tag("b")[1]): 0,
+        }
+    )
+    browser = ArchiveBrowser(tmp_path, state_file=state, skip_duplicates=True)
+    prefetcher = Prefetcher(depth=1, pages=0)
+    prefetcher.load_media(browser)
+    browser.set_tag("b")
+    assert prefetcher.image(1) == b"d"
+    browser.set_tag("a")
+    assert prefetcher.image(0) == b"d"
+    browser.duplicates.mark_shown(browser.path(0))
+    browser.set_tag("b")
+    assert browser.count == 2
+    assert prefetcher.image(1) == browser.image(1) == b"q"
+    prefetcher.shutdown()
@@ -0,0 +1,52 @@
+"""Test module for the QML image provider."""
+
+from pathlib import Path
+from PySide6.QtCore import QSize
+from pyviewer import ArchiveBrowser, PyViewer
+from pyviewer.util import Archive
+from pyviewer.provider import (
+    ImageProvider,
+    decode_image,
+    image_url,
+    parse_image_id,
+)
+
+MOCK_DATA_DIR = Path("tests/data")
+
+
+def test_image_url():
+    """Tag names are escaped so they survive as a single url segment."""
+    assert image_url("a/b c", 3, 1) == "image://pyviewer/a%2Fb%20c/1/3"
+    assert parse_image_id("a%2Fb%20c/1/3") == ("a/b c", 3)
+
+
+def test_request_image(tmp_path):
+    """Provider decodes images of the active tag and ignores stale ones."""
+    viewer = PyViewer(prefetch_depth=0)
+    viewer.load_media(
+        ArchiveBrowser(MOCK_DATA_DIR, state_file=tmp_path / "state")
+    )
+    viewer.imageloader.set_tag("name")
+    provider = ImageProvider(viewer)
+    url = viewer.source(2)
+    assert url == image_url("name", 2, viewer.generation)
+    size = QSize()
+    image = provider.requestImage(url.split("/", 3)[-1], size, QSize())
+    reference = decode_image(viewer.imageloader.image(2))
+    assert not image.isNull()
+    assert image == reference
+    assert size == reference.size()
+    viewer.reset_files()
+    assert viewer.source(2) != url
+    stale = provider.requestImage("none/1/2", QSize(), QSize())
+    assert stale.isNull()
+
+
+def test_decode_scaled():
+    """Decoding honours the requested bounding size."""
+    with Archive(str(MOCK_DATA_DIR / "test.zip")) as archive:
+        data = archive.load_file("image1.png")
+    full = decode_image(data)
+    scaled = decode_image(data, QSize(full.width() // 2, 0))
+    assert scaled.width() == full.width() // 2
+    assert decode_image(data, QSize(full.width() * 2, 0)) == full
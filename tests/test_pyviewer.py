@@ -22,3 +22,42 @@ def test_content(response):
     """Sample pytest test function with the pytest fixture as an argument."""
     # from bs4 import BeautifulSoup
     # assert 'GitHub' in BeautifulSoup(response.content).title.string
+
+
+def test_lazy_imports():
+    """Importing the package and console script skips heavy backends."""
+    import subprocess
+    import sys
+
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, pyviewer.cli; pyviewer.ArchiveBrowser;"
+            + " print(*sorted(sys.modules))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.split()
+    assert "pyviewer.imageloader" in loaded
+    assert not {"PIL", "PySide6", "psycopg2"} & set(loaded)
+
+
+def test_background_load(tmp_path):
+    """Media built on a worker thread is loaded on the Qt thread."""
+    from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer
+    from pyviewer import ArchiveBrowser, PyViewer
+
+    app = QCoreApplication.instance() or QCoreApplication()
+    viewer = PyViewer(prefetch_depth=0)
+    assert not viewer.ready and viewer.source(0) == ""
+    viewer.load_next_archive(1)
+    loop = QEventLoop()
+    viewer.loaded.connect(loop.quit)
+    QTimer.singleShot(5000, loop.quit)
+    viewer.load_media_async(
+        lambda: ArchiveBrowser("tests/data", state_file=tmp_path / "state")
+    )
+    loop.exec()
+    assert app and viewer.ready and viewer.length_images
@@ -0,0 +1,39 @@
+"""Test module for the rendition disk cache."""
+
+from io import BytesIO
+from PIL import Image
+from pyviewer.rendition import RenditionCache, render, rendition_key
+
+
+def sample_image(size=(640, 480)) -> bytes:
+    """Encode a plain test image."""
+    output = BytesIO()
+    Image.new("RGB", size, (200, 10, 10)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def test_render_bounds():
+    """Renditions fit within the requested bounds."""
+    image = Image.open(BytesIO(render(sample_image(), (64, 64))))
+    assert image.size == (64, 48)
+
+
+def test_cache_hit(tmp_path):
+    """Stored renditions are served without invoking the loader."""
+    cache = RenditionCache(tmp_path, sizes={"thumb": (32, 32)})
+    key = rendition_key("archive.zip", "image1.jpg", 1234)
+    data = cache.get(key, "thumb", sample_image)
+    assert cache.get(key, "thumb", lambda: 1 / 0) == data
+    assert cache.nbytes == len(data)
+    assert RenditionCache(tmp_path).nbytes == len(data)
+    assert cache.fit(16, 32) == "thumb" and cache.fit(64, 16) == ""
+
+
+def test_eviction(tmp_path):
+    """Cache stays within its byte budget."""
+    cache = RenditionCache(tmp_path, max_bytes=1, sizes={"thumb": (32, 32)})
+    cache.max_bytes = 3 * len(cache.get("first", "thumb", sample_image))
+    for index in range(10):
+        cache.get(rendition_key(index), "thumb", sample_image)
+    assert cache.nbytes <= cache.max_bytes
+    assert len(list(cache._entries())) < 10
@@ -0,0 +1,69 @@
+"""Test module for the SQLite state store."""
+
+import json
+from pathlib import Path
+from pyviewer import ArchiveBrowser
+from pyviewer.statestore import StateStore
+from pyviewer.util import FilterEntry
+
+MOCK_DATA_DIR = Path("tests/data")
+
+
+def test_json_migration(tmp_path):
+    """Legacy JSON state is imported once and kept as a backup."""
+    state_file = tmp_path / "state"
+    legacy = [
+        {"root": {"b": ["x.zip"], "a": ["y.zip", "z.zip"]}},
+        [["b", True]],
+        {"root": {"x.zip": [1.0, 10, ["b"]]}},
+    ]
+    state_file.write_text(json.dumps(legacy))
+    store = StateStore(state_file)
+    assert list(store.load_tag_map("root").items()) == [
+        ("b", ("x.zip",)),
+        ("a", ("y.zip", "z.zip")),
+    ]
+    assert store.load_filter() == [FilterEntry("b", True)]
+    assert store.load_archive_index("root")["x.zip"].tags == ["b"]
+    assert store.load_tag_map("other") is None
+    store.close()
+    assert (tmp_path / "state.json").exists()
+    assert StateStore(state_file).load_filter() == [FilterEntry("b", True)]
+
+
+def test_filter_persistence(tmp_path):
+    """Filter decisions are stored as they are made and undone."""
+    state_file = tmp_path / "state"
+    browser = ArchiveBrowser(MOCK_DATA_DIR, state_file=state_file)
+    browser.set_tag("name")
+    browser.update_tag_filter(True)
+    browser.update_tag_filter(False)
+    browser.undo_last_filter()
+    store = StateStore(state_file)
+    assert store.load_filter() == [FilterEntry("name", True)]
+    assert set(store.load_tag_map(str(MOCK_DATA_DIR))) == {"name", "none"}
+
+
+def test_listing_cache(tmp_path):
+    """Archive listings are reused until the archive changes on disk."""
+    state_file = tmp_path / "state"
+    browser = ArchiveBrowser(MOCK_DATA_DIR, state_file=state_file)
+    browser.set_tag("name")
+    path = str(MOCK_DATA_DIR / "test.zip")
+    members = browser.image_files(path)
+    assert len(browser.files) == len(members) == 30
+    assert browser._warmed == {"none"}
+    browser.set_tag("none")
+    browser.warm_listings()
+    assert browser._warmed == {"name"}
+    browser._warmer.shutdown(wait=True)
+    store = StateStore(state_file)
+    assert store.image_files(path)[2] == members
+    assert store.image_files(str(MOCK_DATA_DIR / "broken.zip"))
+    mtime, size, _ = store.image_files(path)
+    store.save_image_files(path, mtime, size, ["cached.png"])
+    fresh = ArchiveBrowser(MOCK_DATA_DIR, state_file=state_file)
+    assert fresh.image_files(path) == ["cached.png"]
+    store.save_image_files(path, mtime - 1, size, ["stale.png"])
+    fresh = ArchiveBrowser(MOCK_DATA_DIR, state_file=state_file)
+    assert fresh.image_files(path) == members
@@ -0,0 +1,135 @@
+"""Test module for utility containers."""
+
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+import pytest
+from pyviewer.util import Archive, ArchivePool, TagIndex, TagManager
+
+MOCK_ARCHIVE = "tests/data/test.zip"
+
+
+def test_archive_pool_reuse():
+    """Repeated lookups of one archive parse it once."""
+    pool = ArchivePool(max_open=2)
+    first = pool.get(MOCK_ARCHIVE)
+    for _ in range(10):
+        assert pool.get(MOCK_ARCHIVE) is first
+    assert pool.stats == {"open": 1, "hits": 10, "misses": 1}
+    pool.close()
+    assert len(pool) == 0
+    assert first.fp is None
+
+
+def test_archive_pool_eviction():
+    """Least recently used archive is closed once the pool is full."""
+    pool = ArchivePool(max_open=1)
+    first = pool.get(MOCK_ARCHIVE)
+    second = pool.get("tests/data/broken.zip")
+    assert len(pool) == 1
+    assert first.fp is None
+    assert pool.get("tests/data/broken.zip") is second
+    pool.close()
+
+
+def test_archive_pool_lease():
+    """Leased archives are closed only once returned."""
+    pool = ArchivePool(max_open=1)
+    with pool.lease(MOCK_ARCHIVE) as first:
+        pool.get("tests/data/broken.zip")
+        pool.discard(MOCK_ARCHIVE)
+        assert first.fp is not None and first.image_files
+    assert first.fp is None
+    with pool.lease(MOCK_ARCHIVE) as second:
+        pool.close()
+        assert second.fp is not None
+    assert second.fp is None and len(pool) == 0
+
+
+def test_archive_view_file(tmp_path):
+    """Stored members are views on the mapped archive file."""
+    path = tmp_path / "mixed.zip"
+    with ZipFile(path, "w") as zip:
+        zip.writestr("stored.jpg", b"jpeg" * 64, ZIP_STORED)
+        zip.writestr("packed.png", b"png" * 64, ZIP_DEFLATED)
+    archive = Archive(path)
+    view = archive.view_file("stored.jpg")
+    assert isinstance(view, memoryview) and view == b"jpeg" * 64
+    packed = archive.view_file("packed.png")
+    assert isinstance(packed, bytes) and packed == b"png" * 64
+    archive.close()
+    assert view.tobytes() == b"jpeg" * 64
+
+
+def test_archive_view_bad_header(tmp_path):
+    """Stored members are checked against their local header."""
+    path = tmp_path / "broken.zip"
+    with ZipFile(path, "w") as zip:
+        zip.writestr("stored.jpg", b"jpeg", ZIP_STORED)
+    data = bytearray(path.read_bytes())
+    data[0:4] = b"XXXX"
+    path.write_bytes(bytes(data))
+    with Archive(path) as archive:
+        with pytest.raises(ValueError):
+            archive.view_file("stored.jpg")
+
+
+def test_tag_index():
+    """Removed tags are skipped by rank and restored in place."""
+    index = TagIndex(["a", "b", "c", "d", "e"])
+    index.remove("b")
+    index.remove("d")
+    assert list(index) == ["a", "c", "e"] and len(index) == 3
+    assert [index[rank] for rank in range(3)] == ["a", "c", "e"]
+    assert index[-1] == "e" and index.index("e") == 2
+    assert "b" not in index
+    assert index.restore("d") == 2
+    assert list(index) == ["a", "c", "d", "e"]
+
+
+def test_tag_index_add():
+    """Added tags are appended, known ones reactivated in place."""
+    index = TagIndex(["a", "b", "c"])
+    index.remove("b")
+    assert index.add("d") == 2 and index.add("e") == 3
+    assert index.add("b") == 1
+    assert list(index) == ["a", "b", "c", "d", "e"]
+    assert [index.index(tag) for tag in "abcde"] == [0, 1, 2, 3, 4]
+
+
+def test_tag_map_update():
+    """Tag map updates keep the active tag selected."""
+    manager = TagManager({tag: (tag,) for tag in "abc"}, [("x", False)])
+    manager.set_tag("c")
+    manager.update_tag_map({"a": (), "x": ("x",), "d": ("d",)})
+    assert manager.tags == ["b", "c", "d"] and manager.tag == "c"
+
+
+def test_tag_filter_undo():
+    """Filter decisions hide tags until they are undone."""
+    manager = TagManager({tag: (tag,) for tag in "abcd"}, [("a", True)])
+    assert manager.tags == ["b", "c", "d"] and manager.filter == {"a"}
+    manager.set_tag("c")
+    manager.update_tag_filter(False)
+    assert manager.tag == "d" and manager.filter == {"a", "c"}
+    assert manager.tag_at(0) == "b" and manager.tag_at(2) == "b"
+    manager.adjust_index(1)
+    manager.undo_last_filter()
+    assert manager.tag == "c" and manager.tags == ["b", "c", "d"]
+    assert manager.filter == {"a"}
+
+
+def test_files_reset_race():
+    """Media loaded for a tag that was left meanwhile is not cached."""
+    manager = TagManager({tag: (tag,) for tag in "abc"}, [])
+    del manager.files
+    load_files = manager.load_files
+
+    def switch_tag(tag):
+        manager.adjust_index(1)
+        del manager.files
+        return load_files(tag)
+
+    manager.load_files = switch_tag
+    assert manager.files == ("a",)
+    manager.load_files = load_files
+    assert manager.tag == "b" and manager.files == ("b",)
+    assert manager.entry_at(4) == "b"
@@ -0,0 +1,52 @@
+"""Test module for parallel archive validation."""
+
+from io import BytesIO
+from zipfile import ZipFile
+from PIL import Image
+from pyviewer.validation import ArchiveValidator, validate_archive
+
+MOCK_ARCHIVE = "tests/data/test.zip"
+BROKEN_ARCHIVE = "tests/data/broken.zip"
+
+
+def test_validate_archive():
+    """Broken members are reported while intact archives pass."""
+    assert validate_archive(MOCK_ARCHIVE) == []
+    errors = validate_archive(BROKEN_ARCHIVE)
+    assert [error.member for error in errors] == ["image1.png"]
+
+
+def test_resume_report(tmp_path):
+    """Archives recorded in the report are skipped on the next run."""
+    report = tmp_path / "report.jsonl"
+    validator = ArchiveValidator(report, workers=2)
+    errors = validator.run([MOCK_ARCHIVE, BROKEN_ARCHIVE])
+    assert len(errors) == 1
+    assert validator.checkpoint() == {MOCK_ARCHIVE, BROKEN_ARCHIVE}
+    assert validator.run([MOCK_ARCHIVE, BROKEN_ARCHIVE]) == []
+    assert validator.errors() == errors
+
+
+def test_resume_truncated(tmp_path):
+    """A truncated last line is validated again without duplicate errors."""
+    report = tmp_path / "report.jsonl"
+    validator = ArchiveValidator(report, workers=2)
+    validator.run([BROKEN_ARCHIVE])
+    lines = report.read_text().splitlines(keepends=True)
+    report.write_text(lines[0][:-5])
+    assert validator.checkpoint() == set() and validator.errors() == []
+    errors = validator.validate([MOCK_ARCHIVE, BROKEN_ARCHIVE])
+    assert [error.member for error in errors] == ["image1.png"]
+    assert validator.validate([BROKEN_ARCHIVE]) == errors
+    assert len(validator.errors()) == 1
+
+
+def test_truncated_jpeg(tmp_path):
+    """Truncated JPEGs are caught by decoding at reduced size."""
+    output = BytesIO()
+    Image.linear_gradient("L").resize((400, 300)).save(output, format="JPEG")
+    path = str(tmp_path / "truncated.zip")
+    with ZipFile(path, "w") as zip:
+        zip.writestr("1.jpg", output.getvalue()[:-200])
+    errors = validate_archive(path, "pillow")
+    assert [error.member for error in errors] == ["1.jpg"]
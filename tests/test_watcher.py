@@ -0,0 +1,78 @@
+"""Test module for incremental library updates."""
+
+import os
+import shutil
+from pathlib import Path
+from pyviewer import ArchiveBrowser
+from pyviewer.statestore import StateStore
+from pyviewer.watcher import ArchiveWatcher
+
+MOCK_ARCHIVE = Path("tests/data/test.zip")
+
+
+def test_watcher_settle(tmp_path):
+    """Changed archives are reported once they stop changing."""
+    shutil.copy(MOCK_ARCHIVE, tmp_path / "old.zip")
+    changes = []
+    watcher = ArchiveWatcher(tmp_path, changes.append, settle=0, polling=True)
+    watcher._snapshot = {str(tmp_path / "old.zip"): (0, 0)}
+    (tmp_path / "new.zip").write_bytes(b"")
+    (tmp_path / "notes.txt").write_bytes(b"")
+    watcher.poll()
+    watcher.flush()
+    assert changes == [{str(tmp_path / "old.zip"), str(tmp_path / "new.zip")}]
+    watcher.poll()
+    assert not watcher.flush()
+
+
+def test_update_archives(tmp_path):
+    """Added and removed archives update tags and state in place."""
+    library = tmp_path / "library"
+    library.mkdir()
+    shutil.copy(MOCK_ARCHIVE, library / "first.zip")
+    state = tmp_path / "state"
+    browser = ArchiveBrowser(library, state_file=state)
+    assert browser.value == (str(library / "first.zip"),)
+    count = browser.count
+    second = library / "second.zip"
+    shutil.copy(MOCK_ARCHIVE, second)
+    assert browser.update_archives([second]) == ["name"]
+    assert browser.value == (str(second), str(library / "first.zip"))
+    assert browser.count == 2 * count
+    stored = StateStore(state)
+    assert stored.load_tag_map(str(library)) == {"name": browser.value}
+    assert str(second) in stored.load_archive_index(str(library))
+    os.remove(library / "first.zip")
+    os.remove(second)
+    assert browser.update_archives([library / "first.zip", second])
+    assert browser.tags == [] and browser.count == 0
+    assert StateStore(state).load_tag_map(str(library)) == {}
+    assert browser.update_archives([second]) == []
+
+
+def test_watcher_directories(tmp_path):
+    """Moved directories are reported as removed and added containers."""
+    library = tmp_path / "library"
+    (library / "series" / "one").mkdir(parents=True)
+    shutil.copy(MOCK_ARCHIVE, library / "series" / "first.zip")
+    (library / "series" / "one" / "1.jpg").write_bytes(b"jpeg")
+    browser = ArchiveBrowser(library, state_file=tmp_path / "state")
+    assert browser.value == (str(library / "series" / "first.zip"),)
+    changes = []
+    watcher = ArchiveWatcher(library, changes.append, settle=0, polling=True)
+    os.rename(library / "series", library / "moved")
+    watcher.touch_directory(str(library / "series"), str(library / "moved"))
+    watcher.flush()
+    assert changes == [
+        {
+            str(library / "series"),
+            str(library / "moved" / "one"),
+            str(library / "moved" / "first.zip"),
+        }
+    ]
+    browser.update_archives(changes[0])
+    assert browser.value == (str(library / "moved" / "first.zip"),)
+    assert not any("series" in path for path in browser._records)
+
+
+# =]
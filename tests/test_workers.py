@@ -0,0 +1,69 @@
+"""Test module for the shared memory decode workers."""
+
+import os
+import pytest
+from pathlib import Path
+from PIL import Image
+from pyviewer.workers import DecodeWorkers
+
+MOCK_ARCHIVE = Path("tests/data/test.zip")
+
+
+@pytest.fixture(scope="module")
+def workers():
+    """Start two workers sharing a ring of two small slots."""
+    workers = DecodeWorkers(2, slots=2, bounds=(64, 64), decoder="pillow")
+    yield workers
+    workers.shutdown()
+
+
+def test_decode_frame(workers, tmp_path):
+    """Frames hold downscaled pixels of archive members and files."""
+    with workers.decode((str(MOCK_ARCHIVE), "image1.png")) as frame:
+        assert max(frame.width, frame.height) <= 64
+        assert len(frame.data) == frame.stride * frame.height
+    Image.new("RGBA", (128, 32), (1, 2, 3, 255)).save(tmp_path / "a.png")
+    with workers.decode((str(tmp_path / "a.png"), ""), (32, 0)) as frame:
+        assert (frame.width, frame.height, frame.mode) == (32, 8, "RGBA")
+        assert bytes(frame.data[:4]) == bytes((1, 2, 3, 255))
+
+
+def test_recycle_slots(workers):
+    """Released slots are reused and failures return their slot."""
+    for _ in range(4 * workers.slots):
+        workers.decode((str(MOCK_ARCHIVE), "image1.png")).release()
+    with pytest.raises(ValueError):
+        workers.decode((str(MOCK_ARCHIVE), "missing.jpg"))
+    assert workers._free.qsize() == workers.slots
+
+
+def test_slot_timeout(workers):
+    """Submitting gives up once no slot is released in time."""
+    frames = [
+        workers.decode((str(MOCK_ARCHIVE), "image1.png"))
+        for _ in range(workers.slots)
+    ]
+    with pytest.raises(TimeoutError):
+        workers.submit((str(MOCK_ARCHIVE), "image1.png"), timeout=0.1)
+    for frame in frames:
+        frame.release()
+    assert workers._free.qsize() == workers.slots
+
+
+def test_worker_exit(workers, tmp_path):
+    """Requests of an exited worker fail and the worker is restarted."""
+    os.mkfifo(tmp_path / "fifo")
+    # Opening a fifo without writer blocks the worker until it is killed.
+    future = workers.submit((str(tmp_path / "fifo"), ""))
+    with workers._lock:
+        (_, _, index), *_ = workers._pending.values()
+    workers._processes[index].kill()
+    with pytest.raises(RuntimeError):
+        future.result(timeout=10)
+    assert workers._free.qsize() == workers.slots
+    for _ in range(2 * workers.workers):
+        workers.decode((str(MOCK_ARCHIVE), "image1.png")).release()
+    assert all(process.is_alive() for process in workers._processes)
+
+
+# =]